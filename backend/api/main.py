@@ -1,63 +1,52 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel
+from typing import List, Literal, Optional
 from datetime import datetime
+import logging
 import uuid
-import json
 # Environment variables should be set in the shell before running
 
 from sqlmodel import select
-from db import init_db, get_session
+from sqlalchemy import text, update
+from db import DB_ASYNC, init_db, get_session, get_engine, pool_status
 from models import Entry as EntryModel, User as UserModel
-from auth import get_password_hash, verify_password, create_access_token, get_current_user_email
+from auth import Principal, get_password_hash, create_access_token, get_current_principal, get_current_user_email, invalidate_user
+from hashing import shutdown_executor, start_executor, verify_and_update_async
 import secrets
-import requests
 from sqlmodel import Session
-from storage import get_supabase
-
-
-class ServiceDetails(BaseModel):
-    isShoeClean: Optional[str] = None
-    serviceType: Optional[str] = None
-    needsReglue: Optional[bool] = None
-    needsPaint: Optional[bool] = None
-    qcPassed: Optional[bool] = None
-    basicCleaning: Optional[str] = None
-    receivedBy: Optional[str] = None
-
-
-class EntryCreate(BaseModel):
-    customerName: str = ""
-    customerPhone: str
-    customerEmail: str = ""
-    deliveryAddress: str
-    itemDescription: str = ""
-    shoeCondition: str = ""
-    shoeService: Optional[str] = None
-    waiverSigned: bool = False
-    waiverUrl: Optional[str] = None
-    beforePhotos: List[str] = Field(default_factory=list)
-    assignedTo: Optional[str] = None
-    needsReglue: Optional[bool] = None
-    needsPaint: Optional[bool] = None
-    status: str = Field(default="pending")
-    serviceDetails: Optional[ServiceDetails] = None
-    afterPhotos: List[str] = Field(default_factory=list)
-    billing: Optional[float] = None
-    additionalBilling: Optional[float] = None
-    deliveryOption: Optional[str] = None
-    markedAs: Optional[str] = None
-    numberOfPairs: Optional[int] = 1
-
-
-class Entry(EntryCreate):
-    id: str
-    createdAt: datetime
-    updatedAt: datetime
-
+import bulk_entries
+import export
+import jobs
+import live
+import metrics
+import search
+import stats
+from uploads import receive_pdf
+from jobs import JOB_WORKERS, job_worker
+from notifications import enqueue_registration_email, enqueue_status_change
+from signed_urls import resolve_waiver_urls, waiver_urls
+from storage import ENTRY_UPLOAD_PREFIXES, UPLOAD_BUCKET, create_upload_url, init_storage, object_exists, public_url, upload_object
+from serializers import SYNC_COLUMNS, apply_entry_updates, entry_from_payload, serialize_change, serialize_entry, serialize_entries
+from schemas import Entry, EntryCreate, EntryUpdate
+from queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EntryFilters, PageParams, paginate, select_deleted, select_live
+from changes import changed_entries, current_version
+from compression import CompressionMiddleware
+from etags import etag_matches, listing_etag, make_etag, not_modified, set_etag
+from entry_cache import cached_response, entry_cache, pack
+from logs import configure_logging
+
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# "fast" skips the schema migration and the storage bucket check at startup, for
+# serverless cold starts; run `python migrate.py` on deploy instead. Defaults to
+# "fast" on Vercel (which sets VERCEL=1) and "full" everywhere else.
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "fast" if os.environ.get("VERCEL") else "full").lower()
 
 app = FastAPI(title="TakeTwoLabs Backend", version="0.1.0")
 
@@ -81,22 +70,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Page-Size", "X-Search-Rank-Window", "ETag"],
 )
-
-# Serve local uploaded files (if not using external storage)
-from starlette.staticfiles import StaticFiles
-from pathlib import Path
-UPLOADS_DIR = Path(__file__).with_name("uploads")
-try:
-    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
-except Exception:
-    pass
-#app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps the others and times the whole response
+app.add_middleware(metrics.MetricsMiddleware)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+
+# Batch, live-event, search and export routes go first so /entries/batch,
+# /entries/events, /entries/search and /entries/export are not matched as
+# /entries/{entry_id}
+app.include_router(bulk_entries.router)
+live.install(app)
+app.include_router(search.router)
+app.include_router(export.router)
+app.include_router(stats.router)
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    init_db()
+    if STARTUP_MODE != "fast":
+        init_db()
+        init_storage()
+    start_executor()
+    if JOB_WORKERS > 0:
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    job_worker.stop()
+    shutdown_executor()
 
 
 @app.get("/health")
@@ -104,124 +109,55 @@ def health() -> dict:
     return {"ok": True}
 
 
+@app.get("/health/db")
+def health_db() -> dict:
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+        ok = True
+    except Exception:
+        ok = False
+    return {"ok": ok, "pool": pool_status()}
+
+
+def _unchanged_listing(request: Request, session: Session) -> Optional[Response]:
+    # Revalidation reads only the change counter, before the cache is asked:
+    # a miss, an expired page or ENTRY_CACHE=off never loads rows for a 304
+    if not request.headers.get("if-none-match"):
+        return None
+    etag = listing_etag(request, current_version(session.connection()))
+    return not_modified(etag) if etag_matches(request, etag) else None
+
+
+def _load_page(request: Request, session: Session, stmt, page: PageParams) -> bytes:
+    # Counter first, so the tag never claims a version newer than the rows
+    etag = listing_etag(request, current_version(session.connection()))
+    rows, next_cursor = paginate(session, stmt, page)
+    return pack(etag, next_cursor, JSONResponse(serialize_entries(rows, resolve_waiver_urls(rows))).body)
+
+
 @app.get("/entries", response_model=List[Entry])
-def list_entries(current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> List[Entry]:
-    # Exclude soft-deleted entries
-    rows = session.exec(select(EntryModel).where(EntryModel.deleted == False)).all()
-    result: List[Entry] = []
-    for r in rows:
-        result.append(Entry(
-            id=r.public_id,
-            customerName=r.customerName,
-            customerPhone=r.customerPhone,
-            customerEmail=r.customerEmail,
-            deliveryAddress=r.deliveryAddress,
-            itemDescription=r.itemDescription,
-            shoeCondition=r.shoeCondition,
-            shoeService=r.shoeService,
-            waiverSigned=r.waiverSigned,
-            waiverUrl=r.waiverUrl,
-            beforePhotos=json.loads(r.beforePhotos or "[]"),
-            assignedTo=r.assignedTo,
-            needsReglue=r.needsReglue,
-            needsPaint=r.needsPaint,
-            status=r.status,
-            serviceDetails=json.loads(r.serviceDetails) if r.serviceDetails else None,
-            afterPhotos=json.loads(r.afterPhotos or "[]"),
-            billing=r.billing,
-            additionalBilling=r.additionalBilling,
-            deliveryOption=r.deliveryOption,
-            markedAs=r.markedAs,
-            numberOfPairs=r.numberOfPairs,
-            createdAt=r.createdAt,
-            updatedAt=r.updatedAt,
-        ))
-    return result
+def list_entries(request: Request, filters: EntryFilters = Depends(), page: PageParams = Depends(), current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> List[Entry]:
+    # Served from the entry cache when possible: a hit touches no database at all
+    unchanged = _unchanged_listing(request, session)
+    if unchanged is not None:
+        return unchanged
+    value = entry_cache.get_or_load(
+        "list",
+        lambda: entry_cache.list_key("live", filters, page),
+        # Exclude soft-deleted entries
+        lambda: _load_page(request, session, filters.apply(select_live()), page),
+    )
+    return cached_response(request, value, page)
 
 
 @app.post("/entries", response_model=Entry)
 def create_entry(payload: EntryCreate, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> Entry:
-    now = datetime.utcnow()
-    public_id = uuid.uuid4().hex
-    row = EntryModel(
-        public_id=public_id,
-        customerName=payload.customerName,
-        customerPhone=payload.customerPhone,
-        customerEmail=payload.customerEmail,
-        deliveryAddress=payload.deliveryAddress,
-        itemDescription=payload.itemDescription,
-        shoeCondition=payload.shoeCondition,
-        shoeService=payload.shoeService,
-        waiverSigned=payload.waiverSigned,
-        waiverUrl=payload.waiverUrl,
-        beforePhotos=json.dumps(payload.beforePhotos or []),
-        assignedTo=payload.assignedTo,
-        needsReglue=payload.needsReglue,
-        needsPaint=payload.needsPaint,
-        status=payload.status,
-        serviceDetails=json.dumps(payload.serviceDetails.dict() if payload.serviceDetails else None) if payload.serviceDetails else None,
-        afterPhotos=json.dumps(payload.afterPhotos or []),
-        billing=payload.billing,
-        additionalBilling=payload.additionalBilling,
-        deliveryOption=payload.deliveryOption,
-        markedAs=payload.markedAs,
-        numberOfPairs=payload.numberOfPairs or 1,
-        createdAt=now,
-        updatedAt=now,
-    )
+    row = entry_from_payload(payload)
     session.add(row)
     session.commit()
     session.refresh(row)
-    return Entry(
-        id=row.public_id,
-        customerName=row.customerName,
-        customerPhone=row.customerPhone,
-        customerEmail=row.customerEmail,
-        deliveryAddress=row.deliveryAddress,
-        itemDescription=row.itemDescription,
-        shoeCondition=row.shoeCondition,
-        shoeService=row.shoeService,
-        waiverSigned=row.waiverSigned,
-        waiverUrl=row.waiverUrl,
-        beforePhotos=json.loads(row.beforePhotos or "[]"),
-        assignedTo=row.assignedTo,
-        needsReglue=row.needsReglue,
-        needsPaint=row.needsPaint,
-        status=row.status,
-        serviceDetails=json.loads(row.serviceDetails) if row.serviceDetails else None,
-        afterPhotos=json.loads(row.afterPhotos or "[]"),
-        billing=row.billing,
-        additionalBilling=row.additionalBilling,
-        deliveryOption=row.deliveryOption,
-        markedAs=row.markedAs,
-        numberOfPairs=(row.numberOfPairs or 1),
-        createdAt=row.createdAt,
-        updatedAt=row.updatedAt,
-    )
-
-
-class EntryUpdate(BaseModel):
-    customerName: Optional[str] = None
-    customerPhone: Optional[str] = None
-    customerEmail: Optional[str] = None
-    deliveryAddress: Optional[str] = None
-    itemDescription: Optional[str] = None
-    shoeCondition: Optional[str] = None
-    shoeService: Optional[str] = None
-    waiverSigned: Optional[bool] = None
-    waiverUrl: Optional[str] = None
-    beforePhotos: Optional[List[str]] = None
-    assignedTo: Optional[str] = None
-    needsReglue: Optional[bool] = None
-    needsPaint: Optional[bool] = None
-    status: Optional[str] = None
-    serviceDetails: Optional[ServiceDetails] = None
-    afterPhotos: Optional[List[str]] = None
-    billing: Optional[float] = None
-    additionalBilling: Optional[float] = None
-    deliveryOption: Optional[str] = None
-    markedAs: Optional[str] = None
-    numberOfPairs: Optional[int] = None
+    return JSONResponse(serialize_entry(row, resolve_waiver_urls([row])))
 
 
 @app.patch("/entries/{entry_id}", response_model=Entry)
@@ -229,45 +165,15 @@ def update_entry(entry_id: str, updates: EntryUpdate, current_user: str = Depend
     row = session.exec(select(EntryModel).where(EntryModel.public_id == entry_id)).first()
     if not row:
         raise HTTPException(status_code=404, detail="Entry not found")
-    data = updates.dict(exclude_unset=True)
-    if "beforePhotos" in data:
-        row.beforePhotos = json.dumps(data.pop("beforePhotos") or [])
-    if "afterPhotos" in data:
-        row.afterPhotos = json.dumps(data.pop("afterPhotos") or [])
-    if "serviceDetails" in data and data["serviceDetails"] is not None:
-        row.serviceDetails = json.dumps(data.pop("serviceDetails"))
-    for k, v in data.items():
-        setattr(row, k, v)
-    row.updatedAt = datetime.utcnow()
+    previous_status = row.status
+    apply_entry_updates(row, updates)
     session.add(row)
+    if row.status != previous_status:
+        enqueue_status_change(session, row)
     session.commit()
+    job_worker.wake()
     session.refresh(row)
-    return Entry(
-        id=row.public_id,
-        customerName=row.customerName,
-        customerPhone=row.customerPhone,
-        customerEmail=row.customerEmail,
-        deliveryAddress=row.deliveryAddress,
-        itemDescription=row.itemDescription,
-        shoeCondition=row.shoeCondition,
-        shoeService=row.shoeService,
-        waiverSigned=row.waiverSigned,
-        waiverUrl=row.waiverUrl,
-        beforePhotos=json.loads(row.beforePhotos or "[]"),
-        assignedTo=row.assignedTo,
-        needsReglue=row.needsReglue,
-        needsPaint=row.needsPaint,
-        status=row.status,
-        serviceDetails=json.loads(row.serviceDetails) if row.serviceDetails else None,
-        afterPhotos=json.loads(row.afterPhotos or "[]"),
-        billing=row.billing,
-        additionalBilling=row.additionalBilling,
-        deliveryOption=row.deliveryOption,
-        markedAs=row.markedAs,
-        numberOfPairs=(row.numberOfPairs or 1),
-        createdAt=row.createdAt,
-        updatedAt=row.updatedAt,
-    )
+    return JSONResponse(serialize_entry(row, resolve_waiver_urls([row])))
 
 
 @app.delete("/entries/{entry_id}", response_model=dict)
@@ -276,45 +182,47 @@ def delete_entry(entry_id: str, current_user: str = Depends(get_current_user_ema
     if not row:
         raise HTTPException(status_code=404, detail="Entry not found")
     
-    # Soft delete
+    # Soft delete; updatedAt changes so delta sync picks it up
     row.deleted = True
     row.deletedAt = datetime.utcnow()
+    row.updatedAt = row.deletedAt
     session.add(row)
     session.commit()
     return {"deleted": True}
 
 @app.get("/entries/deleted", response_model=List[Entry])
-def list_deleted_entries(current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> List[Entry]:
-    rows = session.exec(select(EntryModel).where(EntryModel.deleted == True)).all()
-    result: List[Entry] = []
-    for r in rows:
-        result.append(Entry(
-            id=r.public_id,
-            customerName=r.customerName,
-            customerPhone=r.customerPhone,
-            customerEmail=r.customerEmail,
-            deliveryAddress=r.deliveryAddress,
-            itemDescription=r.itemDescription,
-            shoeCondition=r.shoeCondition,
-            shoeService=r.shoeService,
-            waiverSigned=r.waiverSigned,
-            waiverUrl=r.waiverUrl,
-            beforePhotos=json.loads(r.beforePhotos or "[]"),
-            assignedTo=r.assignedTo,
-            needsReglue=r.needsReglue,
-            needsPaint=r.needsPaint,
-            status=r.status,
-            serviceDetails=json.loads(r.serviceDetails) if r.serviceDetails else None,
-            afterPhotos=json.loads(r.afterPhotos or "[]"),
-            billing=r.billing,
-            additionalBilling=r.additionalBilling,
-            deliveryOption=r.deliveryOption,
-            markedAs=r.markedAs,
-            numberOfPairs=r.numberOfPairs,
-            createdAt=r.createdAt,
-            updatedAt=r.updatedAt,
-        ))
-    return result
+def list_deleted_entries(request: Request, filters: EntryFilters = Depends(), page: PageParams = Depends(), current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> List[Entry]:
+    unchanged = _unchanged_listing(request, session)
+    if unchanged is not None:
+        return unchanged
+    value = entry_cache.get_or_load(
+        "list",
+        lambda: entry_cache.list_key("deleted", filters, page),
+        lambda: _load_page(request, session, filters.apply(select_deleted()), page),
+    )
+    return cached_response(request, value, page)
+
+@app.get("/entries/sync", response_model=dict)
+def sync_entries(cursor: Optional[str] = None, since: Optional[datetime] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    # Entries created, updated, soft-deleted or restored after `cursor` (or
+    # since the `since` timestamp on a first sync), plus permanently deleted ids.
+    # Keep calling with the returned cursor while hasMore is true.
+    rows, purged, next_cursor, has_more = changed_entries(session.connection(), SYNC_COLUMNS, cursor, since, limit)
+    waiver_urls = resolve_waiver_urls(rows)
+    entries = [serialize_change(r, waiver_urls) for r in rows]
+    return JSONResponse({"entries": entries, "purged": purged, "cursor": next_cursor, "hasMore": has_more})
+
+@app.get("/entries/{entry_id}", response_model=Entry)
+def get_entry(request: Request, entry_id: str, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> Entry:
+    # After the other GET /entries/... routes, which would otherwise match here
+    def load() -> bytes:
+        row = session.exec(select_live().add_columns(EntryModel.version).where(EntryModel.public_id == entry_id)).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        body = JSONResponse(serialize_entry(row, resolve_waiver_urls([row]))).body
+        return pack(listing_etag(request, row.version), None, body)
+
+    return cached_response(request, entry_cache.get_or_load("entry", lambda: entry_cache.entry_key(entry_id), load))
 
 @app.post("/entries/{entry_id}/restore", response_model=Entry)
 def restore_entry(entry_id: str, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> Entry:
@@ -324,36 +232,12 @@ def restore_entry(entry_id: str, current_user: str = Depends(get_current_user_em
     
     row.deleted = False
     row.deletedAt = None
+    row.updatedAt = datetime.utcnow()
     session.add(row)
     session.commit()
     session.refresh(row)
     
-    return Entry(
-        id=row.public_id,
-        customerName=row.customerName,
-        customerPhone=row.customerPhone,
-        customerEmail=row.customerEmail,
-        deliveryAddress=row.deliveryAddress,
-        itemDescription=row.itemDescription,
-        shoeCondition=row.shoeCondition,
-        shoeService=row.shoeService,
-        waiverSigned=row.waiverSigned,
-        waiverUrl=row.waiverUrl,
-        beforePhotos=json.loads(row.beforePhotos or "[]"),
-        assignedTo=row.assignedTo,
-        needsReglue=row.needsReglue,
-        needsPaint=row.needsPaint,
-        status=row.status,
-        serviceDetails=json.loads(row.serviceDetails) if row.serviceDetails else None,
-        afterPhotos=json.loads(row.afterPhotos or "[]"),
-        billing=row.billing,
-        additionalBilling=row.additionalBilling,
-        deliveryOption=row.deliveryOption,
-        markedAs=row.markedAs,
-        numberOfPairs=(row.numberOfPairs or 1),
-        createdAt=row.createdAt,
-        updatedAt=row.updatedAt,
-    )
+    return JSONResponse(serialize_entry(row, resolve_waiver_urls([row])))
 
 
 @app.delete("/entries/{entry_id}/permanent", response_model=dict)
@@ -375,24 +259,97 @@ def permanent_delete_entry_alt(entry_id: str, current_user: str = Depends(get_cu
     session.commit()
     return {"deleted": True, "permanent": True}
 
+
+if DB_ASYNC:
+    import async_entries
+    async_entries.install(app)
+
+
 class UploadInitResponse(BaseModel):
     url: str
 
 
 @app.post("/upload", response_model=dict)
 def upload_file(filename: str, current_user: str = Depends(get_current_user_email)) -> dict:
-    # Client will PUT directly to Supabase storage using the public bucket
-    # For simplicity, we will upload via server here synchronously
-    supabase = get_supabase()
+    # Client PUTs the file directly to Supabase storage using the signed upload URL
     bucket = os.environ.get("SUPABASE_BUCKET", "uploads")
-    # Expecting base64 in body would be heavy; keep it simple with presigned URL later.
-    # For MVP, just return bucket/path for client-side direct upload via supabase-js (optional).
-    return {"bucket": bucket, "path": f"{current_user}/{filename}"}
+    path = f"{current_user}/{filename}"
+    signed = create_upload_url(bucket, path)
+    return {"bucket": bucket, "path": path, "signedUrl": signed["signed_url"], "token": signed["token"]}
+
+
+class EntryUploadRequest(BaseModel):
+    kind: Literal["before", "after", "waiver"]
+    filename: str
+
+
+class EntryUploadResponse(BaseModel):
+    bucket: str
+    path: str
+    signedUrl: str
+    token: str
+
+
+class EntryUploadConfirm(BaseModel):
+    kind: Literal["before", "after", "waiver"]
+    path: str
+
+
+# Direct-to-storage uploads: sign, client PUTs the file to storage, then confirm
+@app.post("/entries/{entry_id}/uploads", response_model=EntryUploadResponse)
+def sign_entry_upload(entry_id: str, req: EntryUploadRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> EntryUploadResponse:
+    exists = session.exec(select(EntryModel.id).where(EntryModel.public_id == entry_id)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    if req.kind == "waiver" and not req.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    safe_name = req.filename.replace("/", "_").replace("\\", "_")
+    path = f"{ENTRY_UPLOAD_PREFIXES[req.kind]}/{entry_id}/{uuid.uuid4().hex}_{safe_name}"
+    signed = create_upload_url(UPLOAD_BUCKET, path)
+    return EntryUploadResponse(bucket=UPLOAD_BUCKET, path=path, signedUrl=signed["signed_url"], token=signed["token"])
+
+
+@app.post("/entries/{entry_id}/uploads/confirm", response_model=Entry)
+def confirm_entry_upload(entry_id: str, req: EntryUploadConfirm, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> Entry:
+    row = session.exec(select(EntryModel).where(EntryModel.public_id == entry_id)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    # Only objects issued for this entry by sign_entry_upload can be attached
+    if not req.path.startswith(f"{ENTRY_UPLOAD_PREFIXES[req.kind]}/{entry_id}/") or ".." in req.path:
+        raise HTTPException(status_code=400, detail="Path does not belong to this entry")
+    if not object_exists(UPLOAD_BUCKET, req.path):
+        raise HTTPException(status_code=404, detail="Uploaded file not found")
+    if req.kind == "waiver":
+        # Store the object path; a signed URL is issued whenever the entry is read
+        row.waiverUrl = req.path
+    else:
+        url = public_url(UPLOAD_BUCKET, req.path)
+        photos = row.beforePhotos if req.kind == "before" else row.afterPhotos
+        if url not in (photos or []):
+            photos = [*(photos or []), url]
+        if req.kind == "before":
+            row.beforePhotos = photos
+        else:
+            row.afterPhotos = photos
+    row.updatedAt = datetime.utcnow()
+    session.add(row)
+    session.commit()
+    session.refresh(row)
+    return JSONResponse(serialize_entry(row, resolve_waiver_urls([row])))
 
 
 # Upload waiver PDF to Supabase and return a public URL
-@app.post("/upload/waiver", response_model=dict)
-async def upload_waiver(request: Request, file: UploadFile = File(...), current_user: str = Depends(get_current_user_email)) -> dict:
+@app.post("/upload/waiver", response_model=dict, openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+})
+async def upload_waiver(request: Request, current_user: str = Depends(get_current_user_email)) -> dict:
     # Verify required environment variables
     required_vars = ["SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_BUCKET"]
     missing_vars = [var for var in required_vars if not os.environ.get(var)]
@@ -402,85 +359,35 @@ async def upload_waiver(request: Request, file: UploadFile = File(...), current_
             detail=f"Missing required environment variables: {', '.join(missing_vars)}"
         )
 
-    if not file.filename or not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    # Streams the body to a temp file; non-PDF or oversized files are rejected
+    # as soon as their first bytes (or the size limit) arrive
+    received = await receive_pdf(request)
     try:
-        print(f"Processing upload for user: {current_user}")
-        print(f"File name: {file.filename}")
+        logger.debug("Processing waiver upload", extra={"user": current_user, "upload_filename": received.filename})
         ts = int(datetime.utcnow().timestamp())
-        safe_name = file.filename.replace("/", "_").replace("\\", "_")
+        safe_name = received.filename.replace("/", "_").replace("\\", "_")
         file_path = f"waivers/{current_user}/{ts}_{safe_name}"
-        
-        # Read file content
-        content = await file.read()
-        
-        # Upload to Supabase storage
-        print("Initializing Supabase client...")
-        supabase = get_supabase()
-        bucket_name = "uploads"  # Use fixed bucket name
-        print(f"Using bucket: {bucket_name}")
-        
-        # Ensure bucket exists
-        try:
-            print("Checking/creating bucket...")
-            # Try to get bucket info first
-            try:
-                supabase.storage.get_bucket(bucket_name)
-                print(f"Bucket '{bucket_name}' already exists")
-            except Exception:
-                print(f"Bucket '{bucket_name}' not found, creating...")
-                supabase.storage.create_bucket(bucket_name, {"public": True})
-                print("Bucket created successfully")
-        except Exception as e:
-            print(f"Error with bucket operation: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Storage bucket error: {str(e)}"
-            )
-            
-        try:
-            # Upload the file
-            print(f"Uploading file to path: {file_path}")
-            print(f"Uploading file to '{file_path}'...")
-            # Remove any existing file
-            try:
-                supabase.storage.from_(bucket_name).remove([file_path])
-                print("Removed existing file if any")
-            except Exception:
-                pass  # Ignore if file doesn't exist
-                
-            # Upload new file
-            res = supabase.storage.from_(bucket_name).upload(
-                path=file_path,
-                file=content,
-                file_options={"content-type": "application/pdf"}
-            )
-            print("File uploaded successfully")
-            print("Upload successful")
-            
-            # Get the public URL
-            print("Getting public URL...")
-            # Generate signed URL that expires in 7 days
-            signed_url = supabase.storage\
-                .from_(bucket_name)\
-                .create_signed_url(file_path, 604800)  # 7 days in seconds
-            
-            if not signed_url or 'signedURL' not in signed_url:
-                raise HTTPException(status_code=500, detail="Failed to generate signed URL")
-                
-            print(f"Signed URL generated: {signed_url['signedURL']}")
-            return {"url": signed_url['signedURL']}
-        except Exception as upload_error:
-            print(f"Upload operation failed: {str(upload_error)}")
-            raise upload_error
-        
+
+        # Bucket existence is checked once at startup; a single upsert replaces any existing file.
+        # Storage calls block, so they run off the event loop.
+        bucket_name = UPLOAD_BUCKET
+        with received.open() as content:
+            await run_in_threadpool(upload_object, bucket_name, file_path, content, "application/pdf")
+
+        # Signed through the cache so the first read of the entry reuses this URL.
+        # Clients should save `path` as the entry's waiverUrl.
+        signed_urls = await run_in_threadpool(waiver_urls.get_many, [file_path])
+        if file_path not in signed_urls:
+            raise HTTPException(status_code=500, detail="Failed to generate signed URL")
+
+        return {"url": signed_urls[file_path], "path": file_path}
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        print(f"Upload failed. Error: {str(e)}")
-        print("Detailed traceback:")
-        print(traceback.format_exc())
+        logger.exception("Waiver upload failed", extra={"user": current_user, "upload_filename": received.filename})
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {e}")
+    finally:
+        received.cleanup()
 
 
 class LoginRequest(BaseModel):
@@ -515,100 +422,37 @@ def register(req: RegisterRequest, session: Session = Depends(get_session)) -> d
         phone=req.phone,
         verified=False,
     )
-    session.add(user)
-    session.commit()
     # create verification token
     token = secrets.token_urlsafe(32)
     # store token temporarily in user.phone field if empty (simple MVP); prefer a separate table in prod
     user.phone = f"verify:{token}"
     session.add(user)
+    # The admin email is sent by a job worker; the job commits with the user so
+    # it is never lost, and a slow mail provider no longer delays sign-up
+    enqueue_registration_email(session, req.email, token, req.first_name, req.last_name)
     session.commit()
-    # send email via Resend API
-    try:
-        resend_api_key = os.environ.get("RESEND_API_KEY")
-        if not resend_api_key:
-            raise RuntimeError("RESEND_API_KEY is not configured")
-
-        sender = "Taketwo Manila <noreply@taketwomanila.com>"
-        recipients = [
-            "aczontongao@gmail.com",
-            "jimboyaczon@taketwomanila.com",
-            "davemanay1982@gmail.com",
-        ]
-
-        backend_url = os.environ.get("BACKEND_URL", "https://backend.taketwomanila.com")
-        verify_link = f"{backend_url}/auth/verify?token={token}&email={req.email}"
-
-        body = f"""\
-        <html>
-          <body style="margin:0;padding:0;background:#000;color:#fff;font-family:system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;">
-            <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="max-width:600px;margin:0 auto;">
-              <tr>
-                <td style="padding:28px 16px 0;text-align:center;">
-                  <div style="display:inline-flex;align-items:center;gap:10px;padding:10px 16px;border:1px solid #fff;border-radius:12px;">
-                    <span style="font-size:22px;font-weight:800;letter-spacing:0.1em;">TAKETWO</span>
-                  </div>
-                </td>
-              </tr>
-              <tr>
-                <td style="padding:24px 16px 0;">
-                  <h1 style="margin:0;font-size:22px;font-weight:700;">New user registration pending verification</h1>
-                  <p style="margin:14px 0 0;line-height:1.5;color:#ccc;">A new user has registered and is awaiting your confirmation.</p>
-
-                  <table role="presentation" cellspacing="0" cellpadding="0" border="0" style="margin:22px 0 0;width:100%;">
-                    <tr>
-                      <td style="background:#0a0a0a;border:1px solid #333;border-radius:12px;padding:16px;color:#ddd;">
-                        <p style="margin:0 0 10px;font-size:14px;font-weight:600;">User details</p>
-                        <p style="margin:0;font-size:13px;">Name: {req.first_name or ''} {req.last_name or ''}</p>
-                        <p style="margin:6px 0 0;font-size:13px;">Email: {req.email}</p>
-                      </td>
-                    </tr>
-                  </table>
-
-                  <div style="margin:24px 0;text-align:center;">
-                    <a href="{verify_link}" style="display:inline-block;padding:12px 18px;background:#fff;color:#000;font-weight:700;text-decoration:none;border-radius:9px;">Verify account</a>
-                  </div>
-
-                  <p style="margin:0;font-size:12px;color:#777;">If this registration looks suspicious, you can safely ignore this message.</p>
-                </td>
-              </tr>
-              <tr>
-                <td style="padding:28px 16px 28px;text-align:center;font-size:12px;color:#666;">
-                  &copy; {datetime.utcnow().year} TakeTwoLabs
-                </td>
-              </tr>
-            </table>
-          </body>
-        </html>
-        """
-
-        response = requests.post(
-            "https://api.resend.com/emails",
-            headers={
-                "Authorization": f"Bearer {resend_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "from": sender,
-                "to": recipients,
-                "subject": "New User Registration Pending Verification – TakeTwoLabs",
-                "html": body,
-            },
-            timeout=10,
-        )
-        if not response.ok:
-            print("Resend email failed:", response.status_code, response.text)
-    except Exception as e:
-        # Do not expose internal error, but log/print server side
-        print("Email send failed:", e)
+    job_worker.wake()
     return {"message": "Registration successful. Waiting for admin approval."}
 
 
 @app.post("/auth/login", response_model=TokenResponse)
-def login(req: LoginRequest, session: Session = Depends(get_session)) -> TokenResponse:
-    user = session.exec(select(UserModel).where(UserModel.email == req.email)).first()
-    if not user or not verify_password(req.password, user.password_hash):
+async def login(req: LoginRequest, session: Session = Depends(get_session)) -> TokenResponse:
+    # Async so a login burst waits on the hashing pool instead of holding
+    # threadpool threads that entry CRUD needs; DB calls still go to a thread
+    user = await run_in_threadpool(lambda: session.exec(select(UserModel).where(UserModel.email == req.email)).first())
+    # Give the connection back to the pool while bcrypt runs
+    await run_in_threadpool(session.close)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update_async(req.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored with a different BCRYPT_ROUNDS; upgrade while we have the password
+        def save_hash() -> None:
+            session.exec(update(UserModel).where(UserModel.id == user.id).values(password_hash=new_hash))
+            session.commit()
+        await run_in_threadpool(save_hash)
     if not user.verified:
         raise HTTPException(status_code=403, detail="Account not verified. Waiting for admin approval.")
     token = create_access_token(subject=user.email)
@@ -631,6 +475,7 @@ def verify_email(token: str, email: str, session: Session = Depends(get_session)
     user.phone = None
     session.add(user)
     session.commit()
+    invalidate_user(user.email)
 
     frontend_url = os.environ.get("FRONTEND_URL", "https://dashboard.taketwomanila.com")
 
@@ -722,16 +567,17 @@ class MeUpdateRequest(BaseModel):
 
 
 @app.get("/me", response_model=MeResponse)
-def get_me(current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> MeResponse:
-    user = session.exec(select(UserModel).where(UserModel.email == current_user)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return MeResponse(email=user.email, first_name=user.first_name, last_name=user.last_name, phone=user.phone)
+async def get_me(request: Request, principal: Principal = Depends(get_current_principal)) -> MeResponse:
+    me = MeResponse(email=principal.email, first_name=principal.first_name, last_name=principal.last_name, phone=principal.phone)
+    etag = make_etag(request.url.path, me.model_dump())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return set_etag(JSONResponse(me.model_dump()), etag)
 
 
 @app.patch("/me", response_model=MeResponse)
-def update_me(payload: MeUpdateRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> MeResponse:
-    user = session.exec(select(UserModel).where(UserModel.email == current_user)).first()
+def update_me(payload: MeUpdateRequest, principal: Principal = Depends(get_current_principal), session: Session = Depends(get_session)) -> MeResponse:
+    user = session.get(UserModel, principal.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     data = payload.dict(exclude_unset=True)
@@ -740,6 +586,5 @@ def update_me(payload: MeUpdateRequest, current_user: str = Depends(get_current_
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_user(user.email)
     return MeResponse(email=user.email, first_name=user.first_name, last_name=user.last_name, phone=user.phone)
-
-
@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from auth import get_current_user_email
+from changes import current_version
+from db import get_async_session
+from entry_cache import cached_response, entry_cache, pack
+from etags import etag_matches, listing_etag, not_modified
+from jobs import job_worker
+from models import Entry as EntryModel
+from notifications import enqueue_status_change
+from queries import EntryFilters, PageParams, paginate_async, select_deleted, select_live
+from schemas import Entry, EntryCreate, EntryUpdate
+from signed_urls import resolve_waiver_urls
+from serializers import apply_entry_updates, entry_from_payload, serialize_entry, serialize_entries
+
+
+# Async twins of the entry CRUD routes in api/main.py, enabled with DB_ASYNC=true
+router = APIRouter()
+
+
+async def _get_entry(session: AsyncSession, entry_id: str) -> EntryModel:
+    row = (await session.exec(select(EntryModel).where(EntryModel.public_id == entry_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return row
+
+
+async def _unchanged_listing(request: Request, session: AsyncSession) -> Optional[Response]:
+    if not request.headers.get("if-none-match"):
+        return None
+    conn = await session.connection()
+    etag = listing_etag(request, await conn.run_sync(current_version))
+    return not_modified(etag) if etag_matches(request, etag) else None
+
+
+async def _load_page(request: Request, session: AsyncSession, stmt, page: PageParams) -> bytes:
+    conn = await session.connection()
+    etag = listing_etag(request, await conn.run_sync(current_version))
+    rows, next_cursor = await paginate_async(session, stmt, page)
+    waiver_urls = await run_in_threadpool(resolve_waiver_urls, rows)
+    return pack(etag, next_cursor, JSONResponse(serialize_entries(rows, waiver_urls)).body)
+
+
+@router.get("/entries", response_model=List[Entry])
+async def list_entries(request: Request, filters: EntryFilters = Depends(), page: PageParams = Depends(), current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> List[Entry]:
+    unchanged = await _unchanged_listing(request, session)
+    if unchanged is not None:
+        return unchanged
+    value = await entry_cache.get_or_load_async(
+        "list",
+        lambda: entry_cache.list_key("live", filters, page),
+        lambda: _load_page(request, session, filters.apply(select_live()), page),
+    )
+    return cached_response(request, value, page)
+
+
+@router.post("/entries", response_model=Entry)
+async def create_entry(payload: EntryCreate, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> Entry:
+    row = entry_from_payload(payload)
+    session.add(row)
+    await session.commit()
+    waiver_urls = await run_in_threadpool(resolve_waiver_urls, [row])
+    return JSONResponse(serialize_entry(row, waiver_urls))
+
+
+@router.patch("/entries/{entry_id}", response_model=Entry)
+async def update_entry(entry_id: str, updates: EntryUpdate, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> Entry:
+    row = await _get_entry(session, entry_id)
+    previous_status = row.status
+    apply_entry_updates(row, updates)
+    session.add(row)
+    if row.status != previous_status:
+        enqueue_status_change(session, row)
+    await session.commit()
+    job_worker.wake()
+    waiver_urls = await run_in_threadpool(resolve_waiver_urls, [row])
+    return JSONResponse(serialize_entry(row, waiver_urls))
+
+
+@router.delete("/entries/{entry_id}", response_model=dict)
+async def delete_entry(entry_id: str, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> dict:
+    row = await _get_entry(session, entry_id)
+    row.deleted = True
+    row.deletedAt = datetime.utcnow()
+    row.updatedAt = row.deletedAt
+    session.add(row)
+    await session.commit()
+    return {"deleted": True}
+
+
+@router.get("/entries/deleted", response_model=List[Entry])
+async def list_deleted_entries(request: Request, filters: EntryFilters = Depends(), page: PageParams = Depends(), current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> List[Entry]:
+    unchanged = await _unchanged_listing(request, session)
+    if unchanged is not None:
+        return unchanged
+    value = await entry_cache.get_or_load_async(
+        "list",
+        lambda: entry_cache.list_key("deleted", filters, page),
+        lambda: _load_page(request, session, filters.apply(select_deleted()), page),
+    )
+    return cached_response(request, value, page)
+
+
+@router.get("/entries/{entry_id}", response_model=Entry)
+async def get_entry(request: Request, entry_id: str, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> Entry:
+    # Defined after /entries/deleted: install() appends these routes in order
+    async def load() -> bytes:
+        stmt = select_live().add_columns(EntryModel.version).where(EntryModel.public_id == entry_id)
+        row = (await session.exec(stmt)).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        waiver_urls = await run_in_threadpool(resolve_waiver_urls, [row])
+        return pack(listing_etag(request, row.version), None, JSONResponse(serialize_entry(row, waiver_urls)).body)
+
+    value = await entry_cache.get_or_load_async("entry", lambda: entry_cache.entry_key(entry_id), load)
+    return cached_response(request, value)
+
+
+@router.post("/entries/{entry_id}/restore", response_model=Entry)
+async def restore_entry(entry_id: str, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> Entry:
+    row = await _get_entry(session, entry_id)
+    row.deleted = False
+    row.deletedAt = None
+    row.updatedAt = datetime.utcnow()
+    session.add(row)
+    await session.commit()
+    waiver_urls = await run_in_threadpool(resolve_waiver_urls, [row])
+    return JSONResponse(serialize_entry(row, waiver_urls))
+
+
+@router.delete("/entries/{entry_id}/permanent", response_model=dict)
+async def permanent_delete_entry(entry_id: str, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> dict:
+    row = await _get_entry(session, entry_id)
+    await session.delete(row)
+    await session.commit()
+    return {"deleted": True, "permanent": True}
+
+
+@router.delete("/entries/permanent/{entry_id}", response_model=dict)
+async def permanent_delete_entry_alt(entry_id: str, current_user: str = Depends(get_current_user_email), session: AsyncSession = Depends(get_async_session)) -> dict:
+    return await permanent_delete_entry(entry_id, current_user, session)
+
+
+def install(app: FastAPI) -> None:
+    # Swap the sync routes for these, keeping everything else on the app as is
+    async_routes = {(r.path, m) for r in router.routes for m in r.methods}
+    app.router.routes = [
+        r for r in app.router.routes
+        if not (isinstance(r, APIRoute) and any((r.path, m) in async_routes for m in r.methods))
+    ]
+    app.include_router(router)
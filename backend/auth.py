@@ -1,25 +1,56 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set
+import os
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from db import get_engine
+from hashing import hash_password, verify_password as _verify_password
+from models import User as UserModel
 
 
 SECRET_KEY = "fk9lratv"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 12
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "2048"))
+# Upper bound on how long a cached principal is trusted without a DB read, so
+# changes made by other processes are picked up; tokens never outlive their exp
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", "300"))
+
+
+def create_ticket(subject: str, audience: str, ttl: float) -> str:
+    # Short-lived token good for one purpose only, for clients that have to put
+    # it in a URL (where it ends up in access logs). jwt.decode without an
+    # audience rejects it, so it is never accepted as a bearer token.
+    expires = datetime.utcnow() + timedelta(seconds=ttl)
+    return jwt.encode({"sub": subject, "aud": audience, "exp": expires}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def verify_ticket(ticket: str, audience: str) -> str:
+    try:
+        subject = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM], audience=audience).get("sub")
+    except JWTError:
+        subject = None
+    if not subject:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired ticket")
+    return subject
+
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
-    return pwd_context.verify(plain_password, password_hash)
+    return _verify_password(plain_password, password_hash)
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -29,7 +60,89 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user_email(token: str = Depends(oauth2_scheme)) -> str:
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    verified: bool
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+
+
+class _CachedToken:
+    __slots__ = ("email", "expires_at", "principal")
+
+    def __init__(self, email: str, expires_at: float):
+        self.email = email
+        self.expires_at = expires_at
+        self.principal: Optional[Principal] = None
+
+
+class TokenCache:
+    # Validated bearer tokens -> subject (and, once loaded, the user), so hot
+    # sessions skip both jwt.decode and the user lookup
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, _CachedToken]" = OrderedDict()
+        self._by_email: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[_CachedToken]:
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                return None
+            if item.expires_at <= time.time():
+                self._remove(token)
+                return None
+            self._items.move_to_end(token)
+            return item
+
+    def put(self, token: str, email: str, exp: float) -> _CachedToken:
+        item = _CachedToken(email, min(exp, time.time() + self.ttl))
+        with self._lock:
+            self._remove(token)
+            self._items[token] = item
+            self._by_email.setdefault(email, set()).add(token)
+            while len(self._items) > self.max_size:
+                self._remove(next(iter(self._items)))
+        return item
+
+    def invalidate_user(self, email: str) -> None:
+        with self._lock:
+            for token in list(self._by_email.get(email, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._by_email.clear()
+
+    def _remove(self, token: str) -> None:
+        item = self._items.pop(token, None)
+        if item is not None:
+            tokens = self._by_email.get(item.email)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_email[item.email]
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+def invalidate_user(email: str) -> None:
+    # Call after changing anything a Principal carries (verified flag, profile)
+    # or the user's password, so cached sessions re-read the user
+    token_cache.invalidate_user(email)
+
+
+def _validate_token(token: str) -> _CachedToken:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -40,8 +153,30 @@ def get_current_user_email(token: str = Depends(oauth2_scheme)) -> str:
         subject: str = payload.get("sub")
         if subject is None:
             raise credentials_exception
-        return subject
     except JWTError:
         raise credentials_exception
+    exp = payload.get("exp")
+    return token_cache.put(token, subject, float(exp) if exp is not None else time.time() + TOKEN_CACHE_TTL)
+
+
+async def get_current_user_email(token: str = Depends(oauth2_scheme)) -> str:
+    return _validate_token(token).email
+
+
+def _load_principal(email: str) -> Optional[Principal]:
+    with Session(get_engine()) as session:
+        user = session.exec(select(UserModel).where(UserModel.email == email)).first()
+        if not user:
+            return None
+        return Principal(id=user.id, email=user.email, verified=user.verified,
+                         first_name=user.first_name, last_name=user.last_name, phone=user.phone)
 
 
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    cached = _validate_token(token)
+    if cached.principal is None:
+        principal = await run_in_threadpool(_load_principal, cached.email)
+        if principal is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        cached.principal = principal
+    return cached.principal
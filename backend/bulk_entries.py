@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from auth import get_current_user_email
+from changes import next_version, note_change, record_purges
+from db import get_session
+from entry_cache import note_bulk_write
+from jobs import job_worker
+from models import Entry as EntryModel
+from notifications import enqueue_status_change
+from queries import MAX_PAGE_SIZE
+from schemas import EntryCreate, EntryUpdate
+from serializers import entry_from_payload, entry_update_values, serialize_entries
+from signed_urls import resolve_waiver_urls
+
+
+# Set-based versions of the single-entry routes: each request is one INSERT,
+# UPDATE or DELETE over all the ids in a single transaction. Must be included
+# before the /entries/{entry_id} routes so "batch" is not taken for an id.
+router = APIRouter()
+
+MAX_BATCH_SIZE = MAX_PAGE_SIZE
+INSERT_COLUMNS = [c.key for c in EntryModel.__table__.columns if c.key != "id"]
+
+
+class BatchCreateRequest(BaseModel):
+    items: List[EntryCreate] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchIdsRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchUpdateRequest(BatchIdsRequest):
+    changes: EntryUpdate
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: str
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    count: int
+
+
+def _results(ids: List[str], found: set, status: str) -> dict:
+    results = [{"id": i, "status": status if i in found else "not_found"} for i in ids]
+    return {"results": results, "count": len(found)}
+
+
+def _existing_ids(session: Session, ids: List[str]) -> set:
+    # Locks the rows on Postgres so the following statement sees the same set
+    stmt = select(EntryModel.public_id).where(EntryModel.public_id.in_(ids)).with_for_update()
+    return set(session.exec(stmt).all())
+
+
+@router.post("/entries/batch", response_model=dict)
+def batch_create_entries(req: BatchCreateRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    rows = [entry_from_payload(item) for item in req.items]
+    version = next_version(session.connection())
+    for row in rows:
+        row.version = version
+    # A Core executemany is sent as one multi-row INSERT; the ORM would insert
+    # row by row to fetch generated ids, which the API does not expose
+    session.execute(insert(EntryModel), [{k: getattr(r, k) for k in INSERT_COLUMNS} for r in rows])
+    note_change(session, "created", [r.public_id for r in rows], version)
+    note_bulk_write(session, [r.public_id for r in rows])
+    session.commit()
+    entries = serialize_entries(rows, resolve_waiver_urls(rows))
+    return {
+        "results": [{"index": i, "id": e["id"], "status": "created"} for i, e in enumerate(entries)],
+        "count": len(entries),
+        "entries": entries,
+    }
+
+
+@router.patch("/entries/batch", response_model=BatchResponse)
+def batch_update_entries(req: BatchUpdateRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    ids = list(dict.fromkeys(req.ids))
+    values = entry_update_values(req.changes)
+    if "status" in values:
+        # Entries whose status actually changes get a notification job
+        stmt = (select(EntryModel.public_id, EntryModel.status, EntryModel.customerName, EntryModel.customerEmail)
+                .where(EntryModel.public_id.in_(ids)).with_for_update())
+        rows = session.exec(stmt).all()
+        found = {r.public_id for r in rows}
+        for r in rows:
+            if r.status != values["status"]:
+                enqueue_status_change(session, r, values["status"])
+    else:
+        found = _existing_ids(session, ids)
+    if found:
+        values["version"] = next_version(session.connection())
+        session.exec(update(EntryModel).where(EntryModel.public_id.in_(found)).values(**values))
+        note_change(session, "updated", found, values["version"])
+        note_bulk_write(session, found)
+    session.commit()
+    job_worker.wake()
+    return _results(ids, found, "updated")
+
+
+@router.post("/entries/batch/delete", response_model=BatchResponse)
+def batch_delete_entries(req: BatchIdsRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    ids = list(dict.fromkeys(req.ids))
+    found = _existing_ids(session, ids)
+    if found:
+        now = datetime.utcnow()
+        version = next_version(session.connection())
+        session.exec(update(EntryModel).where(EntryModel.public_id.in_(found))
+                     .values(deleted=True, deletedAt=now, updatedAt=now, version=version))
+        note_change(session, "deleted", found, version)
+        note_bulk_write(session, found)
+    session.commit()
+    return _results(ids, found, "deleted")
+
+
+@router.post("/entries/batch/restore", response_model=BatchResponse)
+def batch_restore_entries(req: BatchIdsRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    ids = list(dict.fromkeys(req.ids))
+    found = _existing_ids(session, ids)
+    if found:
+        version = next_version(session.connection())
+        session.exec(update(EntryModel).where(EntryModel.public_id.in_(found))
+                     .values(deleted=False, deletedAt=None, updatedAt=datetime.utcnow(), version=version))
+        note_change(session, "restored", found, version)
+        note_bulk_write(session, found)
+    session.commit()
+    return _results(ids, found, "restored")
+
+
+@router.post("/entries/batch/purge", response_model=BatchResponse)
+def batch_purge_entries(req: BatchIdsRequest, current_user: str = Depends(get_current_user_email), session: Session = Depends(get_session)) -> dict:
+    ids = list(dict.fromkeys(req.ids))
+    found = _existing_ids(session, ids)
+    if found:
+        version = next_version(session.connection())
+        session.exec(delete(EntryModel).where(EntryModel.public_id.in_(found)))
+        record_purges(session.connection(), found, version)
+        note_change(session, "purged", found, version)
+        note_bulk_write(session, found)
+    session.commit()
+    return _results(ids, found, "purged")
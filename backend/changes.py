@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, insert, inspect, select, tuple_, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session as OrmSession
+
+from models import ChangeCounter, Entry as EntryModel, PurgedEntry
+
+
+# Every write to an entry stamps it with the next value of a single counter
+# row. The UPDATE on that row holds its lock until commit, so versions become
+# visible in increasing order and a client that has seen version N has seen
+# every change up to N. All rows written in one transaction share a version.
+ENTRY_COUNTER = "entry"
+
+
+def next_version(conn: Connection) -> int:
+    conn.execute(update(ChangeCounter).where(ChangeCounter.name == ENTRY_COUNTER).values(value=ChangeCounter.value + 1))
+    return conn.execute(select(ChangeCounter.value).where(ChangeCounter.name == ENTRY_COUNTER)).scalar_one()
+
+
+def current_version(conn: Connection) -> int:
+    return conn.execute(select(ChangeCounter.value).where(ChangeCounter.name == ENTRY_COUNTER)).scalar_one()
+
+
+def record_purges(conn: Connection, public_ids: Iterable[str], version: int) -> None:
+    now = datetime.utcnow()
+    rows = [{"public_id": i, "version": version, "purgedAt": now} for i in public_ids]
+    if rows:
+        conn.execute(insert(PurgedEntry), rows)
+
+
+def ensure_counter(conn: Connection) -> None:
+    if conn.execute(select(ChangeCounter.value).where(ChangeCounter.name == ENTRY_COUNTER)).first() is None:
+        start = conn.execute(select(func.coalesce(func.max(EntryModel.version), 0))).scalar_one()
+        conn.execute(insert(ChangeCounter).values(name=ENTRY_COUNTER, value=start))
+
+
+def note_change(session: OrmSession, kind: str, public_ids: Iterable[str], version: int) -> None:
+    # Queues a live event ("created", "updated", "deleted", "restored",
+    # "purged") for the session's transaction; live.py sends it on commit
+    ids = list(public_ids)
+    if ids:
+        session.info.setdefault("entry_events", []).append({"type": kind, "ids": ids, "version": version})
+
+
+def pending_changes(session: OrmSession, clear: bool = False) -> list:
+    events = session.info.get("entry_events", [])
+    if clear:
+        session.info.pop("entry_events", None)
+    return events
+
+
+def _change_kind(session: OrmSession, row: EntryModel) -> str:
+    if row in session.new:
+        return "created"
+    added = inspect(row).attrs.deleted.history.added
+    if added:
+        return "deleted" if added[0] else "restored"
+    return "updated"
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _stamp_entry_versions(session, flush_context, instances) -> None:
+    # Covers every ORM write (sync and async sessions); set-based statements
+    # in bulk_entries.py call next_version themselves
+    written = [o for o in session.new if isinstance(o, EntryModel)]
+    written += [o for o in session.dirty if isinstance(o, EntryModel) and session.is_modified(o)]
+    purged = [o for o in session.deleted if isinstance(o, EntryModel)]
+    if not written and not purged:
+        return
+    conn = session.connection()
+    version = next_version(conn)
+    kinds = {}
+    for row in written:
+        row.version = version
+        kinds.setdefault(_change_kind(session, row), []).append(row.public_id)
+    for kind, ids in kinds.items():
+        note_change(session, kind, ids, version)
+    record_purges(conn, [row.public_id for row in purged], version)
+    note_change(session, "purged", [row.public_id for row in purged], version)
+
+
+def encode_sync_cursor(version: int, row_id: Optional[int]) -> str:
+    raw = json.dumps([version, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> Tuple[int, Optional[int]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(version), (int(row_id) if row_id is not None else None)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def changed_entries(conn: Connection, columns, cursor: Optional[str], since: Optional[datetime], limit: int):
+    # Returns (rows, purged_ids, next_cursor, has_more). The counter is read
+    # first: everything at or below it is committed, so nothing is skipped.
+    upto = current_version(conn)
+    after_version, after_id = decode_sync_cursor(cursor) if cursor else (None, None)
+
+    stmt = select(*columns).where(EntryModel.version <= upto)
+    purges = select(PurgedEntry.public_id).where(PurgedEntry.version <= upto)
+    if after_version is not None:
+        if after_id is None:
+            stmt = stmt.where(EntryModel.version > after_version)
+        else:
+            stmt = stmt.where(tuple_(EntryModel.version, EntryModel.id) > tuple_(after_version, after_id))
+        purges = purges.where(PurgedEntry.version > after_version)
+    elif since is not None:
+        stmt = stmt.where(EntryModel.updatedAt >= since)
+        purges = purges.where(PurgedEntry.purgedAt >= since)
+    rows = conn.execute(stmt.order_by(EntryModel.version, EntryModel.id).limit(limit + 1)).all()
+
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        last = rows[-1]
+        # Purges up to the last version on this page; later pages start above it
+        purges = purges.where(PurgedEntry.version <= last.version)
+        next_cursor = encode_sync_cursor(last.version, last.id)
+    else:
+        next_cursor = encode_sync_cursor(upto, None)
+    purged = list(conn.execute(purges.order_by(PurgedEntry.version, PurgedEntry.id)).scalars())
+    return rows, purged, next_cursor, has_more
@@ -1,64 +1,359 @@
-from sqlmodel import SQLModel, Session, create_engine
-from sqlalchemy import text
-from pathlib import Path
+from sqlmodel import Session, create_engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+import logging
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
+from metrics import CallbackMetric, instrument_engine
 load_dotenv()
 
+DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Pool tuning. DB_POOL_MODE=pgbouncer is for Supabase's transaction-mode
+# pooler: no client-side pooling and no server-side prepared statements.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Serve the entry CRUD routes from an async engine (asyncpg / aiosqlite)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
 
+logger = logging.getLogger(__name__)
 
-# Load environment variables from .env
 
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
 
-# Fetch variables
-USER = os.getenv("user")
-PASSWORD = os.getenv("password")
-HOST = os.getenv("host")
-PORT = os.getenv("port")
-DBNAME = os.getenv("dbname")
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
 
-# Construct the SQLAlchemy connection string
-DATABASE_URL = os.getenv("DATABASE_URL")
+    def checked_out(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
 
-engine = create_engine(DATABASE_URL)
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use -= 1
 
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
 
-try:
-    with engine.connect() as connection:
-        print("Connection successful!")
-except Exception as e:
-    print(f"Failed to connect: {e}")
 
-"""
-_db_url = os.getenv("DATABASE_URL")
-if _db_url:
-    engine = create_engine(_db_url, echo=False)
-else:
-    DB_PATH = Path(__file__).with_name("app.db")
-    engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
-    
-"""
+pool_stats = PoolStats()
 
-def init_db() -> None:
-    import models  # noqa: F401
-    SQLModel.metadata.create_all(engine)
-    # Minimal migration: ensure waiverUrl column exists (Postgres)
-    try:
-        with engine.begin() as conn:
-            conn.execute(text('ALTER TABLE "entry" ADD COLUMN IF NOT EXISTS "waiverUrl" TEXT'))
-            conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS "verified" BOOLEAN DEFAULT FALSE'))
-            # Ensure soft-delete columns exist
-            conn.execute(text('ALTER TABLE "entry" ADD COLUMN IF NOT EXISTS "deleted" BOOLEAN DEFAULT FALSE'))
-            conn.execute(text('ALTER TABLE "entry" ADD COLUMN IF NOT EXISTS "deletedAt" TIMESTAMP NULL'))
-            # Ensure numberOfPairs column exists (default 1)
-            conn.execute(text('ALTER TABLE "entry" ADD COLUMN IF NOT EXISTS "numberOfPairs" INTEGER DEFAULT 1'))
-    except Exception:
-        # Safe to ignore if DB is not Postgres or lacks privileges
+CallbackMetric("db_pool_connections_in_use", "Connections checked out of the pool.", "gauge",
+               lambda: pool_stats.snapshot()["in_use"])
+CallbackMetric("db_pool_checkouts_total", "Connections checked out of the pool.", "counter",
+               lambda: pool_stats.snapshot()["checkouts"])
+CallbackMetric("db_pool_timeouts_total", "Pool checkouts that timed out.", "counter",
+               lambda: pool_stats.snapshot()["timeouts"])
+CallbackMetric("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection.", "counter",
+               lambda: pool_stats.snapshot()["wait_seconds_total"])
+
+
+class _TimedPoolMixin:
+    # Times how long callers block waiting for a pooled connection
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _queue_pool_kwargs(poolclass) -> dict:
+    return dict(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+
+def _track_pool(sync_engine: Engine) -> None:
+    event.listen(sync_engine, "checkout", lambda *_: pool_stats.checked_out())
+    event.listen(sync_engine, "checkin", lambda *_: pool_stats.checked_in())
+
+
+def create_db_engine(url: Optional[str] = None, mode: Optional[str] = None) -> Engine:
+    url = make_url(url or DATABASE_URL)
+    mode = mode or DB_POOL_MODE
+    kwargs = {"pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args = {}
+    if url.get_backend_name() == "sqlite":
+        connect_args["check_same_thread"] = False
+    elif mode == "pgbouncer":
+        kwargs["poolclass"] = TimedNullPool
+        if url.get_driver_name() == "psycopg":
+            connect_args["prepare_threshold"] = None
+    else:
+        kwargs.update(_queue_pool_kwargs(TimedQueuePool))
+    new_engine = create_engine(url, connect_args=connect_args, **kwargs)
+    _track_pool(new_engine)
+    instrument_engine(new_engine)
+    return new_engine
+
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def create_async_db_engine(url: Optional[str] = None, mode: Optional[str] = None) -> AsyncEngine:
+    url = make_url(url or DATABASE_URL)
+    backend = url.get_backend_name()
+    url = url.set(drivername=ASYNC_DRIVERS.get(backend, url.drivername))
+    mode = mode or DB_POOL_MODE
+    kwargs = {"pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args = {}
+    if backend == "sqlite":
+        # aiosqlite: keep SQLAlchemy's default pool
         pass
+    elif mode == "pgbouncer":
+        # asyncpg caches prepared statements per connection, which breaks
+        # behind a transaction-mode pooler
+        kwargs["poolclass"] = NullPool
+        connect_args["statement_cache_size"] = 0
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    else:
+        kwargs.update(_queue_pool_kwargs(TimedAsyncQueuePool))
+    new_engine = create_async_engine(url, connect_args=connect_args, **kwargs)
+    _track_pool(new_engine.sync_engine)
+    instrument_engine(new_engine.sync_engine)
+    return new_engine
+
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    # Created on first use so imports (and serverless cold starts) stay cheap
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+    return _engine
+
+
+_async_engine: Optional[AsyncEngine] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_db_engine()
+    return _async_engine
+
+
+def __getattr__(name):
+    # Keeps `db.engine` working for callers while creating it lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(name)
+
+
+def pool_status() -> dict:
+    engine = get_engine()
+    status = {"mode": type(engine.pool).__name__, **pool_stats.snapshot()}
+    if isinstance(engine.pool, QueuePool):
+        status.update(
+            size=engine.pool.size(),
+            checked_in=engine.pool.checkedin(),
+            overflow=engine.pool.overflow(),
+        )
+    return status
+
+
+# Partial/composite indexes behind the hot entry queries in api/main.py.
+# {false}/{true} are rendered per dialect so the predicates match the boolean
+# literals SQLAlchemy emits for `EntryModel.deleted == false()`.
+ENTRY_INDEXES = [
+    # Dashboard list, keyset-paginated on (createdAt, id)
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_created" ON "entry" ("createdAt", "id") WHERE "deleted" = {false}',
+    # Dashboard filtered by status / assignee
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_status_created" ON "entry" ("status", "createdAt", "id") WHERE "deleted" = {false}',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_assignee_created" ON "entry" ("assignedTo", "createdAt", "id") WHERE "deleted" = {false}',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_assignee_status" ON "entry" ("assignedTo", "status") WHERE "deleted" = {false}',
+    # Trash view
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_trash_created" ON "entry" ("createdAt", "id") WHERE "deleted" = {true}',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_deleted_at" ON "entry" ("deletedAt") WHERE "deleted" = {true}',
+    # Delta sync, by change version or by updatedAt
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_version" ON "entry" ("version", "id")',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_updated_at" ON "entry" ("updatedAt")',
+    # Completed-per-day throughput in /stats
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_completed" ON "entry" ("completedAt") WHERE "deleted" = {false}',
+]
+
+# Expression indexes over the JSONB columns backing the serviceDetails filters
+JSON_INDEXES = [
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_qc_passed" ON "entry" ((("serviceDetails" ->> \'qcPassed\')::boolean)) WHERE "deleted" = {false}',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_live_service_type" ON "entry" ((("serviceDetails" ->> \'serviceType\')::varchar)) WHERE "deleted" = {false}',
+]
+
+# Text searched by /entries/search: the customer and item fields, plus the
+# phone with its separators removed so digit fragments match. Index and query
+# must use the same expression for Postgres to match them.
+SEARCH_DOCUMENT = (
+    """coalesce("customerName", '') || ' ' || coalesce("customerPhone", '') || ' ' || """
+    """regexp_replace(coalesce("customerPhone", ''), '[^0-9]', '', 'g') || ' ' || """
+    """coalesce("customerEmail", '') || ' ' || coalesce("itemDescription", '') || ' ' || coalesce("deliveryAddress", '')"""
+)
+
+# Trigram index for substring matches (ILIKE '%fragment%'), tsvector index for
+# word-prefix matches of one and two letter terms
+SEARCH_INDEXES = [
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_search_tsv" ON "entry" USING gin (to_tsvector(\'simple\', ' + SEARCH_DOCUMENT + ')) WHERE "deleted" = {false}',
+]
+# Only where the server ships pg_trgm; search.py falls back to the tsvector
+# index without it
+TRIGRAM_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX {concurrently} IF NOT EXISTS "ix_entry_search_trgm" ON "entry" USING gin ((' + SEARCH_DOCUMENT + ') gin_trgm_ops) WHERE "deleted" = {false}',
+]
+
+# SQLite: an FTS5 table with the trigram tokenizer, kept in step by triggers
+SQLITE_SEARCH_DOCUMENT = (
+    """coalesce({row}."customerName", '') || ' ' || coalesce({row}."customerPhone", '') || ' ' || """
+    """replace(replace(replace(replace(replace(coalesce({row}."customerPhone", ''), ' ', ''), '-', ''), '(', ''), ')', ''), '+', '') || ' ' || """
+    """coalesce({row}."customerEmail", '') || ' ' || coalesce({row}."itemDescription", '') || ' ' || coalesce({row}."deliveryAddress", '')"""
+)
+SQLITE_SEARCH_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS "entry_search_ai" AFTER INSERT ON "entry" WHEN new."deleted" = 0 BEGIN '
+    'INSERT INTO "entry_search" (rowid, doc) VALUES (new."id", ' + SQLITE_SEARCH_DOCUMENT.format(row="new") + '); END',
+    'CREATE TRIGGER IF NOT EXISTS "entry_search_ad" AFTER DELETE ON "entry" BEGIN '
+    'DELETE FROM "entry_search" WHERE rowid = old."id"; END',
+    'CREATE TRIGGER IF NOT EXISTS "entry_search_au" AFTER UPDATE OF "customerName", "customerPhone", "customerEmail", '
+    '"itemDescription", "deliveryAddress", "deleted" ON "entry" BEGIN '
+    'DELETE FROM "entry_search" WHERE rowid = old."id"; '
+    'INSERT INTO "entry_search" (rowid, doc) SELECT new."id", ' + SQLITE_SEARCH_DOCUMENT.format(row="new") + ' WHERE new."deleted" = 0; END',
+]
+
+INDEX_NAME = re.compile(r'IF NOT EXISTS "(\w+)"')
+
+
+def drop_invalid_indexes(conn, names) -> None:
+    # A CREATE INDEX CONCURRENTLY that failed leaves an INVALID index behind,
+    # which IF NOT EXISTS would then skip on every later run
+    invalid = conn.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(:names)"
+    ), {"names": list(names)}).scalars().all()
+    for name in invalid:
+        logger.warning("Dropping invalid index %s before rebuilding it", name)
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def ensure_indexes() -> None:
+    # Raises on the first failure, so the migration that calls it is not
+    # recorded and runs again
+    engine = get_engine()
+    postgres = engine.dialect.name == "postgresql"
+    params = {
+        # Build without blocking writes on the live table (needs autocommit)
+        "concurrently": "CONCURRENTLY" if postgres else "",
+        "false": "false" if postgres else "0",
+        "true": "true" if postgres else "1",
+    }
+    indexes = ENTRY_INDEXES + (JSON_INDEXES + SEARCH_INDEXES if postgres else [])
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if postgres:
+            if conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first():
+                indexes += TRIGRAM_INDEXES
+            else:
+                logger.warning("pg_trgm is not available on this server; skipping the trigram search index")
+            drop_invalid_indexes(conn, [m.group(1) for m in map(INDEX_NAME.search, indexes) if m])
+        for ddl in indexes:
+            conn.execute(text(ddl.format(**params)))
+    if engine.dialect.name == "sqlite":
+        ensure_sqlite_search()
+
+
+def sqlite_search_available() -> bool:
+    with get_engine().connect() as conn:
+        return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'entry_search'")).first() is not None
+
+
+def ensure_sqlite_search() -> None:
+    # Needs FTS5 with the trigram tokenizer (SQLite 3.34+); without it search
+    # falls back to LIKE over the columns
+    try:
+        with get_engine().begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'entry_search'")).first()
+            if not exists:
+                conn.execute(text('CREATE VIRTUAL TABLE "entry_search" USING fts5(doc, tokenize=\'trigram\')'))
+                conn.execute(text(
+                    'INSERT INTO "entry_search" (rowid, doc) SELECT "id", '
+                    + SQLITE_SEARCH_DOCUMENT.format(row='"entry"') + ' FROM "entry" WHERE "deleted" = 0'
+                ))
+            for ddl in SQLITE_SEARCH_TRIGGERS:
+                conn.execute(text(ddl))
+    except Exception as e:
+        logger.warning("Search table creation failed: %s", e)
+
+
+def init_db() -> None:
+    # Applies pending schema migrations; see migrations.py
+    from migrations import run_migrations
+    run_migrations()
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+
+async def get_async_session():
+    # No expiry on commit: reloading attributes lazily is not possible in async code
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
         yield session
 
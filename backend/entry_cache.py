@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as OrmSession
+from starlette.concurrency import run_in_threadpool
+
+from etags import etag_matches, not_modified, set_etag
+from metrics import Counter
+from models import Entry as EntryModel
+from queries import EntryFilters, PageParams, set_page_headers
+from signed_urls import WAIVER_URL_REFRESH_MARGIN
+
+
+# "memory" (per process LRU), "redis" (shared, needs the redis package) or "off"
+ENTRY_CACHE = os.environ.get("ENTRY_CACHE", "memory").lower()
+ENTRY_CACHE_SIZE = int(os.environ.get("ENTRY_CACHE_SIZE", "2048"))
+# Writes invalidate their own process's memory cache (or the shared Redis one)
+# straight away; this bounds how stale another process's memory cache can be
+ENTRY_CACHE_TTL = float(os.environ.get("ENTRY_CACHE_TTL", "10"))
+ENTRY_CACHE_REDIS_URL = os.environ.get("ENTRY_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# With a shared backend, how long a process waits for another one's load of the
+# same key before querying itself
+ENTRY_CACHE_LOCK_WAIT = float(os.environ.get("ENTRY_CACHE_LOCK_WAIT", "2"))
+
+PREFIX = "entries:"
+# Columns whose values tag cached lists, in the order a list filter picks its tag
+TAG_FIELDS = ("status", "assignedTo", "markedAs", "deliveryOption")
+# Bumped when rows were written without the ORM seeing their values (the
+# set-based statements in bulk_entries.py): every cached list goes
+ALL_LISTS = "lists"
+# Generation tokens outlive cached values; one that expires is simply replaced
+GENERATION_TTL = 86400
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter("entry_cache_requests_total", "Entry cache lookups by result.", ("cache", "result"))
+
+
+class MemoryBackend:
+    # Per process LRU with per-key expiry
+    blocking = False
+    shared = False
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] is not None and item[0] < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item[1]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._get(k) for k in keys]
+
+    def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        self._items[key] = (time.monotonic() + ttl if ttl else None, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class RedisBackend:
+    # Anything with redis-py's get/mget/set(ex, nx)/delete: a redis.Redis, a
+    # client for a Redis-compatible server, or scripts/fake_redis.py in checks
+    blocking = True
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return self.client.mget(keys)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(key, value, ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{PREFIX}*"):
+            self.client.delete(key)
+
+
+def make_backend():
+    if ENTRY_CACHE == "redis":
+        import redis  # optional; only needed for ENTRY_CACHE=redis
+
+        return RedisBackend(redis.Redis.from_url(ENTRY_CACHE_REDIS_URL))
+    return MemoryBackend(ENTRY_CACHE_SIZE)
+
+
+def pack(etag: str, cursor: Optional[str], body: bytes) -> bytes:
+    return json.dumps([etag, cursor]).encode() + b"\n" + body
+
+
+def unpack(value: bytes) -> Tuple[str, Optional[str], bytes]:
+    head, _, body = value.partition(b"\n")
+    etag, cursor = json.loads(head)
+    return etag, cursor, body
+
+
+def cached_response(request: Request, value: bytes, page: Optional[PageParams] = None) -> Response:
+    etag, cursor, body = unpack(value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = Response(body, media_type="application/json")
+    if page is not None:
+        set_page_headers(response, page, cursor)
+    return set_etag(response, etag)
+
+
+def list_tag(scope: str, filters: EntryFilters) -> str:
+    # A list can only change when an entry matching its first column filter is
+    # written, before or after the write; lists filtered on JSON fields or
+    # dates alone depend on every write in their scope
+    for field in TAG_FIELDS:
+        value = getattr(filters, field)
+        if value is not None:
+            return f"{scope}:{field}={value}"
+    return f"{scope}:*"
+
+
+def entry_tags(state: dict) -> List[str]:
+    scope = "deleted" if state["deleted"] else "live"
+    return [f"{scope}:*"] + [f"{scope}:{field}={state[field]}" for field in TAG_FIELDS]
+
+
+class EntryCache:
+    # Read-through cache for entry lists and single entries. Keys carry a
+    # generation token per invalidation tag; a write replaces the tokens of the
+    # tags it touches, so every key built from the old ones becomes unreachable.
+    # Tokens are read before the database, so a load that races a write is
+    # stored under the old token and never served.
+    def __init__(self, backend=None, ttl: float = ENTRY_CACHE_TTL, enabled: bool = ENTRY_CACHE != "off"):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._loading_async = {}
+
+    def _backend(self):
+        if self.backend is None:
+            with self._lock:
+                if self.backend is None:
+                    self.backend = make_backend()
+        return self.backend
+
+    # Keys
+
+    def _generations(self, tags: List[str]) -> List[str]:
+        backend = self._backend()
+        keys = [f"{PREFIX}gen:{t}" for t in tags]
+        values = backend.get_many(keys)
+        for i, value in enumerate(values):
+            if value is None:
+                # Unknown or evicted: start a fresh token, never a reused one
+                backend.add(keys[i], uuid.uuid4().hex[:16].encode(), GENERATION_TTL)
+                values[i] = backend.get(keys[i])
+        return [v.decode() if isinstance(v, bytes) else str(v) for v in values]
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        backend = self._backend()
+        for tag in set(tags):
+            backend.set(f"{PREFIX}gen:{tag}", uuid.uuid4().hex[:16].encode(), GENERATION_TTL)
+
+    def list_key(self, scope: str, filters: EntryFilters, page: PageParams) -> str:
+        tag = list_tag(scope, filters)
+        generations = self._generations([tag, ALL_LISTS])
+        params = [sorted(vars(filters).items()), page.limit, page.cursor, page.order,
+                  # The bodies hold signed waiver URLs; same rollover as listing_etag
+                  int(time.time() // WAIVER_URL_REFRESH_MARGIN)]
+        digest = hashlib.sha1(json.dumps(params, default=str).encode()).hexdigest()[:24]
+        return f"{PREFIX}list:{tag}:{'.'.join(generations)}:{digest}"
+
+    def entry_key(self, public_id: str) -> str:
+        generation = self._generations([f"entry:{public_id}"])[0]
+        return f"{PREFIX}one:{public_id}:{generation}:{int(time.time() // WAIVER_URL_REFRESH_MARGIN)}"
+
+    # Reads
+
+    def get_or_load(self, kind: str, key_fn: Callable[[], str], load: Callable[[], bytes]) -> bytes:
+        # Concurrent misses on one key in this process share a single load;
+        # with a shared backend, other processes wait for it too
+        if not self.enabled:
+            return load()
+        try:
+            key = key_fn()
+            value = self._backend().get(key)
+        except Exception:
+            logger.warning("Entry cache unavailable", exc_info=True)
+            CACHE_REQUESTS.inc(kind, "error")
+            return load()
+        if value is not None:
+            CACHE_REQUESTS.inc(kind, "hit")
+            return value
+        with self._lock:
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+        if not leader:
+            CACHE_REQUESTS.inc(kind, "coalesced")
+            return future.result()
+        CACHE_REQUESTS.inc(kind, "miss")
+        try:
+            value = self._load_shared(key, load)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    def _load_shared(self, key: str, load: Callable[[], bytes]) -> bytes:
+        backend = self._backend()
+        lease = f"{key}:loading"
+        leased = False
+        if backend.shared:
+            try:
+                leased = backend.add(lease, b"1", ENTRY_CACHE_LOCK_WAIT + 1)
+                if not leased:
+                    deadline = time.monotonic() + ENTRY_CACHE_LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        time.sleep(0.01)
+                        value = backend.get(key)
+                        if value is not None:
+                            return value
+            except Exception:
+                logger.warning("Entry cache unavailable", exc_info=True)
+        value = load()
+        self._store(key, value, lease if leased else None)
+        return value
+
+    def _store(self, key: str, value: bytes, lease: Optional[str]) -> None:
+        try:
+            backend = self._backend()
+            backend.set(key, value, self.ttl)
+            if lease:
+                backend.delete(lease)
+        except Exception:
+            logger.warning("Entry cache unavailable", exc_info=True)
+
+    async def get_or_load_async(self, kind: str, key_fn: Callable[[], str],
+                                load: Callable[[], Awaitable[bytes]]) -> bytes:
+        # Same as get_or_load for the async routes; a shared backend's network
+        # calls go to the threadpool
+        if not self.enabled:
+            return await load()
+        call = run_in_threadpool if self._backend().blocking else _call
+        try:
+            key = await call(key_fn)
+            value = await call(self._backend().get, key)
+        except Exception:
+            logger.warning("Entry cache unavailable", exc_info=True)
+            CACHE_REQUESTS.inc(kind, "error")
+            return await load()
+        if value is not None:
+            CACHE_REQUESTS.inc(kind, "hit")
+            return value
+        future = self._loading_async.get(key)
+        if future is not None:
+            CACHE_REQUESTS.inc(kind, "coalesced")
+            return await asyncio.shield(future)
+        future = self._loading_async[key] = asyncio.get_running_loop().create_future()
+        CACHE_REQUESTS.inc(kind, "miss")
+        try:
+            value = await load()
+            await call(self._store, key, value, None)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so a load nobody else waited for is not reported
+            future.exception()
+            raise
+        finally:
+            del self._loading_async[key]
+
+    def clear(self) -> None:
+        self._backend().clear()
+
+
+async def _call(fn, *args):
+    return fn(*args)
+
+
+entry_cache = EntryCache()
+
+
+# Invalidation. Tags are collected while the session flushes, from the values
+# each written entry had before and after, and applied once it commits.
+
+def _state(row: EntryModel, before: bool) -> Optional[dict]:
+    attrs = inspect(row).attrs
+    state = {}
+    for field in TAG_FIELDS + ("deleted",):
+        history = attrs[field].history
+        if before and history.deleted:
+            state[field] = history.deleted[0]
+        elif history.added or history.unchanged:
+            state[field] = (history.added or history.unchanged)[0]
+        else:
+            return None  # not loaded; the caller falls back to all lists
+    return state
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _collect_entry_tags(session, flush_context, instances) -> None:
+    tags = session.info.setdefault("entry_cache_tags", set())
+    for row, states in (
+        *((o, [_state(o, before=False)]) for o in session.new if isinstance(o, EntryModel)),
+        *((o, [_state(o, before=True), _state(o, before=False)]) for o in session.dirty
+          if isinstance(o, EntryModel) and session.is_modified(o)),
+        *((o, [_state(o, before=True)]) for o in session.deleted if isinstance(o, EntryModel)),
+    ):
+        tags.add(f"entry:{row.public_id}")
+        for state in states:
+            if state is None:
+                tags.add(ALL_LISTS)
+            else:
+                tags.update(entry_tags(state))
+
+
+def note_bulk_write(session: OrmSession, public_ids: Iterable[str]) -> None:
+    # For set-based statements the ORM does not see: drops every cached list
+    tags = session.info.setdefault("entry_cache_tags", set())
+    tags.add(ALL_LISTS)
+    tags.update(f"entry:{i}" for i in public_ids)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_entry_tags(session) -> None:
+    tags = session.info.pop("entry_cache_tags", None)
+    if tags:
+        try:
+            entry_cache.invalidate(tags)
+        except Exception:
+            logger.exception("Entry cache invalidation failed")
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_entry_tags(session) -> None:
+    session.info.pop("entry_cache_tags", None)
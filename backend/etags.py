@@ -0,0 +1,55 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+
+from signed_urls import WAIVER_URL_REFRESH_MARGIN
+
+
+# Suffixes compression.py appends to the ETag of an encoded body
+ENCODING_SUFFIXES = ("-br", "-gzip")
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def listing_etag(request: Request, version: int) -> str:
+    # Every entry write bumps the change counter, so the counter plus the query
+    # string identifies a page. The waiver URLs in the body are re-signed as
+    # they near expiry, so the tag also rolls over once per refresh margin.
+    waiver_epoch = int(time.time() // WAIVER_URL_REFRESH_MARGIN)
+    return make_etag(request.url.path, sorted(request.query_params.multi_items()), version, waiver_epoch)
+
+
+def _strip(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_strip(tag) == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
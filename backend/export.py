@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import false
+from sqlmodel import select
+
+from auth import get_current_user_email
+from db import get_engine
+from models import Entry as EntryModel
+from queries import EntryFilters
+from schemas import ServiceDetails
+from serializers import SYNC_COLUMNS, serialize_change
+from signed_urls import resolve_waiver_urls
+
+
+# Rows fetched from the server-side cursor and written per chunk
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "1000"))
+PHOTO_SEPARATOR = " "
+# Spreadsheets evaluate text cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# serialize_change() keys in order; serviceDetails is spread over one column per
+# ServiceDetails field and the photo lists become one column each
+ENTRY_FIELDS = [
+    "id", "customerName", "customerPhone", "customerEmail", "deliveryAddress", "itemDescription",
+    "shoeCondition", "shoeService", "waiverSigned", "waiverUrl", "beforePhotos", "assignedTo",
+    "needsReglue", "needsPaint", "status", "afterPhotos", "billing", "additionalBilling",
+    "deliveryOption", "markedAs", "numberOfPairs", "createdAt", "updatedAt", "deleted", "deletedAt", "version",
+]
+SERVICE_DETAIL_FIELDS = list(ServiceDetails.model_fields)
+CSV_COLUMNS = ENTRY_FIELDS + [f"serviceDetails.{f}" for f in SERVICE_DETAIL_FIELDS]
+
+router = APIRouter()
+
+
+def _cell(value):
+    if isinstance(value, list):
+        value = PHOTO_SEPARATOR.join(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Customer-entered text must not run as a formula when the export is
+        # opened in Excel or Sheets; the leading quote shows it as text
+        return "'" + value
+    return value
+
+
+def csv_row(entry: dict) -> list:
+    # csv.writer writes None as an empty field
+    details = entry["serviceDetails"] or {}
+    return [_cell(entry[f]) for f in ENTRY_FIELDS] + [_cell(details.get(f)) for f in SERVICE_DETAIL_FIELDS]
+
+
+def export_rows(stmt) -> Iterator[list]:
+    # Chunks of entries from a server-side cursor (psycopg2 named cursor on
+    # Postgres), so memory stays flat however many rows match. Uses its own
+    # connection: request-scoped sessions are closed before the body is sent.
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE).execute(stmt)
+        for rows in result.partitions():
+            waiver_urls = resolve_waiver_urls(rows)
+            yield [serialize_change(r, waiver_urls) for r in rows]
+
+
+def csv_chunks(stmt) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for entries in export_rows(stmt):
+        writer.writerows(csv_row(e) for e in entries)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(stmt) -> Iterator[bytes]:
+    for entries in export_rows(stmt):
+        yield "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode()
+
+
+@router.get("/entries/export")
+def export_entries(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    includeDeleted: bool = False,
+    filters: EntryFilters = Depends(),
+    current_user: str = Depends(get_current_user_email),
+) -> StreamingResponse:
+    # Every matching entry, oldest first, streamed as CSV or NDJSON. Takes the
+    # same filters as GET /entries; soft-deleted entries only with includeDeleted.
+    stmt = filters.apply(select(*SYNC_COLUMNS))
+    if not includeDeleted:
+        stmt = stmt.where(EntryModel.deleted == false())
+    stmt = stmt.order_by(EntryModel.createdAt, EntryModel.id)
+    filename = f"entries-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    if format == "csv":
+        body, media_type = csv_chunks(stmt), "text/csv; charset=utf-8"
+    else:
+        body, media_type = ndjson_chunks(stmt), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
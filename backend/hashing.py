@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from fastapi import HTTPException
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor; hashes made with a different cost are replaced on the next login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Processes that run bcrypt for the API; 0 hashes in threads of the API process instead.
+# 0 by default on Vercel (VERCEL=1), where functions cannot spawn a process pool
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "0" if os.getenv("VERCEL") else str(min(4, os.cpu_count() or 1))))
+# Hash requests queued or running at once; past this, logins get a 503
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", str(max(1, HASH_WORKERS) * 16)))
+# How long a blocking (sync) caller waits for a queue slot
+HASH_QUEUE_TIMEOUT = float(os.environ.get("HASH_QUEUE_TIMEOUT", "10"))
+
+_pwd_context: Optional["CryptContext"] = None
+_pwd_context_lock = threading.Lock()
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+
+def get_pwd_context() -> "CryptContext":
+    # passlib and bcrypt are loaded on the first hash, not when the app starts
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    return get_pwd_context().verify_and_update(password, password_hash)
+
+
+def start_executor() -> None:
+    # Called at app startup. The process pool is only used by the server:
+    # spawned workers re-import __main__, which plain scripts do not guard.
+    global _executor
+    with _executor_lock:
+        if _executor is None and HASH_WORKERS > 0:
+            # spawn, not fork: the parent holds DB pools and worker threads
+            try:
+                _executor = ProcessPoolExecutor(HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError) as e:
+                # No /dev/shm for the pool's semaphores; get_executor hashes in threads
+                logger.warning("Hash process pool unavailable, hashing in threads: %s", e)
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max(1, os.cpu_count() or 1), thread_name_prefix="hash")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _acquire_slot(wait: bool) -> None:
+    # Async callers never wait here: a full queue sheds load straight away
+    acquired = _slots.acquire(timeout=HASH_QUEUE_TIMEOUT) if wait else _slots.acquire(blocking=False)
+    if not acquired:
+        raise HTTPException(status_code=503, detail="Too many sign-ins in progress, please retry", headers={"Retry-After": "1"})
+
+
+def _submit(wait: bool, fn, *args):
+    _acquire_slot(wait)
+    try:
+        future = get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def hash_password(password: str) -> str:
+    # Blocks the calling thread only; the hashing itself runs in the pool
+    return _submit(True, _hash, password).result()
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return _submit(True, _verify_and_update, password, password_hash).result()[0]
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(False, _hash, password))
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    # Returns (valid, new_hash); new_hash is set when the stored hash used another cost
+    return await asyncio.wrap_future(_submit(False, _verify_and_update, password, password_hash))
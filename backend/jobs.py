@@ -0,0 +1,230 @@
+import logging
+import os
+import random
+import secrets
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, select
+
+from db import get_engine
+from models import Job
+
+
+# Worker threads started with the app. None by default on Vercel (VERCEL=1), which
+# freezes the process between requests; drain the queue from a cron job there
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0" if os.getenv("VERCEL") else "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "8"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "5"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+# A running job whose worker has not finished within this many seconds is
+# assumed lost (process killed) and becomes claimable again
+JOB_LOCK_TIMEOUT = float(os.getenv("JOB_LOCK_TIMEOUT", "300"))
+# Bearer secret for GET /jobs/drain; Vercel Cron sends CRON_SECRET. Unset, the route is a 404
+JOB_DRAIN_SECRET = os.getenv("CRON_SECRET")
+# Jobs run per /jobs/drain request, to stay inside the function timeout
+JOB_DRAIN_LIMIT = int(os.getenv("JOB_DRAIN_LIMIT", "10"))
+
+HANDLERS: Dict[str, Callable[[dict], None]] = {}
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    # Raised by handlers for failures a retry cannot fix; the job goes straight to dead
+    pass
+
+
+def handler(kind: str):
+    def register(fn: Callable[[dict], None]) -> Callable[[dict], None]:
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(session, kind: str, payload: dict, delay: float = 0, max_attempts: Optional[int] = None) -> Job:
+    # Adds the job to the caller's session without committing, so it is stored
+    # in the same transaction as the change that caused it
+    job = Job(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    session.add(job)
+    return job
+
+
+def backoff_seconds(attempts: int) -> float:
+    # Exponential backoff with jitter: ~base, 2*base, 4*base, ... capped at JOB_BACKOFF_MAX
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_jobs(session: Session, worker_id: str, limit: int = 1) -> List[Job]:
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(Job.status == "pending", Job.run_at <= now),
+        and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT)),
+    )
+    # SKIP LOCKED lets workers on Postgres pass over each other's rows; the
+    # conditional UPDATE below makes the claim safe where it is not supported
+    candidates = session.exec(
+        select(Job.id, Job.status).where(claimable).order_by(Job.run_at).limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    claimed = []
+    for job_id, status in candidates:
+        result = session.exec(
+            update(Job).where(Job.id == job_id, Job.status == status, claimable)
+            .values(status="running", locked_at=now, locked_by=worker_id,
+                    attempts=Job.attempts + 1, updated_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    session.commit()
+    if not claimed:
+        return []
+    return list(session.exec(select(Job).where(Job.id.in_(claimed))).all())
+
+
+def finish_job(session: Session, job: Job, error: Optional[BaseException] = None) -> None:
+    now = datetime.utcnow()
+    if error is None:
+        session.delete(job)
+    else:
+        job.last_error = "".join(traceback.format_exception_only(type(error), error)).strip()[:2000]
+        job.locked_at = None
+        job.locked_by = None
+        job.updated_at = now
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = "dead"
+            logger.error("Job is dead", extra={"job_id": job.id, "kind": job.kind, "attempts": job.attempts,
+                                               "error": job.last_error})
+        else:
+            job.status = "pending"
+            job.run_at = now + timedelta(seconds=backoff_seconds(job.attempts))
+        session.add(job)
+    session.commit()
+
+
+def run_job(session: Session, job: Job) -> bool:
+    fn = HANDLERS.get(job.kind)
+    try:
+        if fn is None:
+            raise PermanentJobError(f"No handler for job kind {job.kind!r}")
+        fn(job.payload)
+    except Exception as e:
+        finish_job(session, job, e)
+        return False
+    finish_job(session, job)
+    return True
+
+
+def run_pending(limit: int = 100, worker_id: str = "inline") -> int:
+    # Runs jobs that are due right now in the calling thread; returns how many ran
+    ran = 0
+    with Session(get_engine()) as session:
+        while ran < limit:
+            jobs = claim_jobs(session, worker_id, 1)
+            if not jobs:
+                break
+            run_job(session, jobs[0])
+            ran += 1
+    return ran
+
+
+def retry_dead(session: Session, job_id: int) -> bool:
+    job = session.get(Job, job_id)
+    if not job or job.status != "dead":
+        return False
+    job.status = "pending"
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    return True
+
+
+class JobWorker:
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wake = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> "JobWorker":
+        if self._threads:
+            return self
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, args=(f"{self._prefix}:{i}",), name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self.wake()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        # Call after committing an enqueue to skip the poll delay
+        with self._wake:
+            self._wake.notify_all()
+
+    def _loop(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                with Session(get_engine()) as session:
+                    jobs = claim_jobs(session, worker_id, 1)
+                    if jobs:
+                        run_job(session, jobs[0])
+                        continue
+            except Exception as e:
+                logger.exception("Job worker %s error: %s", worker_id, e)
+            with self._wake:
+                self._wake.wait(self.poll_interval)
+
+
+job_worker = JobWorker()
+
+
+@router.get("/jobs/drain", include_in_schema=False)
+def drain_jobs(request: Request) -> dict:
+    # Runs due jobs inside the request, for deployments without worker threads
+    if not JOB_DRAIN_SECRET:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "")
+    if not secrets.compare_digest(supplied.encode(), f"Bearer {JOB_DRAIN_SECRET}".encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return {"ran": run_pending(JOB_DRAIN_LIMIT, worker_id=f"drain:{socket.gethostname()}:{os.getpid()}")}
+
+
+if __name__ == "__main__":
+    # Standalone worker process: python jobs.py
+    import time
+
+    import notifications  # noqa: F401  registers the handlers
+    from logs import configure_logging
+
+    configure_logging()
+    job_worker.start()
+    logger.info("Running %d job workers", job_worker.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        job_worker.stop()
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import select as io_select
+import threading
+import time
+from typing import Optional, Set
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session as OrmSession
+
+from auth import create_ticket, get_current_user_email, verify_ticket
+from changes import pending_changes
+from db import get_engine
+
+
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", "100"))
+LIVE_HEARTBEAT = float(os.environ.get("LIVE_HEARTBEAT", "15"))
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", "2000"))
+# Seconds a ticket from POST /entries/events/ticket can be used to open a stream
+LIVE_TICKET_TTL = int(os.environ.get("LIVE_TICKET_TTL", "60"))
+TICKET_AUDIENCE = "entry_events"
+# Relay events through Postgres LISTEN/NOTIFY so every worker process sees
+# writes made by the others. Needs a direct (session mode) connection.
+LIVE_PG_NOTIFY = os.environ.get("LIVE_PG_NOTIFY", "false").lower() in ("1", "true", "yes")
+CHANNEL = "entry_events"
+# NOTIFY payloads must stay under 8000 bytes
+_NOTIFY_LIMIT = 7900
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class Subscriber:
+    def __init__(self, size: int):
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(size)
+        self.resyncs = 0
+
+    def offer(self, event: dict) -> None:
+        # Never blocks the hub: a client that falls a full queue behind loses
+        # its backlog and is told to catch up through GET /entries/sync
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resyncs += 1
+            self.queue.put_nowait({"type": "resync", "version": event.get("version")})
+
+
+class Hub:
+    # In-process fan-out; publish() may be called from any thread
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE, max_subscribers: int = LIVE_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self._loop = loop
+
+    def subscribe(self) -> Subscriber:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HTTPException(status_code=503, detail="Too many live connections")
+        sub = Subscriber(self.queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+
+    def publish(self, event: dict) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(event)
+        else:
+            loop.call_soon_threadsafe(self._fanout, event)
+
+    def _fanout(self, event: dict) -> None:
+        self.published += 1
+        for sub in list(self._subscribers):
+            sub.offer(event)
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "published": self.published,
+                "resyncs": sum(s.resyncs for s in self._subscribers)}
+
+
+hub = Hub()
+
+
+def use_pg_notify() -> bool:
+    return LIVE_PG_NOTIFY and get_engine().dialect.name == "postgresql"
+
+
+def notify_payload(event: dict) -> str:
+    payload = json.dumps(event, separators=(",", ":"))
+    if len(payload) > _NOTIFY_LIMIT:
+        # Too many ids for one notification; clients resync from the version
+        payload = json.dumps({**event, "ids": None}, separators=(",", ":"))
+    return payload
+
+
+class PgListener:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-pg-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        first = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                # A dedicated connection, taken out of the pool for good
+                conn = get_engine().raw_connection()
+                conn.detach()
+                dbapi_conn = conn.dbapi_connection
+                dbapi_conn.autocommit = True
+                dbapi_conn.cursor().execute(f"LISTEN {CHANNEL}")
+                if not first:
+                    # Events may have been missed while reconnecting
+                    hub.publish({"type": "resync", "version": None})
+                first = False
+                while not self._stop.is_set():
+                    if io_select.select([dbapi_conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        hub.publish(json.loads(dbapi_conn.notifies.pop(0).payload))
+            except Exception as e:
+                logger.warning("Live listener error: %s", e)
+                time.sleep(1)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+pg_listener = PgListener()
+
+
+@event.listens_for(OrmSession, "before_commit")
+def _notify_before_commit(session) -> None:
+    _notify_entry_changes(session)
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+def _notify_after_flush(session, flush_context) -> None:
+    # commit() flushes after before_commit, so ORM writes are sent from here
+    _notify_entry_changes(session)
+
+
+def _notify_entry_changes(session) -> None:
+    # NOTIFY is transactional: listeners in every process get it on commit,
+    # and never for a transaction that rolls back
+    if use_pg_notify():
+        events = pending_changes(session, clear=True)
+        if events:
+            conn = session.connection()
+            for e in events:
+                conn.execute(select(func.pg_notify(CHANNEL, notify_payload(e))))
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _publish_entry_changes(session) -> None:
+    for e in pending_changes(session, clear=True):
+        hub.publish(e)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_entry_changes(session) -> None:
+    pending_changes(session, clear=True)
+
+
+def _sse(event: dict) -> str:
+    version = event.get("version")
+    head = f"id: {version}\n" if version is not None else ""
+    return f"{head}event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+@router.post("/entries/events/ticket")
+async def entry_events_ticket(email: str = Depends(get_current_user_email)) -> dict:
+    # EventSource cannot set headers, and the access token must not go in a URL
+    return {"ticket": create_ticket(email, TICKET_AUDIENCE, LIVE_TICKET_TTL), "expiresIn": LIVE_TICKET_TTL}
+
+
+@router.get("/entries/events")
+async def entry_events(request: Request, ticket: Optional[str] = Query(None)) -> StreamingResponse:
+    # Server-sent events for entry writes: created, updated, deleted, restored,
+    # purged (each with ids and version) and resync. Authenticated by a bearer
+    # token or, for EventSource, by ?ticket= from POST /entries/events/ticket.
+    header = request.headers.get("authorization", "")
+    if ticket:
+        verify_ticket(ticket, TICKET_AUDIENCE)
+    elif header.lower().startswith("bearer "):
+        await get_current_user_email(header[7:])
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    sub = hub.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 3000\n: connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def install(app: FastAPI) -> None:
+    app.include_router(router)
+
+    async def start() -> None:
+        hub.bind(asyncio.get_running_loop())
+        if use_pg_notify():
+            pg_listener.start()
+
+    async def stop() -> None:
+        pg_listener.stop()
+        hub.bind(None)
+
+    app.add_event_handler("startup", start)
+    app.add_event_handler("shutdown", stop)
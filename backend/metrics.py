@@ -0,0 +1,296 @@
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Bearer token for GET /metrics; unset, the route is a 404 (the API is public)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+# Requests slower than this are logged with their query counts
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "1.0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Statement kinds used as the `operation` label; anything else is "other"
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "WITH"}
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    # Read when scraped, for values something else already keeps (pool stats)
+    def __init__(self, name: str, help: str, kind: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.kind = kind
+        self.read = read
+
+    def render(self) -> list:
+        try:
+            return [f"{self.name} {_number(self.read())}"]
+        except Exception:
+            logger.exception("Reading metric %s failed", self.name)
+            return []
+
+
+registry = []
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time from request to the last body byte, "
+                            "per route template (event streams excluded).", ("method", "route"))
+IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled.")
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "Database statement execution time.", ("operation",),
+                          QUERY_BUCKETS)
+REQUEST_QUERIES = Histogram("db_queries_per_request", "Database statements executed per request.", ("route",),
+                            COUNT_BUCKETS)
+REQUEST_QUERY_SECONDS = Histogram("db_query_seconds_per_request", "Database time per request.", ("route",))
+OUTBOUND_SECONDS = Histogram("outbound_request_duration_seconds", "Calls to Supabase and Resend.",
+                             ("service", "operation", "outcome"))
+SERIALIZE_SECONDS = Histogram("serialization_seconds_per_request", "Time spent building entry payloads per request.",
+                              ("route",), QUERY_BUCKETS)
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.header() + metric.render()
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "serialize_seconds", "outbound_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.outbound_seconds = 0.0
+
+
+# Set by MetricsMiddleware; copied into threadpool calls, so sync handlers and
+# the SQLAlchemy events they trigger add to the same object
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def record_serialization(seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+@contextmanager
+def outbound(service: str, operation: str):
+    # Times a call to an external service; exceptions count as outcome="error"
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - start
+        OUTBOUND_SECONDS.observe(seconds, service, operation, outcome)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.outbound_seconds += seconds
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in OPERATIONS else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    QUERY_SECONDS.observe(seconds, _operation(statement))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += seconds
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute does not run for a failed statement
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(sync_engine: Engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    # Outermost middleware: latency includes compression and covers the whole body
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+            await send(message)
+
+        IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_PROGRESS.dec()
+            _request_stats.reset(token)
+            self.observe(scope, status, streaming, time.perf_counter() - start, stats)
+
+    def observe(self, scope: Scope, status: int, streaming: bool, seconds: float, stats: RequestStats) -> None:
+        # The matched route's template keeps label values bounded (no ids)
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        method = scope["method"]
+        REQUESTS.inc(method, path, str(status))
+        if streaming:
+            return
+        REQUEST_SECONDS.observe(seconds, method, path)
+        REQUEST_QUERIES.observe(stats.queries, path)
+        REQUEST_QUERY_SECONDS.observe(stats.query_seconds, path)
+        if stats.serialize_seconds:
+            SERIALIZE_SECONDS.observe(stats.serialize_seconds, path)
+        if seconds >= SLOW_REQUEST_SECONDS:
+            logger.warning("Slow request", extra={
+                "method": method, "route": path, "status": status, "seconds": round(seconds, 4),
+                "queries": stats.queries, "query_seconds": round(stats.query_seconds, 4),
+                "outbound_seconds": round(stats.outbound_seconds, 4),
+                "serialize_seconds": round(stats.serialize_seconds, 4),
+            })
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request) -> PlainTextResponse:
+    # Prometheus text format, for this process only (scrape each worker)
+    if not METRICS_TOKEN:
+        return PlainTextResponse("Not Found\n", status_code=404)
+    supplied = request.headers.get("authorization", "")
+    if not secrets.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return PlainTextResponse("Unauthorized\n", status_code=401)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
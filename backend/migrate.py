@@ -0,0 +1,29 @@
+import argparse
+import logging
+import sys
+
+from logs import configure_logging
+from migrations import migration_status, run_migrations
+
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    # Explicit schema migration: python migrate.py (run on deploy when the app
+    # starts with STARTUP_MODE=fast, which skips it); --status lists versions
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations and exit")
+    args = parser.parse_args()
+    configure_logging()
+    if args.status:
+        for migration in migration_status():
+            print(f"{migration['version']:>4}  {'applied' if migration['applied'] else 'pending':<8} {migration['name']}")
+        return 0
+    applied = run_migrations()
+    logger.info("Database schema is up to date", extra={"applied": applied})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
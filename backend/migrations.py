@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, List, Set
+
+from sqlalchemy import (JSON, BigInteger, Boolean, Column, DateTime, Float, Index, Integer, MetaData, String, Table,
+                        inspect, insert, select, text)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from db import ensure_indexes, get_engine
+from models import SchemaMigration
+
+
+# Rows updated per transaction by backfills, so no lock on "entry" is held for long
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "1000"))
+# Postgres advisory lock key held while migrating ("t2lmigr" in ASCII)
+MIGRATION_LOCK_KEY = 0x74326C6D69677200
+# Seconds between attempts to take the lock while another process migrates
+MIGRATION_LOCK_POLL = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    # Transactional migrations run and are recorded in one transaction. The
+    # others (batched backfills, CREATE INDEX CONCURRENTLY) commit as they go
+    # and must be safe to run again if interrupted.
+    transactional: bool = True
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    # Checked first: SQLite has no ADD COLUMN IF NOT EXISTS, and on Postgres
+    # the ALTER takes an exclusive lock even when the column is already there
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}'))
+
+
+def backfill(conn: Connection, table: str, assignment: str, condition: str) -> None:
+    # Walks the primary key in ranges of MIGRATION_BATCH_SIZE ids, one short
+    # transaction each, so writers are never blocked for the whole table
+    with conn.begin():
+        last_id = conn.execute(text(f'SELECT max("id") FROM "{table}"')).scalar() or 0
+    statement = text(f'UPDATE "{table}" SET {assignment} WHERE "id" > :low AND "id" <= :high AND ({condition})')
+    updated = 0
+    for low in range(0, last_id, MIGRATION_BATCH_SIZE):
+        with conn.begin():
+            updated += conn.execute(statement, {"low": low, "high": low + MIGRATION_BATCH_SIZE}).rowcount
+    if updated:
+        logger.info("Backfilled %s", table, extra={"assignment": assignment, "rows": updated})
+
+
+JSON_COLUMNS = ("beforePhotos", "afterPhotos", "serviceDetails")
+
+
+def _decode_json(raw, default):
+    if raw is None:
+        return default
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return default
+
+
+def migrate_json_columns(batch_size: int = MIGRATION_BATCH_SIZE) -> None:
+    # Online TEXT -> JSONB conversion for databases created before the JSON
+    # columns: backfill shadow columns in short batches, then swap them in
+    # with one brief locked transaction. SQLite keeps JSON as TEXT already.
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect() as conn:
+        types = dict(conn.execute(text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'entry'"
+        )).all())
+    pending = [c for c in JSON_COLUMNS if c in types and types[c] != "jsonb"]
+    if not pending:
+        return
+    defaults = {"beforePhotos": [], "afterPhotos": [], "serviceDetails": None}
+    # Rows written by other workers while the backfill runs are caught up
+    # before the swap; leave margin for clock skew between app servers.
+    started = datetime.utcnow() - timedelta(minutes=5)
+    columns = ", ".join(f'"{c}"' for c in pending)
+    assignments = ", ".join(f'"{c}__jsonb" = CAST(:{c} AS JSONB)' for c in pending)
+    update = text(f'UPDATE "entry" SET {assignments} WHERE id = :id')
+
+    def convert(conn, rows) -> None:
+        params = []
+        for row in rows:
+            item = {"id": row[0]}
+            for c, raw in zip(pending, row[1:]):
+                item[c] = json.dumps(_decode_json(raw, defaults[c]))
+            params.append(item)
+        if params:
+            conn.execute(update, params)
+
+    with engine.begin() as conn:
+        for c in pending:
+            conn.execute(text(f'ALTER TABLE "entry" ADD COLUMN IF NOT EXISTS "{c}__jsonb" JSONB'))
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(f'SELECT id, {columns} FROM "entry" WHERE id > :last ORDER BY id LIMIT :n'),
+                {"last": last_id, "n": batch_size},
+            ).all()
+            if not rows:
+                break
+            convert(conn, rows)
+            last_id = rows[-1][0]
+        logger.info("JSON migration: converted rows up to id %d", last_id)
+    with engine.begin() as conn:
+        # Blocks writers (not readers) only for the catch-up and rename
+        conn.execute(text('LOCK TABLE "entry" IN EXCLUSIVE MODE'))
+        rows = conn.execute(
+            text(f'SELECT id, {columns} FROM "entry" WHERE id > :last OR "updatedAt" >= :started'),
+            {"last": last_id, "started": started},
+        ).all()
+        convert(conn, rows)
+        for c in pending:
+            conn.execute(text(f'ALTER TABLE "entry" DROP COLUMN "{c}"'))
+            conn.execute(text(f'ALTER TABLE "entry" RENAME COLUMN "{c}__jsonb" TO "{c}"'))
+
+
+# Tables as the migrations that create them first created them. Written out
+# rather than taken from models.py so a migration's DDL never changes with the
+# models; later changes to these tables are new migrations.
+BASELINE = MetaData()
+Table(
+    "user", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("email", String, nullable=False),
+    Column("password_hash", String, nullable=False),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("phone", String),
+    Column("created_at", DateTime, nullable=False),
+    Column("verified", Boolean, nullable=False),
+    Index("ix_user_email", "email", unique=True),
+)
+Table(
+    "entry", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("public_id", String, nullable=False),
+    Column("customerName", String, nullable=False),
+    Column("customerPhone", String, nullable=False),
+    Column("customerEmail", String, nullable=False),
+    Column("deliveryAddress", String, nullable=False),
+    Column("itemDescription", String, nullable=False),
+    Column("shoeCondition", String, nullable=False),
+    Column("shoeService", String),
+    Column("waiverSigned", Boolean, nullable=False),
+    Column("waiverUrl", String),
+    # JSON kept as text until migration 7
+    Column("beforePhotos", String, nullable=False),
+    Column("assignedTo", String),
+    Column("needsReglue", Boolean),
+    Column("needsPaint", Boolean),
+    Column("status", String, nullable=False),
+    Column("serviceDetails", String),
+    Column("afterPhotos", String, nullable=False),
+    Column("billing", Float),
+    Column("additionalBilling", Float),
+    Column("deliveryOption", String),
+    Column("markedAs", String),
+    Column("numberOfPairs", Integer, nullable=False),
+    Column("createdAt", DateTime, nullable=False),
+    Column("updatedAt", DateTime, nullable=False),
+    Column("deleted", Boolean, nullable=False),
+    Column("deletedAt", DateTime),
+    Index("ix_entry_public_id", "public_id", unique=True),
+)
+
+# Migration 6
+CHANGE_TABLES = MetaData()
+Table(
+    "changecounter", CHANGE_TABLES,
+    Column("name", String, primary_key=True),
+    Column("value", BigInteger, nullable=False),
+)
+Table(
+    "purgedentry", CHANGE_TABLES,
+    Column("id", Integer, primary_key=True),
+    Column("public_id", String, nullable=False),
+    Column("version", BigInteger, nullable=False),
+    Column("purgedAt", DateTime, nullable=False),
+    Index("ix_purgedentry_version", "version"),
+)
+
+# Migration 9
+JOB_TABLES = MetaData()
+Table(
+    "job", JOB_TABLES,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String, nullable=False),
+    Column("payload", JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("max_attempts", Integer, nullable=False),
+    Column("run_at", DateTime, nullable=False),
+    Column("locked_at", DateTime),
+    Column("locked_by", String),
+    Column("last_error", String),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_job_status_run_at", "status", "run_at"),
+)
+
+
+def _create_tables(conn: Connection) -> None:
+    # The schema as of the first release; skips tables that already exist
+    BASELINE.create_all(conn)
+
+
+def _entry_columns(conn: Connection) -> None:
+    # Columns added to tables created before the models had them
+    add_column(conn, "entry", "waiverUrl", "TEXT")
+    add_column(conn, "user", "verified", "BOOLEAN DEFAULT FALSE")
+    add_column(conn, "entry", "deleted", "BOOLEAN DEFAULT FALSE")
+    add_column(conn, "entry", "deletedAt", "TIMESTAMP NULL")
+    add_column(conn, "entry", "numberOfPairs", "INTEGER DEFAULT 1")
+
+
+def _entry_version(conn: Connection) -> None:
+    add_column(conn, "entry", "version", "BIGINT NOT NULL DEFAULT 0")
+
+
+def _entry_completed_at(conn: Connection) -> None:
+    with conn.begin():
+        add_column(conn, "entry", "completedAt", "TIMESTAMP NULL")
+    # Done entries from before the column get their last update time as the
+    # best available estimate
+    backfill(conn, "entry", '"completedAt" = "updatedAt"', '"status" = \'done\' AND "completedAt" IS NULL')
+
+
+def _number_of_pairs(conn: Connection) -> None:
+    # Rows from before the column default; the API already reads NULL as 1, so
+    # the entries do not change for clients and keep their version
+    backfill(conn, "entry", '"numberOfPairs" = 1', '"numberOfPairs" IS NULL')
+
+
+def _change_counter(conn: Connection) -> None:
+    from changes import ensure_counter
+    CHANGE_TABLES.create_all(conn)
+    ensure_counter(conn)
+
+
+def _json_columns(conn: Connection) -> None:
+    migrate_json_columns(MIGRATION_BATCH_SIZE)
+
+
+def _job_table(conn: Connection) -> None:
+    JOB_TABLES.create_all(conn)
+
+
+def _indexes(conn: Connection) -> None:
+    # Idempotent; raises (leaving this migration pending) if an index cannot be
+    # built. A later change to the index lists in db.py needs a new
+    # migration that calls ensure_indexes again
+    ensure_indexes()
+
+
+# Append only: a version, once deployed, must never change meaning
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create_tables", _create_tables),
+    Migration(2, "entry_waiver_soft_delete_pairs_user_verified", _entry_columns),
+    Migration(3, "entry_version", _entry_version),
+    Migration(4, "entry_completed_at", _entry_completed_at, transactional=False),
+    Migration(5, "backfill_number_of_pairs", _number_of_pairs, transactional=False),
+    Migration(6, "change_counter", _change_counter),
+    Migration(7, "json_columns", _json_columns, transactional=False),
+    Migration(8, "entry_indexes", _indexes, transactional=False),
+    Migration(9, "job_table", _job_table),
+]
+
+
+def applied_versions(conn: Connection) -> Set[int]:
+    with conn.begin():
+        if not inspect(conn).has_table(SchemaMigration.__tablename__):
+            return set()
+        return set(conn.execute(select(SchemaMigration.version)).scalars())
+
+
+def pending_migrations(conn: Connection) -> List[Migration]:
+    done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+@contextmanager
+def migration_lock(engine: Engine, conn: Connection):
+    # One migrating process at a time; the others wait here, then find
+    # nothing left to do
+    if engine.dialect.name == "postgresql":
+        # Session-level, so it needs a direct or session-mode connection, not
+        # Supabase's transaction-mode pooler. Polled rather than waited for: a
+        # statement blocked in pg_advisory_lock keeps its snapshot, and CREATE
+        # INDEX CONCURRENTLY in the migrating process would wait for it forever.
+        while not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+            conn.commit()
+            time.sleep(MIGRATION_LOCK_POLL)
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
+    elif engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        # SQLite has no advisory locks: hold an exclusive transaction on a side
+        # file instead, which the OS releases if the process dies
+        lock = sqlite3.connect(f"{engine.url.database}.migrate-lock", timeout=600, isolation_level=None)
+        try:
+            lock.execute("BEGIN EXCLUSIVE")
+            yield
+        finally:
+            lock.close()
+    else:
+        yield
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(insert(SchemaMigration).values(version=migration.version, name=migration.name))
+
+
+def run_migrations() -> List[int]:
+    # Applies pending migrations in order and returns their versions. With
+    # nothing pending it only reads the migrations table: no lock, no DDL.
+    engine = get_engine()
+    applied = []
+    with engine.connect() as conn:
+        if not pending_migrations(conn):
+            return applied
+        with migration_lock(engine, conn):
+            with conn.begin():
+                SchemaMigration.__table__.create(conn, checkfirst=True)
+            # Re-read under the lock: another process may have just finished
+            for migration in pending_migrations(conn):
+                logger.info("Applying migration %d %s", migration.version, migration.name)
+                try:
+                    if migration.transactional:
+                        with conn.begin():
+                            migration.apply(conn)
+                            _record(conn, migration)
+                    else:
+                        migration.apply(conn)
+                        with conn.begin():
+                            _record(conn, migration)
+                except IntegrityError:
+                    # Only reachable without a lock (a database other than Postgres or a SQLite file)
+                    logger.warning("Migration %d was recorded by another process", migration.version)
+                    continue
+                applied.append(migration.version)
+    return applied
+
+
+def migration_status() -> List[dict]:
+    with get_engine().connect() as conn:
+        done = applied_versions(conn)
+    return [{"version": m.version, "name": m.name, "applied": m.version in done} for m in MIGRATIONS]
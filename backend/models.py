@@ -1,9 +1,16 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import Optional, List
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import BigInteger, Index
 from sqlmodel import SQLModel, Field
 
 
+# Native JSONB on Postgres, JSON-encoded TEXT on SQLite
+JSONType = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str = Field(index=True, unique=True)
@@ -27,13 +34,13 @@ class Entry(SQLModel, table=True):
     shoeService: Optional[str] = None
     waiverSigned: bool = False
     waiverUrl: Optional[str] = None
-    beforePhotos: str = "[]"  # JSON string list
+    beforePhotos: List[str] = Field(default_factory=list, sa_type=JSONType)
     assignedTo: Optional[str] = None
     needsReglue: Optional[bool] = None
     needsPaint: Optional[bool] = None
     status: str = "pending"
-    serviceDetails: Optional[str] = None  # JSON string
-    afterPhotos: str = "[]"  # JSON string list
+    serviceDetails: Optional[dict] = Field(default=None, sa_type=JSONType)
+    afterPhotos: List[str] = Field(default_factory=list, sa_type=JSONType)
     billing: Optional[float] = None
     additionalBilling: Optional[float] = None
     deliveryOption: Optional[str] = None
@@ -41,6 +48,49 @@ class Entry(SQLModel, table=True):
     numberOfPairs: int = 1
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
+    # First time the entry reached the done status; cleared if it is reopened
+    completedAt: Optional[datetime] = None
     deleted: bool = Field(default=False)
     deletedAt: Optional[datetime] = None
+    # Change counter value of the last write; see changes.py
+    version: int = Field(default=0, sa_type=BigInteger)
+
+
+class ChangeCounter(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    value: int = Field(default=0, sa_type=BigInteger)
+
+
+class PurgedEntry(SQLModel, table=True):
+    # Tombstones for permanently deleted entries, so delta sync can report them
+    id: Optional[int] = Field(default=None, primary_key=True)
+    public_id: str
+    version: int = Field(index=True, sa_type=BigInteger)
+    purgedAt: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Job(SQLModel, table=True):
+    # Durable background work (emails, notifications). status goes
+    # pending -> running -> deleted on success, or back to pending with a later
+    # run_at after a failure; jobs out of attempts stay behind as "dead".
+    __table_args__ = (Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str
+    payload: dict = Field(default_factory=dict, sa_type=JSONType)
+    status: str = "pending"
+    attempts: int = 0
+    max_attempts: int = 8
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_at: Optional[datetime] = None
+    locked_by: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 
+class SchemaMigration(SQLModel, table=True):
+    # Versions applied by migrations.py, one row each
+    version: int = Field(primary_key=True)
+    name: str
+    appliedAt: datetime = Field(default_factory=datetime.utcnow)
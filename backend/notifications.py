@@ -0,0 +1,150 @@
+import html
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from jobs import PermanentJobError, enqueue, handler
+from metrics import outbound
+
+
+RESEND_API_URL = os.environ.get("RESEND_API_URL", "https://api.resend.com/emails")
+MAIL_TIMEOUT = float(os.environ.get("MAIL_TIMEOUT", "10"))
+MAIL_SENDER = "Taketwo Manila <noreply@taketwomanila.com>"
+REGISTRATION_RECIPIENTS = [
+    "aczontongao@gmail.com",
+    "jimboyaczon@taketwomanila.com",
+    "davemanay1982@gmail.com",
+]
+# Customer emails on status changes are opt-in
+NOTIFY_STATUS_CHANGES = os.environ.get("NOTIFY_STATUS_CHANGES", "false").lower() in ("1", "true", "yes")
+
+
+def send_email(to: List[str], subject: str, html: str) -> None:
+    resend_api_key = os.environ.get("RESEND_API_KEY")
+    if not resend_api_key:
+        raise RuntimeError("RESEND_API_KEY is not configured")
+    import requests  # only job workers send mail; keeps it off the API's import path
+
+    with outbound("resend", "send_email"):
+        response = requests.post(
+            RESEND_API_URL,
+            headers={
+                "Authorization": f"Bearer {resend_api_key}",
+                "Content-Type": "application/json",
+            },
+            json={"from": MAIL_SENDER, "to": to, "subject": subject, "html": html},
+            timeout=MAIL_TIMEOUT,
+        )
+        if response.ok:
+            return
+        message = f"Resend email failed: {response.status_code} {response.text[:500]}"
+        # Rate limits and server errors are worth retrying; other 4xx are not
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentJobError(message)
+        raise RuntimeError(message)
+
+
+def enqueue_registration_email(session, email: str, token: str, first_name: Optional[str], last_name: Optional[str]) -> None:
+    enqueue(session, "email.registration", {
+        "email": email, "token": token, "first_name": first_name, "last_name": last_name,
+    })
+
+
+def enqueue_status_change(session, entry, status: Optional[str] = None) -> None:
+    if not NOTIFY_STATUS_CHANGES or not entry.customerEmail:
+        return
+    enqueue(session, "email.status_change", {
+        "entry_id": entry.public_id,
+        "status": status or entry.status,
+        "customerName": entry.customerName,
+        "customerEmail": entry.customerEmail,
+    })
+
+
+def registration_email_html(email: str, token: str, first_name: Optional[str], last_name: Optional[str]) -> str:
+    backend_url = os.environ.get("BACKEND_URL", "https://backend.taketwomanila.com")
+    verify_link = html.escape(f"{backend_url}/auth/verify?token={token}&email={email}")
+    name = html.escape(f"{first_name or ''} {last_name or ''}")
+
+    return f"""\
+        <html>
+          <body style="margin:0;padding:0;background:#000;color:#fff;font-family:system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;">
+            <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="max-width:600px;margin:0 auto;">
+              <tr>
+                <td style="padding:28px 16px 0;text-align:center;">
+                  <div style="display:inline-flex;align-items:center;gap:10px;padding:10px 16px;border:1px solid #fff;border-radius:12px;">
+                    <span style="font-size:22px;font-weight:800;letter-spacing:0.1em;">TAKETWO</span>
+                  </div>
+                </td>
+              </tr>
+              <tr>
+                <td style="padding:24px 16px 0;">
+                  <h1 style="margin:0;font-size:22px;font-weight:700;">New user registration pending verification</h1>
+                  <p style="margin:14px 0 0;line-height:1.5;color:#ccc;">A new user has registered and is awaiting your confirmation.</p>
+
+                  <table role="presentation" cellspacing="0" cellpadding="0" border="0" style="margin:22px 0 0;width:100%;">
+                    <tr>
+                      <td style="background:#0a0a0a;border:1px solid #333;border-radius:12px;padding:16px;color:#ddd;">
+                        <p style="margin:0 0 10px;font-size:14px;font-weight:600;">User details</p>
+                        <p style="margin:0;font-size:13px;">Name: {name}</p>
+                        <p style="margin:6px 0 0;font-size:13px;">Email: {html.escape(email)}</p>
+                      </td>
+                    </tr>
+                  </table>
+
+                  <div style="margin:24px 0;text-align:center;">
+                    <a href="{verify_link}" style="display:inline-block;padding:12px 18px;background:#fff;color:#000;font-weight:700;text-decoration:none;border-radius:9px;">Verify account</a>
+                  </div>
+
+                  <p style="margin:0;font-size:12px;color:#777;">If this registration looks suspicious, you can safely ignore this message.</p>
+                </td>
+              </tr>
+              <tr>
+                <td style="padding:28px 16px 28px;text-align:center;font-size:12px;color:#666;">
+                  &copy; {datetime.utcnow().year} TakeTwoLabs
+                </td>
+              </tr>
+            </table>
+          </body>
+        </html>
+        """
+
+
+def status_change_email_html(customer_name: str, status: str) -> str:
+    return f"""\
+        <html>
+          <body style="margin:0;padding:0;background:#000;color:#fff;font-family:system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;">
+            <table width="100%" cellpadding="0" cellspacing="0" role="presentation" style="max-width:600px;margin:0 auto;">
+              <tr>
+                <td style="padding:24px 16px;">
+                  <h1 style="margin:0;font-size:22px;font-weight:700;">Your order has been updated</h1>
+                  <p style="margin:14px 0 0;line-height:1.5;color:#ccc;">Hi {html.escape(customer_name or 'there')}, your shoes are now <strong>{html.escape(status)}</strong>.</p>
+                </td>
+              </tr>
+              <tr>
+                <td style="padding:28px 16px 28px;text-align:center;font-size:12px;color:#666;">
+                  &copy; {datetime.utcnow().year} TakeTwoLabs
+                </td>
+              </tr>
+            </table>
+          </body>
+        </html>
+        """
+
+
+@handler("email.registration")
+def send_registration_email(payload: dict) -> None:
+    send_email(
+        REGISTRATION_RECIPIENTS,
+        "New User Registration Pending Verification – TakeTwoLabs",
+        registration_email_html(payload["email"], payload["token"], payload.get("first_name"), payload.get("last_name")),
+    )
+
+
+@handler("email.status_change")
+def send_status_change_email(payload: dict) -> None:
+    send_email(
+        [payload["customerEmail"]],
+        "Your TakeTwo order status",
+        status_change_email_html(payload.get("customerName"), payload["status"]),
+    )
@@ -0,0 +1,138 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import false, true, tuple_
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import Entry as EntryModel
+from serializers import select_entry_columns
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Literal booleans (not bound params) so the planner can match the partial
+# indexes created by db.ensure_indexes
+def select_live():
+    return select_entry_columns().where(EntryModel.deleted == false())
+
+
+def select_deleted():
+    return select_entry_columns().where(EntryModel.deleted == true())
+
+
+# Server-side filters shared by the entry listing endpoints
+class EntryFilters:
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        assignedTo: Optional[str] = None,
+        markedAs: Optional[str] = None,
+        deliveryOption: Optional[str] = None,
+        createdFrom: Optional[datetime] = None,
+        createdTo: Optional[datetime] = None,
+        qcPassed: Optional[bool] = None,
+        serviceType: Optional[str] = None,
+        receivedBy: Optional[str] = None,
+    ):
+        self.status = status
+        self.assignedTo = assignedTo
+        self.markedAs = markedAs
+        self.deliveryOption = deliveryOption
+        self.createdFrom = createdFrom
+        self.createdTo = createdTo
+        self.qcPassed = qcPassed
+        self.serviceType = serviceType
+        self.receivedBy = receivedBy
+
+    def apply(self, stmt):
+        if self.status is not None:
+            stmt = stmt.where(EntryModel.status == self.status)
+        if self.assignedTo is not None:
+            stmt = stmt.where(EntryModel.assignedTo == self.assignedTo)
+        if self.markedAs is not None:
+            stmt = stmt.where(EntryModel.markedAs == self.markedAs)
+        if self.deliveryOption is not None:
+            stmt = stmt.where(EntryModel.deliveryOption == self.deliveryOption)
+        if self.createdFrom is not None:
+            stmt = stmt.where(EntryModel.createdAt >= self.createdFrom)
+        if self.createdTo is not None:
+            stmt = stmt.where(EntryModel.createdAt < self.createdTo)
+        # serviceDetails predicates run in the database (->> on JSONB, json_extract on SQLite)
+        details = EntryModel.serviceDetails
+        if self.qcPassed is not None:
+            stmt = stmt.where(details["qcPassed"].as_boolean() == self.qcPassed)
+        if self.serviceType is not None:
+            stmt = stmt.where(details["serviceType"].as_string() == self.serviceType)
+        if self.receivedBy is not None:
+            stmt = stmt.where(details["receivedBy"].as_string() == self.receivedBy)
+        return stmt
+
+
+# Keyset pagination on (createdAt, id); newest first by default
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+
+
+def page_statement(stmt, page: PageParams):
+    key = tuple_(EntryModel.createdAt, EntryModel.id)
+    if page.cursor:
+        after = tuple_(*decode_cursor(page.cursor))
+        stmt = stmt.where(key < after if page.order == "desc" else key > after)
+    if page.order == "desc":
+        stmt = stmt.order_by(EntryModel.createdAt.desc(), EntryModel.id.desc())
+    else:
+        stmt = stmt.order_by(EntryModel.createdAt.asc(), EntryModel.id.asc())
+    # Fetch one extra row to learn whether another page exists
+    return stmt.limit(page.limit + 1)
+
+
+def paginate(session: Session, stmt, page: PageParams) -> Tuple[List, Optional[str]]:
+    return _page_result(session.exec(page_statement(stmt, page)).all(), page)
+
+
+async def paginate_async(session: AsyncSession, stmt, page: PageParams) -> Tuple[List, Optional[str]]:
+    return _page_result((await session.exec(page_statement(stmt, page))).all(), page)
+
+
+def _page_result(rows: List, page: PageParams) -> Tuple[List, Optional[str]]:
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.createdAt, last.id)
+    return rows, next_cursor
+
+
+def set_page_headers(response: Response, page: PageParams, next_cursor: Optional[str]) -> Response:
+    response.headers["X-Page-Size"] = str(page.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
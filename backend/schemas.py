@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ServiceDetails(BaseModel):
+    isShoeClean: Optional[str] = None
+    serviceType: Optional[str] = None
+    needsReglue: Optional[bool] = None
+    needsPaint: Optional[bool] = None
+    qcPassed: Optional[bool] = None
+    basicCleaning: Optional[str] = None
+    receivedBy: Optional[str] = None
+
+
+class EntryCreate(BaseModel):
+    customerName: str = ""
+    customerPhone: str
+    customerEmail: str = ""
+    deliveryAddress: str
+    itemDescription: str = ""
+    shoeCondition: str = ""
+    shoeService: Optional[str] = None
+    waiverSigned: bool = False
+    waiverUrl: Optional[str] = None
+    beforePhotos: List[str] = Field(default_factory=list)
+    assignedTo: Optional[str] = None
+    needsReglue: Optional[bool] = None
+    needsPaint: Optional[bool] = None
+    status: str = Field(default="pending")
+    serviceDetails: Optional[ServiceDetails] = None
+    afterPhotos: List[str] = Field(default_factory=list)
+    billing: Optional[float] = None
+    additionalBilling: Optional[float] = None
+    deliveryOption: Optional[str] = None
+    markedAs: Optional[str] = None
+    numberOfPairs: Optional[int] = 1
+
+
+class Entry(EntryCreate):
+    id: str
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class EntryUpdate(BaseModel):
+    customerName: Optional[str] = None
+    customerPhone: Optional[str] = None
+    customerEmail: Optional[str] = None
+    deliveryAddress: Optional[str] = None
+    itemDescription: Optional[str] = None
+    shoeCondition: Optional[str] = None
+    shoeService: Optional[str] = None
+    waiverSigned: Optional[bool] = None
+    waiverUrl: Optional[str] = None
+    beforePhotos: Optional[List[str]] = None
+    assignedTo: Optional[str] = None
+    needsReglue: Optional[bool] = None
+    needsPaint: Optional[bool] = None
+    status: Optional[str] = None
+    serviceDetails: Optional[ServiceDetails] = None
+    afterPhotos: Optional[List[str]] = None
+    billing: Optional[float] = None
+    additionalBilling: Optional[float] = None
+    deliveryOption: Optional[str] = None
+    markedAs: Optional[str] = None
+    numberOfPairs: Optional[int] = None
@@ -0,0 +1,45 @@
+"""Helpers shared by the check and bench scripts.
+
+Imported after the script puts this directory on sys.path, like the fakes:
+
+    from _harness import check, failures, start_server
+
+check() prints one [ok]/[FAIL] line per assertion and records the failures; a
+script exits with 1 if failures is non-empty. start_server() runs the API under
+uvicorn in a subprocess and returns once /health answers.
+"""
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+failures: List[str] = []
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"[{'ok' if condition else 'FAIL'}] {message}")
+    if not condition:
+        failures.append(message)
+
+
+def start_server(port: int, env: dict, workers: int = 1, timeout: float = 30, quiet: bool = False) -> subprocess.Popen:
+    # quiet drops the server's stdout (request logs), for benchmarks that print their own table
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=str(BACKEND_DIR), env=env, stdout=subprocess.DEVNULL if quiet else None,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
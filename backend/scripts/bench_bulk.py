@@ -0,0 +1,89 @@
+"""Batch entry endpoints versus the equivalent per-entry request loop.
+
+Usage (from the backend directory):
+    python scripts/bench_bulk.py                        # temporary SQLite file
+    python scripts/bench_bulk.py --database-url postgresql+psycopg2://... --sizes 40 500
+
+Runs the app in-process. For each size, creates entries, marks them done,
+soft-deletes, restores and purges them, once one request per entry and once
+through the /entries/batch routes. Reports wall time and SQL statements per
+operation. The database gets fake entries, so never point it at production.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 500])
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_bulk.db"
+    os.environ.setdefault("JOB_WORKERS", "0")
+    os.environ.setdefault("HASH_WORKERS", "0")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from api.main import app
+    from auth import create_access_token
+    from db import get_engine
+
+    statements = []
+    event.listen(get_engine(), "before_cursor_execute", lambda *a: statements.append(1))
+    headers = {"Authorization": f"Bearer {create_access_token('bench-bulk@example.com')}"}
+    payload = {"customerPhone": "09170000000", "deliveryAddress": "Manila", "itemDescription": "Sneakers"}
+
+    def measure(fn):
+        statements.clear()
+        t0 = time.perf_counter()
+        result = fn()
+        return result, (time.perf_counter() - t0) * 1000, len(statements)
+
+    with TestClient(app) as client:
+        def per_item(n: int) -> dict:
+            ids, ms, queries = measure(lambda: [client.post("/entries", headers=headers, json=payload).json()["id"]
+                                                for _ in range(n)])
+            out = {"create": (ms, queries)}
+            steps = [
+                ("patch", lambda i: client.patch(f"/entries/{i}", headers=headers, json={"status": "done"})),
+                ("delete", lambda i: client.delete(f"/entries/{i}", headers=headers)),
+                ("restore", lambda i: client.post(f"/entries/{i}/restore", headers=headers)),
+                ("purge", lambda i: client.delete(f"/entries/{i}/permanent", headers=headers)),
+            ]
+            for name, call in steps:
+                _, ms, queries = measure(lambda: [call(i) for i in ids])
+                out[name] = (ms, queries)
+            return out
+
+        def batched(n: int) -> dict:
+            created, ms, queries = measure(lambda: client.post("/entries/batch", headers=headers,
+                                                               json={"items": [payload] * n}).json())
+            ids = [e["id"] for e in created["entries"]]
+            out = {"create": (ms, queries)}
+            steps = [
+                ("patch", lambda: client.patch("/entries/batch", headers=headers, json={"ids": ids, "changes": {"status": "done"}})),
+                ("delete", lambda: client.post("/entries/batch/delete", headers=headers, json={"ids": ids})),
+                ("restore", lambda: client.post("/entries/batch/restore", headers=headers, json={"ids": ids})),
+                ("purge", lambda: client.post("/entries/batch/purge", headers=headers, json={"ids": ids})),
+            ]
+            for name, call in steps:
+                _, ms, queries = measure(call)
+                out[name] = (ms, queries)
+            return out
+
+        print(f"{'entries':>7} {'op':>8} {'loop ms':>9} {'loop SQL':>9} {'batch ms':>9} {'batch SQL':>10} {'speedup':>8}")
+        for n in args.sizes:
+            loop, batch = per_item(n), batched(n)
+            for op in loop:
+                (lms, lq), (bms, bq) = loop[op], batch[op]
+                print(f"{n:>7} {op:>8} {lms:>9.1f} {lq:>9} {bms:>9.1f} {bq:>10} {lms / bms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Measure cold start: import time and time to first response.
+
+Usage (from the backend directory):
+    python scripts/bench_cold_start.py
+    python scripts/bench_cold_start.py --runs 10 --modes fast
+    python scripts/bench_cold_start.py --database-url postgresql+psycopg2://...
+
+What a serverless platform pays on every new instance. For each STARTUP_MODE
+(`full` runs the schema migration and the storage bucket check at startup,
+`fast` skips both, as on Vercel) it starts --runs fresh interpreters and
+reports the median and worst of:
+
+    import_ms       `import api.main` inside the interpreter
+    process_ms      interpreter start to the end of that import
+    health_ms       launching uvicorn to the first 200 from GET /health
+    first_entries_ms  launching uvicorn to the first authenticated GET /entries
+
+and which of the deferred dependencies (supabase, passlib, requests) were
+loaded by the import; it exits with 1 if any were. The database (a temporary
+SQLite file unless --database-url is given) is migrated once with
+`python migrate.py` beforehand, which is also timed.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+MODES = ["full", "fast"]
+DEFERRED = ["supabase", "passlib", "requests"]
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import api.main
+imported = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "loaded": [m for m in {DEFERRED!r} if m in sys.modules]}}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the results to this file")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(database_url: str, mode: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "STARTUP_MODE": mode,
+        "JOB_WORKERS": "0",
+        "LOG_LEVEL": "WARNING",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    # Storage is not needed to serve /health or /entries; in `full` mode a
+    # configured bucket check would add a network round trip to every start
+    env.pop("SUPABASE_URL", None)
+    return env
+
+
+def measure_import(env: dict) -> dict:
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    process_s = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    return {"import_ms": result["import_s"] * 1000, "process_ms": process_s * 1000, "loaded": result["loaded"]}
+
+
+def measure_first_response(env: dict, headers: dict) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        health_s = None
+        deadline = start + 60
+        with httpx.Client(base_url=base, timeout=30) as client:
+            while health_s is None:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("server did not answer within 60 s")
+                try:
+                    if client.get("/health").status_code == 200:
+                        health_s = time.perf_counter() - start
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            response = client.get("/entries", params={"limit": 20}, headers=headers)
+            entries_s = time.perf_counter() - start
+            response.raise_for_status()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return {"health_ms": health_s * 1000, "first_entries_ms": entries_s * 1000}
+
+
+def summarize(samples: list) -> dict:
+    keys = ["import_ms", "process_ms", "health_ms", "first_entries_ms"]
+    return {k: {"median": round(statistics.median(s[k] for s in samples), 1),
+                "max": round(max(s[k] for s in samples), 1)} for k in keys}
+
+
+def main() -> int:
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/cold_start.db"
+    os.environ["DATABASE_URL"] = database_url
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('cold-start@example.com')}"}
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=server_env(database_url, "full"), check=True)
+    print(f"migrate.py: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    results = {}
+    loaded = set()
+    for mode in args.modes:
+        env = server_env(database_url, mode)
+        samples = []
+        for _ in range(args.runs):
+            sample = measure_import(env)
+            sample.update(measure_first_response(env, headers))
+            loaded.update(sample.pop("loaded"))
+            samples.append(sample)
+        results[mode] = summarize(samples)
+
+    print(f"{'mode':<6} {'metric':<18} {'median ms':>10} {'max ms':>10}")
+    for mode, summary in results.items():
+        for metric, value in summary.items():
+            print(f"{mode:<6} {metric:<18} {value['median']:>10.1f} {value['max']:>10.1f}")
+    print(f"deferred imports loaded by `import api.main`: {', '.join(sorted(loaded)) or 'none'}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({"runs": args.runs, "results": results,
+                                                    "loaded": sorted(loaded)}, indent=2) + "\n")
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Login throughput and entry CRUD latency during a login storm.
+
+Usage (from the backend directory):
+    python scripts/bench_login.py                       # temporary SQLite file
+    python scripts/bench_login.py --hash-workers 0 4 --logins 64 --duration 10
+
+For each --hash-workers value a uvicorn server is started (0 hashes in a thread
+of the API process, as before the hashing pool) and measured twice: CRUD alone,
+then CRUD while --logins clients sign in back to back. Reports logins/sec and
+GET /entries p50/p99, plus logins turned away with 503 once the hashing queue
+(HASH_MAX_PENDING) is full. The database is seeded with fake users and entries, so
+never point it at production.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import start_server  # noqa: E402
+
+PASSWORD = "storm-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--hash-workers", type=int, nargs="+", default=[0, min(4, os.cpu_count() or 1)])
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--crud", type=int, default=4, help="concurrent CRUD clients")
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--port", type=int, default=8767)
+    return parser.parse_args()
+
+
+def seed(users: int, rows: int) -> None:
+    from sqlmodel import Session
+    import db
+    from hashing import get_pwd_context
+    from models import Entry as EntryModel, User as UserModel
+
+    db.init_db()
+    password_hash = get_pwd_context().hash(PASSWORD)
+    with Session(db.get_engine()) as session:
+        for i in range(users):
+            session.add(UserModel(email=f"storm{i}@example.com", password_hash=password_hash, verified=True))
+        for i in range(rows):
+            session.add(EntryModel(public_id=f"storm{i:027x}", customerPhone=f"0917{i:07d}", deliveryAddress="Manila"))
+        session.commit()
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+async def drive(base: str, token: str, users: int, logins: int, crud: int, duration: float) -> dict:
+    crud_latencies = []
+    login_count = 0
+    shed = 0
+    errors = 0
+    limits = httpx.Limits(max_connections=logins + crud, max_keepalive_connections=logins + crud)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        stop = time.perf_counter() + duration
+
+        async def login_client(seed_: int) -> None:
+            nonlocal login_count, shed, errors
+            rnd = random.Random(seed_)
+            while time.perf_counter() < stop:
+                r = await client.post("/auth/login", json={"email": f"storm{rnd.randrange(users)}@example.com",
+                                                           "password": PASSWORD})
+                if r.status_code == 200:
+                    login_count += 1
+                elif r.status_code == 503:
+                    # Hashing queue full; back off like a real client would
+                    shed += 1
+                    await asyncio.sleep(float(r.headers.get("Retry-After", "1")))
+                else:
+                    errors += 1
+
+        async def crud_client() -> None:
+            nonlocal errors
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                r = await client.get("/entries", params={"limit": 50}, headers=headers)
+                crud_latencies.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    errors += 1
+
+        await asyncio.gather(*(login_client(i) for i in range(logins)), *(crud_client() for _ in range(crud)))
+    return {
+        "logins_per_s": login_count / duration,
+        "crud_p50_ms": percentile(crud_latencies, 0.5),
+        "crud_p99_ms": percentile(crud_latencies, 0.99),
+        "shed": shed,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_login.db"
+    os.environ["DATABASE_URL"] = url
+    seed(args.users, args.rows)
+
+    from auth import create_access_token
+    token = create_access_token("storm0@example.com")
+
+    print(f"{'hash workers':>12} {'logins':>7} {'logins/s':>9} {'CRUD p50 ms':>12} {'CRUD p99 ms':>12} {'503s':>6} {'errors':>7}")
+    for workers in args.hash_workers:
+        proc = start_server(args.port, {**os.environ, "HASH_WORKERS": str(workers), "JOB_WORKERS": "0"})
+        try:
+            for logins in (0, args.logins):
+                result = asyncio.run(drive(f"http://127.0.0.1:{args.port}", token, args.users, logins,
+                                           args.crud, args.duration))
+                print(f"{workers:>12} {logins:>7} {result['logins_per_s']:>9.1f} {result['crud_p50_ms']:>12.1f} "
+                      f"{result['crud_p99_ms']:>12.1f} {result['shed']:>6} {result['errors']:>7}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Latency of GET /entries/search at growing table sizes.
+
+Usage (from the backend directory):
+    python scripts/bench_search.py                        # 100k and 1M rows, temporary SQLite file
+    python scripts/bench_search.py --database-url postgresql+psycopg2://... --rows 100000 1000000
+
+Seeds entries with generated names, phones, emails, shoes and addresses up to
+each --rows size, then times search_entries (the query behind the endpoint)
+for phone fragments, names, surname prefixes, item words, email fragments,
+one and two letter terms and misses, --repeat times each with different
+terms, and prints p50/p95. For comparison it also times loading every entry,
+which is what the dashboard did to search. Entries already in the database
+count towards the sizes, so a run can continue an earlier one. Writes fake entries, so never point
+it at production.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+FIRST = ["Juan", "Maria", "Jose", "Ana", "Carlo", "Bea", "Miguel", "Sofia", "Paolo", "Isabel", "Rafael", "Camille",
+         "Andres", "Lea", "Marco", "Trisha", "Gabriel", "Nicole", "Enzo", "Kristine", "Luis", "Patricia", "Noel", "Joy"]
+LAST = ["Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Torres", "Flores", "Gonzales", "Bautista", "Villanueva",
+        "Ramos", "Aquino", "Castillo", "Rivera", "Navarro", "Mercado", "Domingo", "Pascual", "Salazar", "Valdez"]
+BRANDS = ["Nike", "Adidas", "New Balance", "Converse", "Vans", "Puma", "Asics", "Reebok", "Onitsuka", "Salomon"]
+MODELS = ["Air Force 1", "Jordan 1", "Jordan 4", "Dunk Low", "Samba", "Gazelle", "550", "990v5", "Chuck 70",
+          "Old Skool", "Suede", "Gel-Kayano 14", "Club C", "Mexico 66", "XT-6"]
+COLORS = ["white", "black", "cream", "navy", "red", "grey", "green", "university blue"]
+PLACES = ["Makati", "Taguig", "Quezon City", "Pasig", "Mandaluyong", "Manila", "Paranaque", "Marikina", "Cebu", "Davao"]
+QUERY_KINDS = ["phone fragment", "full name", "surname prefix", "item words", "email fragment", "short term", "miss"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=11)
+    return parser.parse_args()
+
+
+def make_row(i: int, rng: random.Random) -> dict:
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    digits = f"09{rng.randrange(10**9):09d}"
+    phone = rng.choice([digits, f"{digits[:4]} {digits[4:7]} {digits[7:]}", f"+63 {digits[1:4]}-{digits[4:7]}-{digits[7:]}"])
+    created = datetime(2025, 1, 1) + timedelta(seconds=rng.randrange(600 * 86400))
+    return {
+        "public_id": uuid.uuid4().hex, "customerName": f"{first} {last}", "customerPhone": phone,
+        "customerEmail": f"{first}.{last.replace(' ', '')}{i}@example.com".lower(),
+        "itemDescription": f"{rng.choice(BRANDS)} {rng.choice(MODELS)} {rng.choice(COLORS)}",
+        "deliveryAddress": f"{rng.randrange(1, 999)} {rng.choice(LAST)} St, {rng.choice(PLACES)}",
+        "createdAt": created, "updatedAt": created, "deleted": rng.random() < 0.03,
+        "beforePhotos": [], "afterPhotos": [],
+    }
+
+
+def seed(start: int, end: int, rng: random.Random, samples: list) -> None:
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from db import get_engine
+    from models import Entry as EntryModel
+
+    with Session(get_engine()) as session:
+        batch = []
+        for i in range(start, end):
+            row = make_row(i, rng)
+            if len(samples) < 500 and rng.random() < 0.001:
+                samples.append(row)
+            batch.append(row)
+            if len(batch) == 10_000:
+                session.execute(insert(EntryModel), batch)
+                session.commit()
+                batch = []
+        if batch:
+            session.execute(insert(EntryModel), batch)
+            session.commit()
+
+
+def query_for(kind: str, row: dict, rng: random.Random) -> str:
+    digits = "".join(c for c in row["customerPhone"] if c.isdigit())[-10:]
+    if kind == "phone fragment":
+        return digits[-7:]
+    if kind == "full name":
+        return row["customerName"]
+    if kind == "surname prefix":
+        return row["customerName"].split()[-1][:4]
+    if kind == "item words":
+        return " ".join(row["itemDescription"].split()[1:3])
+    if kind == "email fragment":
+        return row["customerEmail"].split("@")[0][-8:]
+    if kind == "short term":
+        return row["customerName"][:2]
+    return "".join(rng.choice("qxzj") for _ in range(6))
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def main() -> None:
+    args = parse_args()
+    os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{tempfile.mkdtemp()}/search.db")
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+    import db
+    from models import Entry as EntryModel
+    from queries import select_live
+    from search import search_backend, search_entries
+
+    db.init_db()
+    rng = random.Random(args.seed)
+    samples = []
+    with Session(db.get_engine()) as session:
+        # Rows left by an earlier run are reused
+        seeded = session.exec(select(func.count()).select_from(EntryModel)).one()
+        if seeded:
+            stmt = select(EntryModel.customerName, EntryModel.customerPhone, EntryModel.customerEmail, EntryModel.itemDescription)
+            samples = [r._asdict() for r in session.exec(stmt.where(EntryModel.id % 997 == 0).limit(500))]
+    print(f"backend: {search_backend()}")
+    print(f"{'rows':>9}  {'query':<15} {'p50 ms':>8} {'p95 ms':>8} {'hits':>6}")
+    for size in sorted(args.rows):
+        t0 = time.perf_counter()
+        if seeded < size:
+            seed(seeded, size, rng, samples)
+            seeded = size
+        with db.get_engine().connect() as conn:
+            if db.get_engine().dialect.name == "postgresql":
+                conn.exec_driver_sql("ANALYZE entry")
+        print(f"seeded {size} rows ({time.perf_counter() - t0:.0f}s)")
+        with Session(db.get_engine()) as session:
+            for kind in QUERY_KINDS:
+                timings, hits = [], 0
+                for _ in range(args.repeat):
+                    q = query_for(kind, rng.choice(samples), rng)
+                    t0 = time.perf_counter()
+                    rows, _ = search_entries(session, q, 20, 0)
+                    timings.append(time.perf_counter() - t0)
+                    hits += len(rows)
+                print(f"{size:>9}  {kind:<15} {percentile(timings, 0.5):>8.1f} {percentile(timings, 0.95):>8.1f} {hits / args.repeat:>6.1f}")
+            t0 = time.perf_counter()
+            session.exec(select_live()).all()
+            print(f"{size:>9}  {'load all':<15} {(time.perf_counter() - t0) * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
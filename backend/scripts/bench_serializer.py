@@ -0,0 +1,134 @@
+"""Compare the entry serializer against the old per-row pydantic path.
+
+Usage (from the backend directory):
+    python scripts/bench_serializer.py [--sizes 1000 10000 100000] [--repeat 3]
+
+The legacy path decodes the JSON-in-TEXT columns, builds `Entry(...)` per row
+and then validates/serializes the list again the way FastAPI's `response_model`
+does. The new path is `serializers.serialize_entries` over native JSON values
+followed by JSONResponse rendering.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from api.main import Entry  # noqa: E402
+from serializers import serialize_entries  # noqa: E402
+
+
+def make_rows(n: int, native: bool = True) -> list:
+    start = datetime(2025, 1, 1)
+    details = {"isShoeClean": None, "serviceType": "deep", "needsReglue": False, "needsPaint": None,
+               "qcPassed": True, "basicCleaning": None, "receivedBy": "desk"}
+    # Legacy rows carried the JSON columns as encoded TEXT
+    encode = (lambda v: v) if native else json.dumps
+    rows = []
+    for i in range(n):
+        rows.append(SimpleNamespace(
+            id=i + 1,
+            public_id=f"{i:032x}",
+            customerName=f"Customer {i}",
+            customerPhone=f"0917{i:07d}",
+            customerEmail=f"c{i}@example.com",
+            deliveryAddress="Makati City",
+            itemDescription="White sneakers",
+            shoeCondition="worn",
+            shoeService="deep clean",
+            waiverSigned=True,
+            waiverUrl=None,
+            beforePhotos=encode([f"before/{i}.jpg"] if i % 3 else []),
+            assignedTo=f"tech{i % 8}",
+            needsReglue=None,
+            needsPaint=None,
+            status="pending",
+            serviceDetails=encode(details) if i % 2 else None,
+            afterPhotos=encode([]),
+            billing=450.0,
+            additionalBilling=None,
+            deliveryOption="pickup",
+            markedAs=None,
+            numberOfPairs=1,
+            createdAt=start + timedelta(minutes=i),
+            updatedAt=start + timedelta(minutes=i),
+        ))
+    return rows
+
+
+def legacy(rows) -> bytes:
+    result: List[Entry] = []
+    for r in rows:
+        result.append(Entry(
+            id=r.public_id,
+            customerName=r.customerName,
+            customerPhone=r.customerPhone,
+            customerEmail=r.customerEmail,
+            deliveryAddress=r.deliveryAddress,
+            itemDescription=r.itemDescription,
+            shoeCondition=r.shoeCondition,
+            shoeService=r.shoeService,
+            waiverSigned=r.waiverSigned,
+            waiverUrl=r.waiverUrl,
+            beforePhotos=json.loads(r.beforePhotos or "[]"),
+            assignedTo=r.assignedTo,
+            needsReglue=r.needsReglue,
+            needsPaint=r.needsPaint,
+            status=r.status,
+            serviceDetails=json.loads(r.serviceDetails) if r.serviceDetails else None,
+            afterPhotos=json.loads(r.afterPhotos or "[]"),
+            billing=r.billing,
+            additionalBilling=r.additionalBilling,
+            deliveryOption=r.deliveryOption,
+            markedAs=r.markedAs,
+            numberOfPairs=r.numberOfPairs,
+            createdAt=r.createdAt,
+            updatedAt=r.updatedAt,
+        ))
+    # What response_model=List[Entry] does with the returned list
+    adapter = TypeAdapter(List[Entry])
+    validated = adapter.validate_python(adapter.dump_python(result))
+    return adapter.dump_json(validated)
+
+
+def current(rows) -> bytes:
+    return JSONResponse(serialize_entries(rows)).body
+
+
+def best_of(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    assert json.loads(legacy(make_rows(50, native=False))) == json.loads(current(make_rows(50))), \
+        "serializer output differs from legacy path"
+
+    print(f"{'rows':>8} {'legacy ms':>11} {'serializer ms':>14} {'speedup':>8}")
+    for n in args.sizes:
+        old = best_of(legacy, make_rows(n, native=False), args.repeat)
+        new = best_of(current, make_rows(n), args.repeat)
+        print(f"{n:>8} {old * 1000:>11.1f} {new * 1000:>14.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
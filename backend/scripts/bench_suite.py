@@ -0,0 +1,409 @@
+"""Reproducible API benchmark suite with JSON baselines.
+
+Usage (from the backend directory):
+    python scripts/bench_suite.py                                  # every scenario, saved to benchmarks/<commit>.json
+    python scripts/bench_suite.py --scenarios dashboard_poll login --duration 5
+    python scripts/bench_suite.py --compare benchmarks/abc1234.json # after changing a handler, db.py or auth.py
+    python scripts/bench_suite.py --async --workers 2 --save /tmp/async.json
+
+Seeds a SQLite database once (--rows entries, --users verified users, fixed
+random seed) and gives every scenario a fresh copy of it, its own uvicorn
+server running api.main:app, and scripts/fake_storage.py plus
+scripts/fake_mail.py as Supabase Storage and Resend, so results do not depend
+on what ran before or on the network. Scenarios:
+
+    dashboard_poll  GET /entries?limit=50, a quarter filtered by status
+    create          POST /entries
+    patch_status    PATCH /entries/{id} status (status emails go to the fake mail server)
+    upload_waiver   POST /upload/waiver with a --pdf-kb PDF
+    login           POST /auth/login (bcrypt at BCRYPT_ROUNDS, default 12)
+    mixed           a day at the shop: 70% poll, 12% patch, 8% create, 5% upload, 5% login
+
+Each runs --concurrency clients for --warmup + --duration seconds and reports
+throughput, p50/p95/p99 latency, errors, server CPU per request and the
+server's peak RSS (VmHWM, so Linux only). Results are written as JSON with the
+commit, machine and settings. --compare prints the change against an earlier
+file and exits with 1 if throughput, a latency percentile, CPU per request or
+peak memory got worse by more than --tolerance. Compare runs from the same
+machine and settings only. With --database-url the scenarios share that
+database and its data, so give it a fresh, disposable one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import start_server  # noqa: E402
+
+PASSWORD = "bench-password"
+STATUSES = ["pending", "in-progress", "qc", "done"]
+MIX = {"dashboard_poll": 70, "patch_status": 12, "create": 8, "upload_waiver": 5, "login": 5}
+SCENARIOS = list(MIX) + ["mixed"]
+# Metric -> True when higher is better
+COMPARED = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "cpu_ms_per_request": False,
+            "peak_rss_mb": False}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--pdf-kb", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--async", dest="async_db", action="store_true", help="run with DB_ASYNC=true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", default=None, help="default: benchmarks/<commit>.json")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def seed(url: str, rows: int, users: int, rng: random.Random) -> list:
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    import db
+    from hashing import get_pwd_context
+    from models import Entry as EntryModel, User as UserModel
+
+    db.init_db()
+    password_hash = get_pwd_context().hash(PASSWORD)
+    start = datetime(2026, 1, 1)
+    ids = []
+    with Session(db.get_engine()) as session:
+        session.execute(insert(UserModel), [
+            {"email": f"bench{i}@example.com", "password_hash": password_hash, "verified": True} for i in range(users)
+        ])
+        batch = []
+        for i in range(rows):
+            created = start + timedelta(minutes=i)
+            public_id = uuid.UUID(int=rng.getrandbits(128)).hex
+            ids.append(public_id)
+            batch.append({
+                "public_id": public_id, "customerName": f"Customer {i}", "customerPhone": f"0917{i:07d}",
+                "customerEmail": f"customer{i}@example.com", "deliveryAddress": "12 Rizal St., Manila",
+                "itemDescription": "Nike Air Force 1", "status": rng.choice(STATUSES), "assignedTo": f"tech{i % 5}",
+                "billing": 450.0, "numberOfPairs": rng.randint(1, 3),
+                "beforePhotos": [f"https://cdn.example.com/before/{i}.jpg"], "afterPhotos": [],
+                "serviceDetails": {"serviceType": rng.choice(["basic", "deep"]), "qcPassed": rng.random() < 0.5},
+                "createdAt": created, "updatedAt": created,
+            })
+            if len(batch) == 5000:
+                session.execute(insert(EntryModel), batch)
+                batch = []
+        if batch:
+            session.execute(insert(EntryModel), batch)
+        session.commit()
+    db.get_engine().dispose()
+    return ids
+
+
+def wait_for(url: str, proc: subprocess.Popen) -> None:
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode}")
+        try:
+            httpx.get(url)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{url} did not start")
+
+
+def start_fakes() -> tuple:
+    storage_port, mail_port = free_port(), free_port()
+    quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    storage = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / "fake_storage.py"), "--port", str(storage_port),
+                                "--discard-bodies"], **quiet)
+    mail = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / "fake_mail.py"), "--port", str(mail_port)], **quiet)
+    wait_for(f"http://127.0.0.1:{storage_port}/", storage)
+    wait_for(f"http://127.0.0.1:{mail_port}/", mail)
+    return (storage, mail), {
+        "SUPABASE_URL": f"http://127.0.0.1:{storage_port}",
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "RESEND_API_URL": f"http://127.0.0.1:{mail_port}/emails",
+        "RESEND_API_KEY": "re_fake",
+    }
+
+
+def process_tree(pid: int) -> list:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                pids += process_tree(int(child))
+    except OSError:
+        pass
+    return pids
+
+
+def peak_rss_mb(pid: int) -> float:
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def cpu_seconds(pid: int) -> float:
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError):
+            pass
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def summarize(latencies: list, errors: int, seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+class Operations:
+    # One method per request kind; each returns True when the response is as expected
+    def __init__(self, client: httpx.AsyncClient, token: str, ids: list, users: int, pdf: bytes):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ids = ids
+        self.users = users
+        self.pdf = pdf
+
+    async def dashboard_poll(self, rnd: random.Random) -> bool:
+        params = {"limit": 50}
+        if rnd.random() < 0.25:
+            params["status"] = rnd.choice(STATUSES)
+        r = await self.client.get("/entries", params=params, headers=self.headers)
+        return r.status_code == 200
+
+    async def create(self, rnd: random.Random) -> bool:
+        n = rnd.randrange(10**7)
+        r = await self.client.post("/entries", headers=self.headers, json={
+            "customerName": f"Walk-in {n}", "customerPhone": f"0918{n:07d}", "customerEmail": f"walkin{n}@example.com",
+            "deliveryAddress": "Pickup", "itemDescription": "Adidas Samba", "shoeService": "deep",
+            "billing": 650, "numberOfPairs": rnd.randint(1, 3), "serviceDetails": {"serviceType": "deep"},
+        })
+        return r.status_code == 200
+
+    async def patch_status(self, rnd: random.Random) -> bool:
+        r = await self.client.patch(f"/entries/{rnd.choice(self.ids)}", headers=self.headers,
+                                    json={"status": rnd.choice(STATUSES)})
+        return r.status_code == 200
+
+    async def upload_waiver(self, rnd: random.Random) -> bool:
+        r = await self.client.post("/upload/waiver", headers=self.headers,
+                                   files={"file": (f"waiver-{rnd.randrange(10**6)}.pdf", self.pdf, "application/pdf")})
+        return r.status_code == 200
+
+    async def login(self, rnd: random.Random) -> bool:
+        r = await self.client.post("/auth/login", json={"email": f"bench{rnd.randrange(self.users)}@example.com",
+                                                        "password": PASSWORD})
+        return r.status_code == 200
+
+
+async def drive(base: str, scenario: str, ops_args: tuple, concurrency: int, warmup: float, duration: float,
+                seed_: int) -> tuple:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    by_op = {}
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        ops = Operations(client, *ops_args)
+        kinds, weights = (list(MIX), list(MIX.values())) if scenario == "mixed" else ([scenario], [1])
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop = measure_from + duration
+
+        async def worker(n: int) -> None:
+            rnd = random.Random(seed_ * 1000 + n)
+            while True:
+                kind = rnd.choices(kinds, weights)[0]
+                t0 = time.perf_counter()
+                if t0 >= stop:
+                    return
+                try:
+                    ok = await getattr(ops, kind)(rnd)
+                except httpx.HTTPError:
+                    ok = False
+                if t0 >= measure_from:
+                    latencies, errors = by_op.setdefault(kind, ([], [0]))
+                    latencies.append(time.perf_counter() - t0)
+                    errors[0] += 0 if ok else 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return by_op, measure_from
+
+
+def run_scenario(args, scenario: str, template: str, ids: list, fake_env: dict, token: str) -> dict:
+    env = {**os.environ, **fake_env, "JOB_WORKERS": "1", "NOTIFY_STATUS_CHANGES": "true", "LOG_LEVEL": "WARNING",
+           # Every request is slow under saturation; keep the output to the table
+           "SLOW_REQUEST_SECONDS": "3600",
+           "DB_ASYNC": "true" if args.async_db else "false"}
+    workdir = None
+    if template.startswith("sqlite:///"):
+        workdir = tempfile.mkdtemp()
+        path = os.path.join(workdir, "bench.db")
+        shutil.copy(template[len("sqlite:///"):], path)
+        env["DATABASE_URL"] = f"sqlite:///{path}"
+    else:
+        env["DATABASE_URL"] = template
+    port = free_port()
+    proc = start_server(port, env, args.workers, timeout=60)
+    try:
+        pdf = b"%PDF-1.4\n" + random.Random(args.seed).randbytes(args.pdf_kb * 1024)
+        cpu_before = cpu_seconds(proc.pid)
+        by_op, _ = asyncio.run(drive(f"http://127.0.0.1:{port}", scenario, (token, ids, args.users, pdf),
+                                     args.concurrency, args.warmup, args.duration, args.seed))
+        # Includes the warm-up, as the server does not know where it ends
+        cpu = cpu_seconds(proc.pid) - cpu_before
+        peak = peak_rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    latencies = [v for lat, _ in by_op.values() for v in lat]
+    total = summarize(latencies, sum(e[0] for _, e in by_op.values()), args.duration)
+    all_requests = total["requests"] * (args.warmup + args.duration) / args.duration
+    total["cpu_ms_per_request"] = round(cpu * 1000 / all_requests, 3) if all_requests else 0.0
+    total["peak_rss_mb"] = round(peak, 1)
+    if scenario == "mixed":
+        total["operations"] = {k: summarize(lat, e[0], args.duration) for k, (lat, e) in sorted(by_op.items())}
+    return total
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    print(f"\ncompared with {baseline['commit'] or '?'} ({baseline['created']}), tolerance {tolerance:.0%}")
+    print(f"{'scenario':>15} {'metric':>18} {'before':>10} {'after':>10} {'change':>8}")
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = " <-" if worse > tolerance else ""
+            if flag:
+                regressions.append(f"{scenario} {metric}")
+            print(f"{scenario:>15} {metric:>18} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+    if baseline.get("settings") != current["settings"]:
+        print("note: the settings differ from the baseline's")
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp()
+    template = args.database_url or f"sqlite:///{workdir}/template.db"
+    t0 = time.perf_counter()
+    ids = seed(template, args.rows, args.users, rng)
+    print(f"seeded {args.rows} entries and {args.users} users in {time.perf_counter() - t0:.1f}s")
+
+    from auth import create_access_token
+    token = create_access_token("bench0@example.com")
+
+    fakes, fake_env = start_fakes()
+    results = {}
+    try:
+        print(f"{'scenario':>15} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms/req':>10} "
+              f"{'peak MB':>8} {'errors':>7}")
+        for scenario in args.scenarios:
+            r = run_scenario(args, scenario, template, ids, fake_env, token)
+            results[scenario] = r
+            print(f"{scenario:>15} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                  f"{r['cpu_ms_per_request']:>10.2f} {r['peak_rss_mb']:>8.1f} {r['errors']:>7}")
+            for kind, op in r.get("operations", {}).items():
+                print(f"{'  ' + kind:>15} {op['rps']:>9.1f} {op['p50_ms']:>8.1f} {op['p95_ms']:>8.1f} "
+                      f"{op['p99_ms']:>8.1f} {'':>10} {'':>8} {op['errors']:>7}")
+    finally:
+        for proc in fakes:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git("rev-parse", "--short", "HEAD")
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    output = {
+        "commit": commit + ("-dirty" if dirty else ""),
+        "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {k: getattr(args, k) for k in ("rows", "users", "concurrency", "duration", "warmup", "pdf_kb",
+                                                    "workers", "async_db", "seed")}
+                    | {"database": (args.database_url or "sqlite").split(":", 1)[0]},
+        "scenarios": results,
+    }
+    save = Path(args.save or BACKEND_DIR / "benchmarks" / f"{output['commit'] or 'results'}.json")
+    save.parent.mkdir(parents=True, exist_ok=True)
+    save.write_text(json.dumps(output, indent=2) + "\n")
+    print(f"saved {save}")
+
+    if baseline:
+        regressions = compare(output, baseline, args.tolerance)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
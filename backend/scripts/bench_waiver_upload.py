@@ -0,0 +1,114 @@
+"""Peak RSS and event-loop lag of the API during concurrent waiver uploads.
+
+Usage (from the backend directory, Linux only because RSS comes from /proc):
+    python scripts/bench_waiver_upload.py [--uploads 20] [--size-mb 20]
+
+Starts uvicorn against a temporary SQLite database and scripts/fake_storage.py,
+sends --uploads concurrent PDFs of --size-mb each, and meanwhile polls
+GET /health every 20 ms. Health-check latency while uploads are in flight is
+reported as event-loop lag.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import start_server  # noqa: E402
+from fake_storage import FakeStorage  # noqa: E402
+
+
+def proc_memory_kb(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+async def run(base: str, token: str, uploads: int, size: int) -> dict:
+    body = b"%PDF-1.4\n" + b"0" * (size - 9)
+    headers = {"Authorization": f"Bearer {token}"}
+    lags = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base, timeout=600) as client:
+        async def probe() -> None:
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/health")
+                lags.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.02)
+
+        async def upload(i: int) -> int:
+            r = await client.post("/upload/waiver", headers=headers,
+                                  files={"file": (f"scan{i}.pdf", body, "application/pdf")})
+            return r.status_code
+
+        prober = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        statuses = await asyncio.gather(*(upload(i) for i in range(uploads)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await prober
+
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "ok": sum(1 for s in statuses if s == 200),
+        "lag_p50_ms": lags[len(lags) // 2] * 1000,
+        "lag_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    fake = FakeStorage(keep_bodies=False).start()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/upload_bench.db",
+        "WAIVER_MAX_BYTES": str(size + 1024 * 1024),
+    }
+    os.environ.update(env)
+    from auth import create_access_token
+
+    proc = start_server(args.port, env, quiet=True)
+    try:
+        before = proc_memory_kb(proc.pid)
+        result = asyncio.run(run(f"http://127.0.0.1:{args.port}", create_access_token("bench@example.com"),
+                                 args.uploads, size))
+        after = proc_memory_kb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+        fake.stop()
+
+    print(f"{args.uploads} x {args.size_mb} MB uploads: {result['ok']} ok in {result['elapsed_s']:.1f}s")
+    print(f"server RSS: {before['VmRSS'] / 1024:.0f} MB idle, peak {after['VmHWM'] / 1024:.0f} MB")
+    print(f"event-loop lag (GET /health): p50 {result['lag_p50_ms']:.1f} ms, "
+          f"p99 {result['lag_p99_ms']:.1f} ms, max {result['lag_max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Check ETags, 304 Not Modified and response compression on the listing routes.
+
+Usage (from the backend directory):
+    python scripts/check_conditional.py [--rows 200]
+
+Runs the app in-process against a temporary SQLite database. Checks that
+GET /entries, GET /entries/deleted and GET /me answer a matching If-None-Match
+with 304 after a single SQL statement (none reading entry rows, also with the
+entry cache off), that any write changes the tag, and that large bodies are
+sent with brotli or gzip while small ones are not.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/conditional.db")
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlmodel import Session
+    import auth
+    import compression
+    import entry_cache
+    from api.main import app
+    from db import get_engine
+    from models import User as UserModel
+
+    statements = []
+    event.listen(get_engine(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    with TestClient(app) as client:
+        with Session(get_engine()) as session:
+            session.add(UserModel(email="etag@example.com", password_hash="x", first_name="Ana", verified=True))
+            session.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token('etag@example.com')}"}
+        items = [{"customerPhone": f"0917{i:07d}", "deliveryAddress": "Manila", "customerName": f"Customer {i}"}
+                 for i in range(args.rows)]
+        client.post("/entries/batch", headers=headers, json={"items": items})
+
+        for path in ("/entries", "/entries/deleted", "/me"):
+            first = client.get(path, headers=headers)
+            etag = first.headers.get("etag")
+            check(bool(etag), f"{path}: ETag {etag}")
+            statements.clear()
+            again = client.get(path, headers={**headers, "If-None-Match": etag})
+            check(again.status_code == 304 and not again.content, f"{path}: If-None-Match answered with 304")
+            check(len(statements) <= 1, f"{path}: 304 after {len(statements)} SQL statement(s)")
+
+        # Uncached, a 304 is still decided from the change counter alone
+        entry_cache.entry_cache.enabled = False
+        for path in ("/entries", "/entries/deleted"):
+            etag = client.get(path, headers=headers).headers["etag"]
+            statements.clear()
+            again = client.get(path, headers={**headers, "If-None-Match": etag})
+            reads = [s for s in statements if re.search(r'\bFROM\s+"?entry"?\b', s)]
+            check(again.status_code == 304 and not reads, f"{path}: 304 without reading entries, cache off")
+        entry_cache.entry_cache.enabled = True
+
+        plain = client.get("/entries", headers={**headers, "Accept-Encoding": "identity"})
+        etag = plain.headers["etag"]
+        sizes = {"identity": len(plain.content)}
+        for encoding in ("gzip", "br"):
+            response = client.get("/entries", headers={**headers, "Accept-Encoding": encoding})
+            check(response.headers.get("content-encoding") == encoding, f"/entries sent with {encoding}")
+            check(response.headers["etag"] == f'{etag[:-1]}-{encoding}"', f"{encoding}: ETag names the encoding")
+            check(response.json() == plain.json(), f"{encoding}: body decodes to the same entries")
+            sizes[encoding] = int(response.headers["content-length"])
+            revalidate = client.get("/entries", headers={**headers, "Accept-Encoding": encoding,
+                                                         "If-None-Match": response.headers["etag"]})
+            check(revalidate.status_code == 304 and revalidate.headers["etag"] == response.headers["etag"],
+                  f"{encoding}: encoded ETag revalidates")
+        print("GET /entries bytes: " + ", ".join(f"{k} {v}" for k, v in sizes.items()))
+        check(compression.brotli is not None, "brotli available")
+
+        small = client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+        check("content-encoding" not in small.headers, "small responses are not compressed")
+
+        entry_id = plain.json()[0]["id"]
+        client.patch(f"/entries/{entry_id}", headers=headers, json={"status": "in-progress"})
+        changed = client.get("/entries", headers={**headers, "If-None-Match": etag, "Accept-Encoding": "identity"})
+        check(changed.status_code == 200 and changed.headers["etag"] != etag, "an update changes the ETag")
+        etag = changed.headers["etag"]
+        client.delete(f"/entries/{entry_id}", headers=headers)
+        check(client.get("/entries", headers={**headers, "If-None-Match": etag}).status_code == 200,
+              "a delete changes the ETag")
+        paged = client.get("/entries?limit=10", headers={**headers, "If-None-Match": etag})
+        check(paged.status_code == 200, "another page or filter has its own ETag")
+
+        me = client.get("/me", headers=headers).headers["etag"]
+        client.patch("/me", headers=headers, json={"first_name": "Bea"})
+        check(client.get("/me", headers={**headers, "If-None-Match": me}).status_code == 200,
+              "PATCH /me changes the /me ETag")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
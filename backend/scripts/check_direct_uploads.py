@@ -0,0 +1,77 @@
+"""Exercise the signed direct-upload flow against the fake storage server.
+
+Usage (from the backend directory):
+    python scripts/check_direct_uploads.py
+
+For a before photo, an after photo and a waiver: request a signed upload URL
+from the API, PUT the bytes straight to (fake) storage, confirm, and check the
+entry. Also checks that bad confirmations are rejected.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+from fake_storage import FakeStorage  # noqa: E402
+
+
+def main() -> int:
+    fake = FakeStorage().start()
+    os.environ.update({
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/direct_uploads.db",
+    })
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('uploads-check@example.com')}"}
+    with TestClient(app) as client:
+        entry = client.post("/entries", headers=headers, json={"customerPhone": "0917", "deliveryAddress": "Manila"}).json()
+        entry_id = entry["id"]
+        files = {"before": ("front.jpg", b"\xff\xd8jpeg-before"), "after": ("done.jpg", b"\xff\xd8jpeg-after"),
+                 "waiver": ("waiver.pdf", b"%PDF-1.4 signed")}
+        for kind, (filename, content) in files.items():
+            signed = client.post(f"/entries/{entry_id}/uploads", headers=headers,
+                                 json={"kind": kind, "filename": filename}).json()
+            put = httpx.put(signed["signedUrl"], content=content)
+            check(put.status_code == 200, f"{kind}: PUT to signed URL")
+            check(fake.objects.get(f"uploads/{signed['path']}") == content, f"{kind}: object stored in storage")
+            confirmed = client.post(f"/entries/{entry_id}/uploads/confirm", headers=headers,
+                                    json={"kind": kind, "path": signed["path"]})
+            check(confirmed.status_code == 200, f"{kind}: confirm")
+            body = confirmed.json()
+            if kind == "waiver":
+                check(bool(body.get("waiverUrl")), "waiver: waiverUrl recorded")
+            else:
+                photos = body[f"{kind}Photos"]
+                check(len(photos) == 1 and signed["path"] in photos[0], f"{kind}: photo URL recorded")
+            # Confirming twice must not duplicate the photo
+            again = client.post(f"/entries/{entry_id}/uploads/confirm", headers=headers,
+                                json={"kind": kind, "path": signed["path"]}).json()
+            if kind != "waiver":
+                check(len(again[f"{kind}Photos"]) == 1, f"{kind}: confirm is idempotent")
+
+        missing = client.post(f"/entries/{entry_id}/uploads/confirm", headers=headers,
+                              json={"kind": "before", "path": f"photos/before/{entry_id}/never-uploaded.jpg"})
+        check(missing.status_code == 404, "confirm without upload is rejected")
+        foreign = client.post(f"/entries/{entry_id}/uploads/confirm", headers=headers,
+                              json={"kind": "before", "path": "photos/before/other-entry/x.jpg"})
+        check(foreign.status_code == 400, "confirm of another entry's path is rejected")
+
+    fake.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Check the entry read cache: hits, precise invalidation and stampede protection.
+
+Usage (from the backend directory):
+    python scripts/check_entry_cache.py
+    python scripts/check_entry_cache.py --async      # with DB_ASYNC=true
+
+Runs the app in-process on a temporary SQLite file and counts the SQL
+statements each request executes. Checks that repeated list and single-entry
+reads are served without touching the database, that a matching If-None-Match
+reads only the change counter (cache on or off), that keys include the filters, and that create, update, delete, restore, both permanent
+delete routes and the batch routes drop exactly the lists and entries they can
+affect while unrelated ones stay cached. Then checks that 20 concurrent misses
+run one load (threads and asyncio), and the shared backend with
+scripts/fake_redis.py standing in for Redis: invalidation seen by a second
+"process", one load across processes, and reads falling back to the database
+when Redis is down.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+from fake_redis import FakeRedis  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--async", dest="async_db", action="store_true", help="run with DB_ASYNC=true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/entry_cache.db",
+        "DB_ASYNC": "true" if args.async_db else "false",
+        "JOB_WORKERS": "0",
+        "ENTRY_CACHE": "memory",
+    })
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    import db
+    import entry_cache
+    from api.main import app
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('cache-check@example.com')}"}
+    statements = []
+
+    def count(conn, cursor, statement, *_) -> None:
+        statements.append(statement)
+
+    event.listen(db.get_engine(), "before_cursor_execute", count)
+    if args.async_db:
+        event.listen(db.get_async_engine().sync_engine, "before_cursor_execute", count)
+
+    with TestClient(app) as client:
+        def get(path: str, **kwargs):
+            statements.clear()
+            response = client.get(path, headers={**headers, **kwargs.pop("extra", {})}, **kwargs)
+            return response, len(statements)
+
+        def create(**fields):
+            body = {"customerPhone": "0917", "deliveryAddress": "Manila", **fields}
+            return client.post("/entries", headers=headers, json=body).json()
+
+        a = create(customerName="A", status="pending", assignedTo="tech1")
+        b = create(customerName="B", status="pending", assignedTo="tech2")
+        c = create(customerName="C", status="done", assignedTo="tech3")
+
+        # Hits
+        first, queries = get("/entries")
+        check(first.status_code == 200 and queries > 0, f"first list read queries the database ({queries})")
+        second, queries = get("/entries")
+        check(second.json() == first.json() and queries == 0, "repeat list read is a cache hit with no queries")
+        check(second.headers.get("ETag") == first.headers.get("ETag") and second.headers.get("X-Page-Size") == "100",
+              "cached response keeps ETag and page headers")
+        def entry_reads() -> int:
+            return len([s for s in statements if re.search(r'\bFROM\s+"?entry"?\b', s)])
+
+        not_modified, queries = get("/entries", extra={"If-None-Match": first.headers["ETag"]})
+        check(not_modified.status_code == 304 and queries == 1 and entry_reads() == 0,
+              "If-None-Match on a cached page: 304 from the change counter alone")
+        entry_cache.entry_cache.enabled = False
+        not_modified, _ = get("/entries", extra={"If-None-Match": first.headers["ETag"]})
+        check(not_modified.status_code == 304 and entry_reads() == 0, "cache off: 304 without reading entries")
+        entry_cache.entry_cache.enabled = True
+        pending, _ = get("/entries", params={"status": "pending"})
+        done, queries = get("/entries", params={"status": "done"})
+        check({e["id"] for e in pending.json()} == {a["id"], b["id"]} and [e["id"] for e in done.json()] == [c["id"]]
+              and queries > 0, "filters are part of the key")
+        one, _ = get(f"/entries/{a['id']}")
+        one_again, queries = get(f"/entries/{a['id']}")
+        check(one.status_code == 200 and one.json()["id"] == a["id"] and queries == 0, "single-entry read is cached")
+        missing, _ = get("/entries/does-not-exist")
+        check(missing.status_code == 404, "unknown entry is a 404")
+
+        def warm(*paths):
+            for path in paths:
+                client.get(path, headers=headers)
+
+        def cached(path: str) -> bool:
+            return get(path)[1] == 0
+
+        lists = ["/entries", "/entries?status=pending", "/entries?status=qc", "/entries?assignedTo=tech1",
+                 "/entries?assignedTo=tech3", "/entries/deleted", f"/entries/{a['id']}", f"/entries/{b['id']}"]
+
+        # Update: A pending -> qc touches the unfiltered, pending, qc and tech1 lists and A
+        warm(*lists)
+        client.patch(f"/entries/{a['id']}", headers=headers, json={"status": "qc"})
+        check(not cached("/entries?status=pending") and not cached("/entries?status=qc")
+              and not cached("/entries") and not cached("/entries?assignedTo=tech1") and not cached(f"/entries/{a['id']}"),
+              "update drops the lists matching the entry before and after, and the entry")
+        check(cached("/entries?assignedTo=tech3") and cached("/entries/deleted") and cached(f"/entries/{b['id']}"),
+              "update keeps unrelated lists, the trash and other entries")
+        check([e["id"] for e in get("/entries?status=qc")[0].json()] == [a["id"]]
+              and get(f"/entries/{a['id']}")[0].json()["status"] == "qc", "reads after the update see it")
+
+        # Soft delete and restore move A between the live lists and the trash
+        warm(*lists)
+        client.delete(f"/entries/{a['id']}", headers=headers)
+        check(not cached("/entries/deleted") and not cached("/entries?status=qc") and cached("/entries?assignedTo=tech3"),
+              "delete drops the trash and A's lists only")
+        check(get(f"/entries/{a['id']}")[0].status_code == 404, "deleted entry is no longer served")
+        warm(*lists)
+        client.post(f"/entries/{a['id']}/restore", headers=headers)
+        check(not cached("/entries/deleted") and not cached("/entries") and cached("/entries?status=pending"),
+              "restore drops the trash and A's lists only")
+
+        # Create: only lists a new pending entry for tech9 can appear in
+        warm(*lists)
+        d = create(customerName="D", status="pending", assignedTo="tech9")
+        check(not cached("/entries") and not cached("/entries?status=pending") and cached("/entries?assignedTo=tech1")
+              and cached("/entries?status=qc") and cached(f"/entries/{b['id']}"), "create drops only matching lists")
+
+        # Permanent delete, both routes
+        warm(*lists, f"/entries/{d['id']}")
+        client.delete(f"/entries/{d['id']}/permanent", headers=headers)
+        check(not cached("/entries?status=pending") and get(f"/entries/{d['id']}")[0].status_code == 404
+              and cached("/entries?assignedTo=tech3"), "permanent delete drops the entry and its lists")
+        warm(*lists)
+        client.delete(f"/entries/permanent/{c['id']}", headers=headers)
+        check(not cached("/entries?assignedTo=tech3") and cached("/entries?assignedTo=tech1"),
+              "permanent delete (alternate route) drops its lists")
+
+        # Batch routes use set-based statements: every list goes
+        warm(*lists)
+        client.patch("/entries/batch", headers=headers, json={"ids": [b["id"]], "changes": {"markedAs": "rush"}})
+        check(not cached("/entries?assignedTo=tech1") and not cached(f"/entries/{b['id']}") and cached(f"/entries/{a['id']}"),
+              "batch update drops every list and the entries it wrote")
+
+    # Stampede: 20 concurrent misses, one load
+    cache = entry_cache.EntryCache(entry_cache.MemoryBackend(100))
+    loads = []
+
+    def slow_load() -> bytes:
+        loads.append(1)
+        time.sleep(0.2)
+        return b"value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("list", lambda: "k", slow_load)))
+               for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    check(len(loads) == 1 and results == [b"value"] * 20, f"20 concurrent misses, {len(loads)} load (threads)")
+
+    async def async_stampede():
+        async_loads = []
+
+        async def load() -> bytes:
+            async_loads.append(1)
+            await asyncio.sleep(0.2)
+            return b"value"
+
+        values = await asyncio.gather(*[cache.get_or_load_async("list", lambda: "k2", load) for _ in range(20)])
+        return len(async_loads), values
+
+    count_async, values = asyncio.run(async_stampede())
+    check(count_async == 1 and values == [b"value"] * 20, f"20 concurrent misses, {count_async} load (asyncio)")
+
+    # Shared backend: two processes' caches over one fake Redis
+    fake = FakeRedis()
+    one = entry_cache.EntryCache(entry_cache.RedisBackend(fake))
+    two = entry_cache.EntryCache(entry_cache.RedisBackend(fake))
+    key = one.entry_key("abc")
+    one.get_or_load("entry", lambda: key, lambda: b"v1")
+    check(two.get_or_load("entry", lambda: two.entry_key("abc"), lambda: b"loaded") == b"v1", "shared backend: hit in another process")
+    one.invalidate(["entry:abc"])
+    check(two.get_or_load("entry", lambda: two.entry_key("abc"), lambda: b"v2") == b"v2",
+          "shared backend: invalidation seen by another process")
+
+    loads.clear()
+    first_result = []
+    leader = threading.Thread(target=lambda: first_result.append(one.get_or_load("list", lambda: "shared", slow_load)))
+    leader.start()
+    time.sleep(0.05)
+    follower = two.get_or_load("list", lambda: "shared", slow_load)
+    leader.join()
+    check(len(loads) == 1 and follower == b"value" and first_result == [b"value"],
+          "shared backend: a miss in another process waits for the first load")
+
+    fake.down = True
+    check(two.get_or_load("entry", lambda: two.entry_key("abc"), lambda: b"from-db") == b"from-db",
+          "Redis down: reads fall back to the loader")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Check the streaming export (GET /entries/export) on a large table under an RSS ceiling.
+
+Usage (from the backend directory):
+    python scripts/check_export.py                        # 1M rows, temporary SQLite file
+    python scripts/check_export.py --rows 100000 --max-rss-growth-mb 48
+    python scripts/check_export.py --database-url postgresql+psycopg2://... --rows 1000000
+
+Seeds --rows entries with photos and service details, starts a uvicorn server
+and downloads the whole table as CSV and as NDJSON while sampling the server's
+resident set size (VmRSS from /proc, so Linux only). Fails if the server grows
+by more than --max-rss-growth-mb over its size after a small warm-up export,
+if a row is missing or out of order, or if the CSV columns do not round-trip
+the NDJSON values. Also checks a filtered export and that text cells that
+would run as spreadsheet formulas are quoted. Reuses the rows already in
+the database when there are enough. Writes fake entries, so never point it at
+production.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures, start_server  # noqa: E402
+
+STATUSES = ["pending", "in-progress", "qc", "done"]
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64)
+    parser.add_argument("--port", type=int, default=8771)
+    return parser.parse_args()
+
+
+def seed(rows: int) -> int:
+    from sqlalchemy import func, insert
+    from sqlmodel import Session, select
+    from db import get_engine
+    from models import Entry as EntryModel
+
+    rng = random.Random(11)
+    start = datetime(2026, 1, 1)
+    with Session(get_engine()) as session:
+        existing = session.exec(select(func.count()).select_from(EntryModel)).one()
+        batch = []
+        for i in range(existing, rows):
+            created = start + timedelta(seconds=i * 7)
+            batch.append({
+                "public_id": uuid.uuid4().hex, "customerName": f"Customer, \"{i}\"", "customerPhone": f"0917{i:07d}",
+                "deliveryAddress": "12 Rizal St.\nManila", "itemDescription": "Nike Air Force 1",
+                "status": rng.choice(STATUSES), "billing": 450.0, "numberOfPairs": rng.randint(1, 3),
+                "beforePhotos": [f"https://cdn.example.com/before/{i}-{n}.jpg" for n in range(rng.randint(0, 3))],
+                "afterPhotos": [f"https://cdn.example.com/after/{i}.jpg"] if rng.random() < 0.5 else [],
+                "serviceDetails": {"serviceType": rng.choice(["basic", "deep"]), "qcPassed": rng.random() < 0.5,
+                                   "receivedBy": "front desk"},
+                "createdAt": created, "updatedAt": created, "deleted": i % 50 == 0,
+            })
+            if len(batch) == 10_000:
+                session.execute(insert(EntryModel), batch)
+                batch = []
+        if batch:
+            session.execute(insert(EntryModel), batch)
+        session.commit()
+        return session.exec(select(func.count()).select_from(EntryModel).where(EntryModel.deleted == False)).one()  # noqa: E712
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = rss_mb(pid)
+        self.done = threading.Event()
+
+    def run(self) -> None:
+        while not self.done.wait(0.05):
+            self.peak = max(self.peak, rss_mb(self.pid))
+
+
+def download(client: httpx.Client, fmt: str, pid: int, params: dict = None):
+    sampler = RssSampler(pid)
+    sampler.start()
+    t0 = time.perf_counter()
+    chunks = []
+    with client.stream("GET", "/entries/export", params={"format": fmt, **(params or {})}) as response:
+        check(response.status_code == 200, f"GET /entries/export?format={fmt}")
+        for chunk in response.iter_bytes():
+            chunks.append(chunk)
+    sampler.done.set()
+    sampler.join()
+    return response, b"".join(chunks), time.perf_counter() - t0, sampler.peak
+
+
+def main() -> None:
+    args = parse_args()
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/export.db"
+    env = {**os.environ, "DATABASE_URL": url, "JOB_WORKERS": "0", "HASH_WORKERS": "0"}
+    os.environ.update(env)
+
+    from auth import create_access_token
+    import db
+    import export
+
+    entry = dict.fromkeys(export.ENTRY_FIELDS)
+    entry.update(customerName='=HYPERLINK("http://example.com")', customerPhone="+639171234567",
+                 deliveryAddress="@SUM(A1)", itemDescription="-1+2", shoeCondition="\tx", markedAs="\rx",
+                 assignedTo="Ana = tech", billing=-5.0, serviceDetails=None)
+    row = dict(zip(export.CSV_COLUMNS, export.csv_row(entry)))
+    check(all(row[f].startswith("'") for f in ("customerName", "customerPhone", "deliveryAddress", "itemDescription",
+                                                "shoeCondition", "markedAs"))
+          and row["assignedTo"] == "Ana = tech" and row["billing"] == -5.0, "formula-like CSV cells are quoted")
+
+    db.init_db()
+    t0 = time.perf_counter()
+    live = seed(args.rows)
+    print(f"{live} live entries ready in {time.perf_counter() - t0:.1f}s")
+    token = create_access_token("export-check@example.com")
+
+    proc = start_server(args.port, env)
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        check(httpx.get(f"{base}/entries/export").status_code == 401, "export requires a token")
+        headers = {"Authorization": f"Bearer {token}"}
+        with httpx.Client(base_url=base, headers=headers, timeout=600) as client:
+            check(client.get("/entries/export", params={"format": "xml"}).status_code == 422, "unknown format rejected")
+            download(client, "csv", proc.pid, {"status": "qc", "createdTo": "2026-01-02T00:00:00"})
+            baseline = rss_mb(proc.pid)
+            print(f"server RSS after warm-up: {baseline:.0f} MB")
+
+            response, body, seconds, peak = download(client, "csv", proc.pid)
+            check("attachment" in response.headers.get("content-disposition", ""), "sent as an attachment")
+            rows = list(csv.reader(io.StringIO(body.decode())))
+            check(rows[0] == export.CSV_COLUMNS, "CSV header")
+            check(len(rows) - 1 == live, f"CSV: {len(rows) - 1} rows, {len(body) / 2**20:.0f} MB in {seconds:.1f}s "
+                                         f"({live / seconds:,.0f} rows/s)")
+            check(peak - baseline <= args.max_rss_growth_mb,
+                  f"CSV: server RSS peaked at {peak:.0f} MB (+{peak - baseline:.1f} MB, ceiling +{args.max_rss_growth_mb:.0f})")
+            csv_head = rows[1:1001]
+            del rows, body
+
+            response, body, seconds, peak = download(client, "ndjson", proc.pid)
+            check(response.headers["content-type"].startswith("application/x-ndjson"), "NDJSON content type")
+            lines = body.splitlines()
+            check(len(lines) == live, f"NDJSON: {len(lines)} rows, {len(body) / 2**20:.0f} MB in {seconds:.1f}s "
+                                      f"({live / seconds:,.0f} rows/s)")
+            check(peak - baseline <= args.max_rss_growth_mb,
+                  f"NDJSON: server RSS peaked at {peak:.0f} MB (+{peak - baseline:.1f} MB, ceiling +{args.max_rss_growth_mb:.0f})")
+            head = [json.loads(line) for line in lines[:1000]]
+            tail = json.loads(lines[-1])
+            del lines, body
+
+            check(all((a["createdAt"], a["id"]) <= (b["createdAt"], b["id"]) for a, b in zip(head, head[1:]))
+                  and head[-1]["createdAt"] <= tail["createdAt"], "oldest first")
+            check([r[0] for r in csv_head] == [e["id"] for e in head], "CSV and NDJSON list the same entries")
+            column = export.CSV_COLUMNS.index
+            flattened = all(
+                r[column("beforePhotos")] == export.PHOTO_SEPARATOR.join(e["beforePhotos"])
+                and r[column("customerName")] == e["customerName"]
+                and r[column("deliveryAddress")] == e["deliveryAddress"]
+                and r[column("serviceDetails.serviceType")] == e["serviceDetails"]["serviceType"]
+                and r[column("serviceDetails.qcPassed")] == ("true" if e["serviceDetails"]["qcPassed"] else "false")
+                for r, e in zip(csv_head, head))
+            check(flattened, "photos and serviceDetails flattened into CSV columns")
+
+            _, body, _, _ = download(client, "ndjson", proc.pid, {"status": "qc", "serviceType": "deep"})
+            filtered = [json.loads(line) for line in body.splitlines()]
+            check(filtered and all(e["status"] == "qc" and e["serviceDetails"]["serviceType"] == "deep" for e in filtered),
+                  f"filters as for GET /entries ({len(filtered)} rows)")
+            _, body, _, _ = download(client, "ndjson", proc.pid, {"includeDeleted": "true", "createdTo": "2026-01-02T00:00:00"})
+            check(any(json.loads(line)["deleted"] for line in body.splitlines()), "includeDeleted adds soft-deleted entries")
+    finally:
+        proc.terminate()
+        proc.wait()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
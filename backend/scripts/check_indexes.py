@@ -0,0 +1,126 @@
+"""Seed a scratch database and check that the hot entry queries use an index.
+
+Usage (from the backend directory):
+    python scripts/check_indexes.py                      # temporary SQLite file
+    python scripts/check_indexes.py --database-url postgresql+psycopg2://...
+
+Never point this at a production database: it inserts --rows fake entries.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=20000)
+    return parser.parse_args()
+
+
+def seed(session, rows: int) -> None:
+    from models import Entry as EntryModel, User as UserModel
+
+    rnd = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=365)
+    statuses = ["pending", "in-progress", "qc", "done"]
+    techs = [f"tech{i}" for i in range(8)]
+    batch = []
+    for i in range(rows):
+        deleted = rnd.random() < 0.1
+        created = start + timedelta(minutes=i * 5)
+        batch.append(EntryModel(
+            public_id=f"{i:032x}",
+            customerPhone=f"0917{i:07d}",
+            deliveryAddress="Manila",
+            status=rnd.choice(statuses),
+            assignedTo=rnd.choice(techs),
+            createdAt=created,
+            updatedAt=created,
+            deleted=deleted,
+            deletedAt=created + timedelta(days=1) if deleted else None,
+        ))
+        if len(batch) == 5000:
+            session.add_all(batch)
+            session.commit()
+            batch = []
+    session.add_all(batch)
+    # Enough users that the planner prefers the email index over a scan
+    session.add_all(UserModel(email=f"user{i}@example.com", password_hash="x") for i in range(2000))
+    session.add(UserModel(email="seed@example.com", password_hash="x", verified=True))
+    session.commit()
+
+
+def hot_queries():
+    from sqlmodel import select
+    from models import Entry as EntryModel, User as UserModel
+    from queries import EntryFilters, PageParams, encode_cursor, page_statement, select_deleted, select_live
+
+    first = PageParams(limit=100, cursor=None, order="desc")
+    later = PageParams(limit=100, cursor=encode_cursor(datetime.utcnow() - timedelta(days=30), 10**9), order="desc")
+    return {
+        "list_entries": page_statement(EntryFilters().apply(select_live()), first),
+        "list_entries (cursor)": page_statement(EntryFilters().apply(select_live()), later),
+        "list_entries (status)": page_statement(EntryFilters(status="qc").apply(select_live()), first),
+        "list_entries (assignedTo)": page_statement(EntryFilters(assignedTo="tech3").apply(select_live()), first),
+        "list_deleted_entries": page_statement(EntryFilters().apply(select_deleted()), first),
+        "entry by public_id": select(EntryModel).where(EntryModel.public_id == f"{7:032x}"),
+        "user by email": select(UserModel).where(UserModel.email == "seed@example.com"),
+    }
+
+
+def explain(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "postgresql":
+        rows = conn.exec_driver_sql(f"EXPLAIN {compiled}").fetchall()
+    else:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return "\n".join(str(r[-1]) for r in rows)
+
+
+def uses_index(dialect: str, plan: str) -> bool:
+    if dialect == "postgresql":
+        return "Seq Scan" not in plan
+    for line in plan.splitlines():
+        if line.startswith("SCAN") and "USING" not in line:
+            return False
+        if "TEMP B-TREE FOR ORDER BY" in line:
+            return False
+    return True
+
+
+def main() -> int:
+    args = parse_args()
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{tempfile.mkdtemp()}/check_indexes.db"
+    os.environ["DATABASE_URL"] = url
+
+    from sqlmodel import Session
+    from sqlalchemy import text
+    import db
+
+    db.init_db()
+    with Session(db.engine) as session:
+        seed(session, args.rows)
+    with db.engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        failures = 0
+        for name, stmt in hot_queries().items():
+            plan = explain(conn, stmt)
+            ok = uses_index(conn.dialect.name, plan)
+            failures += not ok
+            print(f"[{'ok' if ok else 'SEQ SCAN'}] {name}")
+            for line in plan.splitlines():
+                print(f"    {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
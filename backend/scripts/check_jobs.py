@@ -0,0 +1,131 @@
+"""Exercise the background job queue against the fake mail API.
+
+Usage (from the backend directory):
+    python scripts/check_jobs.py
+
+Runs the app in-process against scripts/fake_mail.py and a temporary SQLite
+database (or DATABASE_URL if set) and checks that registration does not wait
+for the mail provider, that failed sends are retried with backoff, that jobs
+out of attempts (or with permanent errors) are kept as dead, that status
+changes notify the customer (with the name HTML-escaped), and that
+GET /jobs/drain runs queued jobs only for the cron secret.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+from fake_mail import FakeMail  # noqa: E402
+
+
+def main() -> int:
+    mail = FakeMail().start()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/jobs_check.db")
+    os.environ.update({
+        "RESEND_API_URL": mail.url,
+        "RESEND_API_KEY": "re_fake",
+        "JOB_WORKERS": "0",
+        "JOB_POLL_INTERVAL": "0.05",
+        "JOB_BACKOFF_BASE": "0.1",
+        "JOB_MAX_ATTEMPTS": "3",
+        "NOTIFY_STATUS_CHANGES": "true",
+    })
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+    from api.main import app
+    from auth import create_access_token
+    from db import get_engine
+    import jobs as job_queue
+    from jobs import job_worker
+    from models import Job
+
+    def jobs(status: str):
+        with Session(get_engine()) as session:
+            return session.exec(select(Job).where(Job.status == status)).all()
+
+    def wait_until(condition, timeout: float = 10) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return False
+
+    suffix = int(time.time())
+    with TestClient(app) as client:
+        mail.delay = 2.0
+        t0 = time.perf_counter()
+        r = client.post("/auth/register", json={"email": f"slow-{suffix}@example.com", "password": "pw", "first_name": "Ana"})
+        elapsed = time.perf_counter() - t0
+        check(r.status_code == 200, "register succeeds")
+        check(elapsed < 1.0, f"register does not wait for a 2 s mail provider ({elapsed * 1000:.0f} ms)")
+        check(len([j for j in jobs("pending") if j.payload["email"] == f"slow-{suffix}@example.com"]) == 1, "registration email is queued with the user")
+
+        job_worker.workers = 2
+        job_worker.poll_interval = 0.05
+        job_worker.start()
+        check(mail.wait_for(1), "worker delivers the queued email")
+        sent = mail.messages[0]
+        check("/auth/verify?token=" in sent["html"] and f"slow-{suffix}@example.com" in sent["html"], "email carries the verify link")
+        check(wait_until(lambda: not jobs("pending") and not jobs("running")), "delivered job is removed")
+
+        mail.reset()
+        mail.fail_next(2, 503)
+        client.post("/auth/register", json={"email": f"retry-{suffix}@example.com", "password": "pw"})
+        check(mail.wait_for(1), "email delivered after two 503s")
+        check(mail.attempts == 3, f"three attempts made ({mail.attempts})")
+
+        dead_before = len(jobs("dead"))
+        mail.reset()
+        mail.fail_next(1, 422)
+        client.post("/auth/register", json={"email": f"invalid-{suffix}@example.com", "password": "pw"})
+        check(wait_until(lambda: len(jobs("dead")) == dead_before + 1), "a 422 sends the job straight to dead")
+        check(mail.attempts == 1, f"permanent errors are not retried ({mail.attempts} attempt)")
+
+        mail.reset()
+        mail.fail_next(10, 500)
+        client.post("/auth/register", json={"email": f"down-{suffix}@example.com", "password": "pw"})
+        check(wait_until(lambda: len(jobs("dead")) == dead_before + 2), "job is dead after JOB_MAX_ATTEMPTS failures")
+        check(mail.attempts == 3, f"stopped after 3 attempts ({mail.attempts})")
+        dead = max(jobs("dead"), key=lambda j: j.id)
+        check(bool(dead.last_error and "500" in dead.last_error), "dead job keeps the last error")
+
+        mail.reset()
+        headers = {"Authorization": f"Bearer {create_access_token('jobs-check@example.com')}"}
+        entry = client.post("/entries", headers=headers, json={
+            "customerPhone": "0917", "deliveryAddress": "Manila", "customerName": "Ben <b>", "customerEmail": "ben@example.com",
+        }).json()
+        client.patch(f"/entries/{entry['id']}", headers=headers, json={"itemDescription": "Boots"})
+        client.patch(f"/entries/{entry['id']}", headers=headers, json={"status": "in_progress"})
+        check(mail.wait_for(1), "status change emails the customer")
+        check(len(mail.messages) == 1 and mail.messages[0]["to"] == ["ben@example.com"], "only the status change notifies")
+        check("Ben &lt;b&gt;" in mail.messages[0]["html"], "customer name is HTML-escaped")
+
+        # No worker threads (as on Vercel): a cron request drains the queue
+        job_worker.stop()
+        mail.reset()
+        client.post("/auth/register", json={"email": f"cron-{suffix}@example.com", "password": "pw"})
+        job_queue.JOB_DRAIN_SECRET = None
+        check(client.get("/jobs/drain").status_code == 404, "drain route is off without CRON_SECRET")
+        job_queue.JOB_DRAIN_SECRET = "cron-secret"
+        check(client.get("/jobs/drain", headers={"Authorization": "Bearer wrong"}).status_code == 401,
+              "drain route rejects a wrong secret")
+        check(not mail.messages and len(jobs("pending")) == 1, "job waits in the queue")
+        r = client.get("/jobs/drain", headers={"Authorization": "Bearer cron-secret"})
+        check(r.status_code == 200 and r.json()["ran"] == 1 and len(mail.messages) == 1, "drain route runs the queued job")
+        job_queue.JOB_DRAIN_SECRET = None
+
+    job_worker.stop()
+    mail.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
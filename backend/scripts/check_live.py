@@ -0,0 +1,172 @@
+"""Check the live entry events stream (GET /entries/events) with many subscribers.
+
+Usage (from the backend directory):
+    python scripts/check_live.py                          # temporary SQLite file
+    python scripts/check_live.py --subscribers 500
+    python scripts/check_live.py --database-url postgresql+psycopg2://... --workers 2
+
+Starts a uvicorn server, opens --subscribers server-sent event streams, then
+creates, updates, deletes and batch-restores an entry and checks that every
+subscriber got each event exactly once, in order. Also checks the heartbeat,
+auth (bearer header or a stream ticket, never the access token in the URL),
+and (in process) that a subscriber that stops reading is sent a resync
+instead of holding up the others. With Postgres and --workers > 1 the events
+go through LISTEN/NOTIFY, so subscribers on one worker must see writes made
+through another. Writes fake entries, so never point it at production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures, start_server  # noqa: E402
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--subscribers", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8769)
+    return parser.parse_args()
+
+
+async def subscribe(client: httpx.AsyncClient, token: str, connected: asyncio.Event, counter: list,
+                    total: int, expected: int) -> list:
+    events = []
+    ticket = (await client.post("/entries/events/ticket", headers={"Authorization": f"Bearer {token}"})).json()["ticket"]
+    async with client.stream("GET", "/entries/events", params={"ticket": ticket}) as response:
+        async for line in response.aiter_lines():
+            if line == ": connected":
+                counter[0] += 1
+                if counter[0] == total:
+                    connected.set()
+            elif line.startswith("data: "):
+                events.append(json.loads(line[6:]))
+                if len(events) >= expected:
+                    return events
+    return events
+
+
+async def fan_out(base: str, token: str, subscribers: int) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    # No keep-alive: a stream sent on the connection its ticket request used
+    # can race uvicorn closing that connection as idle
+    limits = httpx.Limits(max_connections=subscribers + 10, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        connected, counter = asyncio.Event(), [0]
+        tasks = [asyncio.create_task(subscribe(client, token, connected, counter, subscribers, 4))
+                 for _ in range(subscribers)]
+        await asyncio.wait_for(connected.wait(), 60)
+        print(f"{subscribers} subscribers connected")
+
+        started = time.perf_counter()
+        entry = (await client.post("/entries", headers=headers, json={"customerPhone": "0917", "deliveryAddress": "Manila"})).json()
+        await client.patch(f"/entries/{entry['id']}", headers=headers, json={"status": "in-progress"})
+        await client.delete(f"/entries/{entry['id']}", headers=headers)
+        await client.post("/entries/batch/restore", headers=headers, json={"ids": [entry["id"]]})
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 60)
+        elapsed = time.perf_counter() - started
+
+        wanted = ["created", "updated", "deleted", "restored"]
+        good = [r for r in results if isinstance(r, list)
+                and [e["type"] for e in r] == wanted and all(e["ids"] == [entry["id"]] for e in r)]
+        check(len(good) == subscribers, f"{len(good)}/{subscribers} subscribers got {', '.join(wanted)} in order")
+        versions = [e["version"] for e in good[0]] if good else []
+        check(versions == sorted(versions) and len(set(versions)) == 4, "each event carries a newer version")
+        print(f"4 writes delivered to {subscribers} subscribers in {elapsed * 1000:.0f} ms")
+
+        unauthorized = await client.get("/entries/events")
+        check(unauthorized.status_code == 401, "stream without a token is rejected")
+        in_url = await client.get("/entries/events", params={"access_token": token})
+        check(in_url.status_code == 401, "access token in the URL is not accepted")
+        ticket = (await client.post("/entries/events/ticket", headers=headers)).json()["ticket"]
+        as_bearer = await client.get("/entries", headers={"Authorization": f"Bearer {ticket}"})
+        check(as_bearer.status_code == 401, "a stream ticket is not accepted as a bearer token")
+        from auth import create_ticket
+        expired = await client.get("/entries/events", params={"ticket": create_ticket("live-check@example.com", "entry_events", -1)})
+        check(expired.status_code == 401, "expired ticket is rejected")
+
+
+async def heartbeat(base: str, token: str) -> None:
+    async with httpx.AsyncClient(base_url=base, timeout=10) as client:
+        async with client.stream("GET", "/entries/events", headers={"Authorization": f"Bearer {token}"}) as response:
+            check(response.headers["content-type"].startswith("text/event-stream"), "stream is text/event-stream")
+            lines = response.aiter_lines()
+            deadline = time.perf_counter() + 5
+            while time.perf_counter() < deadline:
+                if await asyncio.wait_for(lines.__anext__(), 5) == ": ping":
+                    check(True, "idle stream gets a heartbeat")
+                    return
+    check(False, "idle stream gets a heartbeat")
+
+
+async def backpressure() -> None:
+    from live import Hub
+
+    hub = Hub(queue_size=5, max_subscribers=2)
+    hub.bind(asyncio.get_running_loop())
+    fast, stalled = hub.subscribe(), hub.subscribe()
+    try:
+        hub.subscribe()
+        check(False, "subscriber limit is enforced")
+    except Exception as e:
+        check(getattr(e, "status_code", None) == 503, "subscriber limit is enforced")
+
+    received = []
+
+    async def drain():
+        while len(received) < 50:
+            received.append(await fast.queue.get())
+
+    reader = asyncio.create_task(drain())
+    # Publish from another thread, as request handlers running in the threadpool do
+    publisher = threading.Thread(target=lambda: [(hub.publish({"type": "updated", "ids": [str(i)], "version": i}),
+                                                  time.sleep(0.001)) for i in range(1, 51)])
+    publisher.start()
+    await asyncio.get_running_loop().run_in_executor(None, publisher.join)
+    await asyncio.wait_for(reader, 10)
+    check([e["version"] for e in received] == list(range(1, 51)), "reading subscriber gets every event")
+    pending = [stalled.queue.get_nowait() for _ in range(stalled.queue.qsize())]
+    check(len(pending) <= 5 and any(e["type"] == "resync" for e in pending),
+          f"stalled subscriber is capped at its queue size and told to resync ({stalled.resyncs} overflows)")
+
+
+def main() -> None:
+    args = parse_args()
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/live.db"
+    env = {**os.environ, "DATABASE_URL": url, "JOB_WORKERS": "0", "HASH_WORKERS": "0",
+           "LIVE_HEARTBEAT": "1", "LIVE_PG_NOTIFY": "true" if args.workers > 1 else "false"}
+    os.environ.update(env)
+
+    from auth import create_access_token
+    import db
+
+    db.init_db()
+    token = create_access_token("live-check@example.com")
+    asyncio.run(backpressure())
+
+    proc = start_server(args.port, env, args.workers)
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        asyncio.run(fan_out(base, token, args.subscribers))
+        asyncio.run(heartbeat(base, token))
+    finally:
+        proc.terminate()
+        proc.wait()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
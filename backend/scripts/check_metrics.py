@@ -0,0 +1,133 @@
+"""Check the request metrics middleware and GET /metrics.
+
+Usage (from the backend directory):
+    python scripts/check_metrics.py
+
+Runs the app in-process against scripts/fake_storage.py, scripts/fake_mail.py
+and a temporary SQLite file. Lists, creates, patches and uploads a waiver, sends
+an email, then scrapes /metrics and checks the route-template latency
+histograms, per-request query counts, statement timings, outbound Supabase and
+Resend timings, serialization time and pool gauges. Also checks METRICS_TOKEN,
+that log records carry their `extra` fields as JSON, and that a waiver upload
+that storage rejects is logged and answered with a 500.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+from fake_mail import FakeMail  # noqa: E402
+from fake_storage import FakeStorage  # noqa: E402
+
+
+def samples(text: str) -> dict:
+    # "name{labels}" -> value, for every sample line
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, _, value = line.rpartition(" ")
+            out[key] = float(value)
+    return out
+
+
+def main() -> int:
+    storage, mail = FakeStorage().start(), FakeMail().start()
+    os.environ.update({
+        "SUPABASE_URL": storage.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "RESEND_API_URL": mail.url,
+        "RESEND_API_KEY": "re_fake",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/metrics.db",
+        "JOB_WORKERS": "0",
+    })
+
+    from fastapi.testclient import TestClient
+    import metrics
+    from api.main import app
+    from auth import create_access_token
+    from logs import JsonFormatter
+    from notifications import send_email
+
+    headers = {"Authorization": f"Bearer {create_access_token('metrics-check@example.com')}"}
+    with TestClient(app) as client:
+        for i in range(3):
+            entry = client.post("/entries", headers=headers, json={"customerPhone": f"0917{i}", "deliveryAddress": "Manila"}).json()
+            client.patch(f"/entries/{entry['id']}", headers=headers, json={"status": "qc"})
+        client.get("/entries", headers=headers)
+        client.patch("/entries/does-not-exist", headers=headers, json={"status": "qc"})
+        upload = client.post("/upload/waiver", headers=headers,
+                             files={"file": ("waiver.pdf", b"%PDF-1.4 metrics", "application/pdf")})
+        check(upload.status_code == 200, "waiver upload")
+        send_email(["ops@example.com"], "metrics check", "<p>hi</p>")
+
+        metrics.METRICS_TOKEN = "scrape-secret"
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        check(response.status_code == 200 and response.headers["content-type"].startswith("text/plain"),
+              "GET /metrics in Prometheus text format")
+        text = response.text
+        values = samples(text)
+
+        check(values.get('http_requests_total{method="PATCH",route="/entries/{entry_id}",status="200"}') == 3,
+              "requests counted per route template, not per id")
+        check(values.get('http_requests_total{method="PATCH",route="/entries/{entry_id}",status="404"}') == 1,
+              "status codes recorded")
+        check(values.get('http_request_duration_seconds_count{method="POST",route="/entries"}') == 3
+              and 'http_request_duration_seconds_bucket{method="POST",route="/entries",le="+Inf"} 3' in text,
+              "latency histogram per route")
+        check(values.get('db_queries_per_request_count{route="/entries"}', 0) >= 4
+              and values.get('db_queries_per_request_sum{route="/entries"}', 0) > 0, "queries per request")
+        check(values.get('db_query_duration_seconds_count{operation="SELECT"}', 0) > 0
+              and values.get('db_query_duration_seconds_count{operation="INSERT"}', 0) >= 3, "statement timings by operation")
+        check(values.get('outbound_request_duration_seconds_count{service="supabase",operation="upload",outcome="ok"}') == 1
+              and values.get('outbound_request_duration_seconds_count{service="supabase",operation="create_signed_urls",outcome="ok"}') == 1,
+              "Supabase calls timed")
+        check(values.get('outbound_request_duration_seconds_count{service="resend",operation="send_email",outcome="ok"}') == 1,
+              "Resend calls timed")
+        check(values.get('serialization_seconds_per_request_count{route="/entries"}', 0) >= 1, "serialization time")
+        check(values.get("db_pool_checkouts_total", 0) > 0 and "db_pool_connections_in_use" in values, "pool gauges")
+        check(values.get("http_requests_in_progress") == 1, "in-progress gauge (the scrape itself)")
+        check(not re.search(r'route="/entries/[0-9a-f]{32}', text), "no raw ids in labels")
+
+        check(client.get("/metrics").status_code == 401, "METRICS_TOKEN required")
+        check(client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401, "wrong token rejected")
+        metrics.METRICS_TOKEN = None
+        check(client.get("/metrics").status_code == 404, "no /metrics without METRICS_TOKEN")
+
+    record = logging.LogRecord("api.main", logging.WARNING, __file__, 1, "Slow request %s", ("x",), None)
+    record.route, record.queries = "/entries", 12
+    line = json.loads(JsonFormatter().format(record))
+    check(line["msg"] == "Slow request x" and line["route"] == "/entries" and line["queries"] == 12
+          and line["level"] == "WARNING", "JSON log lines carry extra fields")
+
+    # A failed upload is logged with its extra fields; "filename" would clash with LogRecord's own
+    errors = []
+    capture = logging.Handler(logging.ERROR)
+    capture.emit = errors.append
+    logging.getLogger("api.main").addHandler(capture)
+    storage.buckets.pop("uploads")
+    with TestClient(app, raise_server_exceptions=False) as client:
+        failed = client.post("/upload/waiver", headers=headers,
+                             files={"file": ("lost.pdf", b"%PDF-1.4 metrics", "application/pdf")})
+    logging.getLogger("api.main").removeHandler(capture)
+    check(failed.status_code == 500 and failed.text.startswith('{"detail":"Upload failed'),
+          "failed storage upload answers 500 Upload failed")
+    line = json.loads(JsonFormatter().format(errors[0])) if errors else {}
+    check(line.get("msg") == "Waiver upload failed" and line.get("upload_filename") == "lost.pdf"
+          and line.get("user") == "metrics-check@example.com", "failed upload logged with its filename")
+
+    storage.stop()
+    mail.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
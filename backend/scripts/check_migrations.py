@@ -0,0 +1,235 @@
+"""Check the versioned migration runner against a database with the legacy schema.
+
+Usage (from the backend directory):
+    python scripts/check_migrations.py                      # temporary SQLite file
+    python scripts/check_migrations.py --database-url postgresql+psycopg2://...
+
+Never point this at a real database: it drops every table in it first.
+
+Creates the tables as they were before the ALTERs that init_db used to run
+(no soft-delete, version, completedAt or waiverUrl columns, user.verified
+missing, JSON kept as TEXT, some numberOfPairs NULL), then starts --workers
+`python migrate.py` processes at once and checks that:
+
+- every migration was applied by exactly one of them and recorded once
+- the columns were added, numberOfPairs NULL -> 1 and completedAt were
+  backfilled, the change counter and indexes exist (and JSONB on Postgres)
+- a second run applies nothing and does not wait for the migration lock
+- backfills commit in batches of MIGRATION_BATCH_SIZE rows
+- a failed index build raises and leaves its migration pending, and (on
+  Postgres) an INVALID index left by a failed concurrent build is rebuilt
+- the API serves the migrated rows
+- an empty database migrated from scratch has the tables, columns and
+  indexes of models.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+
+LEGACY_TABLES = [
+    'CREATE TABLE "user" ("id" {pk}, "email" VARCHAR NOT NULL UNIQUE, "password_hash" VARCHAR NOT NULL, '
+    '"first_name" VARCHAR, "last_name" VARCHAR, "phone" VARCHAR, "created_at" TIMESTAMP NOT NULL)',
+    'CREATE TABLE "entry" ("id" {pk}, "public_id" VARCHAR NOT NULL UNIQUE, "customerName" VARCHAR NOT NULL, '
+    '"customerPhone" VARCHAR NOT NULL, "customerEmail" VARCHAR NOT NULL, "deliveryAddress" VARCHAR NOT NULL, '
+    '"itemDescription" VARCHAR NOT NULL, "shoeCondition" VARCHAR NOT NULL, "shoeService" VARCHAR, '
+    '"waiverSigned" BOOLEAN NOT NULL, "beforePhotos" TEXT, "assignedTo" VARCHAR, "needsReglue" BOOLEAN, '
+    '"needsPaint" BOOLEAN, "status" VARCHAR NOT NULL, "serviceDetails" TEXT, "afterPhotos" TEXT, "billing" FLOAT, '
+    '"additionalBilling" FLOAT, "deliveryOption" VARCHAR, "markedAs" VARCHAR, "numberOfPairs" INTEGER, '
+    '"createdAt" TIMESTAMP NOT NULL, "updatedAt" TIMESTAMP NOT NULL)',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    return parser.parse_args()
+
+
+def drop_tables(engine) -> None:
+    from sqlalchemy import MetaData, text
+
+    with engine.begin() as conn:
+        # SQLite's FTS table first, which drops its shadow tables with it
+        conn.execute(text('DROP TABLE IF EXISTS "entry_search"'))
+    metadata = MetaData()
+    metadata.reflect(engine)
+    metadata.drop_all(engine)
+
+
+def create_legacy_schema(engine, rows: int) -> None:
+    from datetime import datetime, timedelta
+    from sqlalchemy import text
+
+    drop_tables(engine)
+    postgres = engine.dialect.name == "postgresql"
+    with engine.begin() as conn:
+        for ddl in LEGACY_TABLES:
+            conn.execute(text(ddl.format(pk="SERIAL PRIMARY KEY" if postgres else "INTEGER PRIMARY KEY")))
+        start = datetime(2025, 1, 1)
+        conn.execute(text(
+            'INSERT INTO "entry" ("public_id", "customerName", "customerPhone", "customerEmail", "deliveryAddress", '
+            '"itemDescription", "shoeCondition", "waiverSigned", "beforePhotos", "status", "serviceDetails", '
+            '"afterPhotos", "numberOfPairs", "createdAt", "updatedAt") VALUES (:public_id, \'Customer\', :phone, \'\', '
+            '\'Manila\', \'Sneakers\', \'\', false, :photos, :status, :details, \'[]\', :pairs, :created, :updated)'
+        ), [{
+            "public_id": f"{i:032x}", "phone": f"0917{i:07d}", "photos": json.dumps([f"https://cdn.example.com/{i}.jpg"]),
+            "status": "done" if i % 4 == 0 else "pending", "details": json.dumps({"qcPassed": i % 2 == 0}),
+            "pairs": None if i % 3 == 0 else 2, "created": start + timedelta(minutes=i),
+            "updated": start + timedelta(minutes=i, hours=5),
+        } for i in range(rows)])
+        conn.execute(text('INSERT INTO "user" ("email", "password_hash", "created_at") VALUES (\'old@example.com\', \'x\', :now)'),
+                     {"now": start})
+
+
+def run_workers(count: int, env: dict) -> list:
+    # Started together; each reports the versions it applied in its last log line
+    procs = [subprocess.Popen([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE,
+                              text=True) for _ in range(count)]
+    applied = []
+    for proc in procs:
+        out, _ = proc.communicate(timeout=600)
+        if proc.returncode != 0:
+            raise RuntimeError(f"migrate.py exited with {proc.returncode}")
+        applied.append(json.loads(out.strip().splitlines()[-1])["applied"])
+    return applied
+
+
+def main() -> int:
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/migrations.db"
+    os.environ["DATABASE_URL"] = database_url
+    env = dict(os.environ, LOG_FORMAT="json", LOG_LEVEL="INFO", JOB_WORKERS="0")
+
+    from sqlalchemy import event, inspect, text
+    import db
+    import migrations
+
+    engine = db.get_engine()
+    postgres = engine.dialect.name == "postgresql"
+    create_legacy_schema(engine, args.rows)
+    versions = [m.version for m in migrations.MIGRATIONS]
+
+    applied = run_workers(args.workers, env)
+    flat = sorted(v for worker in applied for v in worker)
+    check(flat == versions, f"{args.workers} concurrent workers applied each migration once ({applied})")
+    with engine.connect() as conn:
+        recorded = conn.execute(text('SELECT "version" FROM "schemamigration" ORDER BY "version"')).scalars().all()
+        check(recorded == versions, "every version recorded once")
+        columns = {c["name"]: c for c in inspect(conn).get_columns("entry")}
+        check({"waiverUrl", "deleted", "deletedAt", "version", "completedAt"} <= set(columns), "entry columns added")
+        check("verified" in {c["name"] for c in inspect(conn).get_columns("user")}, "user.verified added")
+        nulls = conn.execute(text('SELECT count(*) FROM "entry" WHERE "numberOfPairs" IS NULL')).scalar()
+        check(nulls == 0, "numberOfPairs NULL backfilled to 1")
+        twos = conn.execute(text('SELECT count(*) FROM "entry" WHERE "numberOfPairs" = 2')).scalar()
+        check(twos == args.rows - (args.rows + 2) // 3, "other numberOfPairs values untouched")
+        completed = conn.execute(text(
+            'SELECT count(*) FROM "entry" WHERE "status" = \'done\' AND "completedAt" = "updatedAt"')).scalar()
+        check(completed == (args.rows + 3) // 4, "completedAt backfilled for done entries")
+        check(conn.execute(text('SELECT count(*) FROM "changecounter"')).scalar() == 1, "change counter created")
+        indexes = {i["name"] for i in inspect(conn).get_indexes("entry")}
+        check("ix_entry_live_created" in indexes, "entry indexes created")
+        if postgres:
+            kind = conn.execute(text(
+                "SELECT data_type FROM information_schema.columns WHERE table_schema = current_schema() "
+                "AND table_name = 'entry' AND column_name = 'beforePhotos'")).scalar()
+            check(kind == "jsonb", "JSON columns converted to JSONB")
+
+    # Up to date: applies nothing, and does not wait for a lock someone else holds
+    with engine.connect() as holder:
+        with migrations.migration_lock(engine, holder):
+            start = time.perf_counter()
+            again = run_workers(1, env)
+            seconds = time.perf_counter() - start
+    check(again == [[]] and seconds < 30, f"second run applies nothing without taking the lock ({seconds:.1f} s)")
+
+    with engine.begin() as conn:
+        conn.execute(text('UPDATE "entry" SET "numberOfPairs" = NULL WHERE "id" % 5 = 0'))
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    migrations.MIGRATION_BATCH_SIZE = 500
+    with engine.connect() as conn:
+        migrations.backfill(conn, "entry", '"numberOfPairs" = 1', '"numberOfPairs" IS NULL')
+    with engine.connect() as conn:
+        nulls = conn.execute(text('SELECT count(*) FROM "entry" WHERE "numberOfPairs" IS NULL')).scalar()
+    check(nulls == 0 and len(commits) >= args.rows // 500, f"backfill committed in {len(commits)} batches")
+
+    def recorded_versions() -> list:
+        with engine.connect() as conn:
+            return conn.execute(text('SELECT "version" FROM "schemamigration" ORDER BY "version"')).scalars().all()
+
+    with engine.begin() as conn:
+        conn.execute(text('DELETE FROM "schemamigration" WHERE "version" = 8'))
+    db.ENTRY_INDEXES.append('CREATE INDEX {concurrently} IF NOT EXISTS "ix_broken" ON "no_such_table" ("id")')
+    try:
+        migrations.run_migrations()
+        raised = False
+    except Exception:
+        raised = True
+    finally:
+        db.ENTRY_INDEXES.pop()
+    check(raised and 8 not in recorded_versions(), "a failed index build raises and is not recorded")
+    if postgres:
+        # A unique concurrent build over duplicate values fails and leaves the index INVALID
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text('DROP INDEX "ix_entry_live_created"'))
+            try:
+                conn.execute(text('CREATE UNIQUE INDEX CONCURRENTLY "ix_entry_live_created" ON "entry" ("status")'))
+            except Exception:
+                pass
+    check(migrations.run_migrations() == [8] and recorded_versions() == versions, "index migration applied on the next run")
+    if postgres:
+        with engine.connect() as conn:
+            valid = conn.execute(text(
+                "SELECT i.indisvalid, i.indisunique FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = 'ix_entry_live_created'")).one()
+        check(valid == (True, False), "invalid index dropped and rebuilt")
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('migrations-check@example.com')}"}
+    with TestClient(app) as client:
+        response = client.get("/entries", headers=headers, params={"limit": 500, "order": "asc"})
+        body = response.json() if response.status_code == 200 else []
+        check(response.status_code == 200 and len(body) == min(args.rows, 500)
+              and all(e["numberOfPairs"] in (1, 2) for e in body) and body[0]["beforePhotos"],
+              "API serves the migrated entries")
+
+    # Migrations write out their own DDL; from scratch they must still end at the models
+    from sqlmodel import SQLModel
+    import models  # noqa: F401
+    drop_tables(engine)
+    migrations.run_migrations()
+    drift = []
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            if columns != {c.name for c in table.columns}:
+                drift.append(f"{table.name} columns {sorted(columns ^ {c.name for c in table.columns})}")
+            if not {i.name for i in table.indexes} <= indexes:
+                drift.append(f"{table.name} indexes {sorted({i.name for i in table.indexes} - indexes)}")
+    check(not drift, f"fresh database matches models.py {drift or ''}")
+
+    engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Check GET /stats against the Python reference on a seeded dataset.
+
+Usage (from the backend directory):
+    python scripts/check_stats.py                         # 100k rows, temporary SQLite file
+    python scripts/check_stats.py --rows 1000000
+    python scripts/check_stats.py --database-url postgresql+psycopg2://... --rows 1000000
+
+Seeds --rows random entries (statuses, assignees, billing, missing pair counts,
+soft deletes, completion times), then compares stats.compute_stats with
+stats.stats_reference for several windows and both bucket sizes, and times
+each. Also checks the endpoint's cache: a repeat is served without running the
+aggregates and any entry write invalidates it. Uses STATS_UTC_OFFSET_MINUTES=480
+unless set. Writes fake entries, so never point it at production.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+
+STATUSES = ["pending", "in-progress", "qc", "done"]
+TECHNICIANS = ["ana", "ben", "carlo", "dina", "ely", None]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def seed(rows: int, rng: random.Random) -> None:
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from db import get_engine
+    from models import Entry as EntryModel
+
+    start = datetime(2026, 6, 1)
+    with Session(get_engine()) as session:
+        batch = []
+        for i in range(rows):
+            created = start + timedelta(seconds=rng.randrange(120 * 86400))
+            status = rng.choice(STATUSES)
+            batch.append({
+                "public_id": uuid.uuid4().hex, "customerPhone": f"0917{i:07d}", "deliveryAddress": "Manila",
+                "status": status, "assignedTo": rng.choice(TECHNICIANS),
+                "billing": round(rng.uniform(300, 2500), 2) if rng.random() < 0.9 else None,
+                "additionalBilling": round(rng.uniform(0, 500), 2) if rng.random() < 0.3 else None,
+                "numberOfPairs": rng.randint(1, 4) if rng.random() < 0.95 else None,
+                "createdAt": created, "updatedAt": created,
+                "completedAt": created + timedelta(minutes=rng.randrange(60, 14 * 1440)) if status == "done" else None,
+                "deleted": rng.random() < 0.05, "beforePhotos": [], "afterPhotos": [],
+            })
+            if len(batch) == 10_000:
+                session.execute(insert(EntryModel), batch)
+                batch = []
+        if batch:
+            session.execute(insert(EntryModel), batch)
+        session.commit()
+
+
+def differences(sql, ref, path="") -> list:
+    if isinstance(sql, dict) and isinstance(ref, dict):
+        out = [f"{path}.{k}: missing" for k in set(sql) ^ set(ref)]
+        for k in set(sql) & set(ref):
+            out += differences(sql[k], ref[k], f"{path}.{k}")
+        return out
+    if isinstance(sql, list) and isinstance(ref, list):
+        if len(sql) != len(ref):
+            return [f"{path}: {len(sql)} items vs {len(ref)}"]
+        return [d for i, (a, b) in enumerate(zip(sql, ref)) for d in differences(a, b, f"{path}[{i}]")]
+    if isinstance(sql, float) or isinstance(ref, float):
+        # Sums are added up in a different order; allow for the rounding
+        return [] if abs((sql or 0) - (ref or 0)) <= 0.011 + abs(ref or 0) * 1e-12 else [f"{path}: {sql} vs {ref}"]
+    return [] if sql == ref else [f"{path}: {sql!r} vs {ref!r}"]
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{tempfile.mkdtemp()}/stats.db")
+    os.environ.setdefault("JOB_WORKERS", "0")
+    os.environ.setdefault("STATS_UTC_OFFSET_MINUTES", "480")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlmodel import Session, select
+    import auth
+    import db
+    import stats
+    from api.main import app
+    from models import Entry as EntryModel
+
+    db.init_db()
+    t0 = time.perf_counter()
+    seed(args.rows, random.Random(args.seed))
+    print(f"seeded {args.rows} entries in {time.perf_counter() - t0:.1f}s")
+
+    columns = [EntryModel.status, EntryModel.assignedTo, EntryModel.billing, EntryModel.additionalBilling,
+               EntryModel.numberOfPairs, EntryModel.createdAt, EntryModel.completedAt, EntryModel.deleted]
+    windows = [(None, None), (datetime(2026, 7, 1), datetime(2026, 8, 1)), (datetime(2026, 9, 15, 16), None)]
+    with Session(db.get_engine()) as session:
+        t0 = time.perf_counter()
+        rows = session.exec(select(*columns)).all()
+        load = time.perf_counter() - t0
+        print(f"loading every entry (what the dashboard did): {load * 1000:.0f} ms")
+        for created_from, created_to in windows:
+            for bucket in ("day", "week"):
+                t0 = time.perf_counter()
+                sql = stats.compute_stats(session, created_from, created_to, bucket)
+                sql_ms = (time.perf_counter() - t0) * 1000
+                t0 = time.perf_counter()
+                ref = stats.stats_reference(rows, created_from, created_to, bucket)
+                ref_ms = (time.perf_counter() - t0) * 1000
+                diff = differences(sql, ref)
+                label = f"{created_from or '-'}..{created_to or '-'} by {bucket}"
+                check(not diff, f"{label}: SQL {sql_ms:.0f} ms, reference {ref_ms:.0f} ms (+ load)"
+                      + (f" {diff[:3]}" if diff else ""))
+        check(sql["total"]["entries"] > 0 and len(sql["buckets"]) > 0, "the checked windows are not empty")
+
+    statements = []
+    event.listen(db.get_engine(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+    headers = {"Authorization": f"Bearer {auth.create_access_token('stats@example.com')}"}
+    with TestClient(app) as client:
+        first = client.get("/stats?bucket=week", headers=headers)
+        check(first.status_code == 200, "GET /stats")
+        statements.clear()
+        t0 = time.perf_counter()
+        again = client.get("/stats?bucket=week", headers=headers)
+        cached_ms = (time.perf_counter() - t0) * 1000
+        check(again.json() == first.json() and len(statements) == 1,
+              f"repeat served from cache after {len(statements)} SQL statement(s) in {cached_ms:.1f} ms")
+        check(client.get("/stats?bucket=week", headers={**headers, "If-None-Match": first.headers["etag"]}).status_code == 304,
+              "If-None-Match answered with 304")
+
+        entry = client.post("/entries", headers=headers,
+                            json={"customerPhone": "0917", "deliveryAddress": "Manila", "billing": 1000, "numberOfPairs": 2}).json()
+        client.patch(f"/entries/{entry['id']}", headers=headers, json={"status": "done", "assignedTo": "ana"})
+        after = client.get("/stats?bucket=week", headers=headers).json()
+        check(after["total"]["entries"] == first.json()["total"]["entries"] + 1
+              and after["total"]["pairs"] == first.json()["total"]["pairs"] + 2, "an entry write invalidates the cache")
+        check(after["turnaround"]["completed"] == first.json()["turnaround"]["completed"] + 1,
+              "marking an entry done records its completion time")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Count Supabase Storage round trips per waiver upload against a fake server.
+
+Usage (from the backend directory):
+    python scripts/check_storage_roundtrips.py [--uploads 10]
+
+Runs the app in-process against scripts/fake_storage.py and a temporary SQLite
+database, uploads waivers and fails if any upload needs more than the expected
+round trips (one upsert plus one signing call).
+"""
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from fake_storage import FakeStorage  # noqa: E402
+
+EXPECTED_PER_UPLOAD = 2
+PDF = b"%PDF-1.4\n" + b"0" * 4096 + b"\n%%EOF\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=10)
+    args = parser.parse_args()
+
+    fake = FakeStorage().start()
+    os.environ.update({
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/storage_check.db",
+    })
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('storage-check@example.com')}"}
+    with TestClient(app) as client:
+        print(f"startup: {len(fake.requests)} storage requests {Counter(fake.requests)}")
+        worst = 0
+        for i in range(args.uploads):
+            fake.reset_counts()
+            r = client.post("/upload/waiver", headers=headers,
+                            files={"file": (f"waiver{i}.pdf", PDF, "application/pdf")})
+            if r.status_code != 200:
+                print(f"upload {i} failed: {r.status_code} {r.text}")
+                return 1
+            worst = max(worst, len(fake.requests))
+            if i == 0:
+                print(f"per upload: {[f'{m} {p}' for m, p in fake.requests]}")
+    fake.stop()
+    print(f"max round trips per upload: {worst} (expected {EXPECTED_PER_UPLOAD})")
+    return 0 if worst <= EXPECTED_PER_UPLOAD else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Exercise GET /entries/sync against a temporary database.
+
+Usage (from the backend directory):
+    python scripts/check_sync.py [--entries 1000]
+
+Seeds --entries entries, takes a full sync, then makes a handful of changes
+(update, soft delete, restore, permanent delete, batch update) and checks that
+the next sync returns exactly those, with a payload proportional to the
+changes rather than the table. Uses DATABASE_URL if set, else SQLite.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/sync_check.db")
+    os.environ.setdefault("JOB_WORKERS", "0")
+    os.environ.setdefault("HASH_WORKERS", "0")
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token('sync-check@example.com')}"}
+    def sync(client, cursor=None, limit=500):
+        entries, purged, size = [], [], 0
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            r = client.get("/entries/sync", headers=headers, params=params)
+            assert r.status_code == 200, r.text
+            size += len(r.content)
+            body = r.json()
+            entries += body["entries"]
+            purged += body["purged"]
+            cursor = body["cursor"]
+            if not body["hasMore"]:
+                return entries, purged, cursor, size
+
+    with TestClient(app) as client:
+        payload = {"customerPhone": "0917", "deliveryAddress": "Manila"}
+        ids = []
+        for start in range(0, args.entries, 500):
+            batch = client.post("/entries/batch", headers=headers,
+                                json={"items": [payload] * min(500, args.entries - start)}).json()
+            ids += [e["id"] for e in batch["entries"]]
+
+        entries, purged, cursor, full_size = sync(client, limit=333)
+        check(len({e["id"] for e in entries}) == args.entries == len(entries),
+              f"full sync returns every entry once across pages ({len(entries)})")
+
+        empty, purged, cursor, _ = sync(client, cursor)
+        check(not empty and not purged, "sync with an up-to-date cursor is empty")
+
+        client.patch(f"/entries/{ids[0]}", headers=headers, json={"status": "done"})
+        client.delete(f"/entries/{ids[1]}", headers=headers)
+        client.delete(f"/entries/{ids[2]}", headers=headers)
+        client.post(f"/entries/{ids[2]}/restore", headers=headers)
+        client.delete(f"/entries/{ids[3]}/permanent", headers=headers)
+        client.patch("/entries/batch", headers=headers, json={"ids": ids[4:7], "changes": {"status": "ready"}})
+        client.post("/entries/batch/purge", headers=headers, json={"ids": ids[7:9]})
+
+        changed, purged, cursor, delta_size = sync(client, cursor)
+        by_id = {e["id"]: e for e in changed}
+        check(set(by_id) == {ids[0], ids[1], ids[2], *ids[4:7]}, f"delta holds only the changed entries ({len(changed)})")
+        check(by_id.get(ids[0], {}).get("status") == "done", "update is in the delta")
+        check(by_id.get(ids[1], {}).get("deleted") is True, "soft delete is in the delta")
+        check(by_id.get(ids[2], {}).get("deleted") is False, "restore is in the delta")
+        check(sorted(purged) == sorted([ids[3], *ids[7:9]]), "permanent deletes are reported as purged")
+        check(delta_size * 50 < full_size, f"delta payload {delta_size} B vs full sync {full_size} B")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Check that repeated requests with one token skip JWT decoding and user lookups.
+
+Usage (from the backend directory):
+    python scripts/check_token_cache.py [--requests 200]
+
+Runs the app in-process against a temporary SQLite database, counts jwt.decode
+calls and SQL statements over repeated GET /me requests, and checks that
+PATCH /me and verification changes are visible immediately.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/token_cache.db")
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlmodel import Session
+    import auth
+    from api.main import app
+    from db import get_engine
+    from models import User as UserModel
+
+    decodes = []
+    real_decode = auth.jwt.decode
+    auth.jwt.decode = lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw)
+    statements = []
+    event.listen(get_engine(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    with TestClient(app) as client:
+        with Session(get_engine()) as session:
+            session.add(UserModel(email="cache@example.com", password_hash="x", first_name="Ana", verified=True))
+            session.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token('cache@example.com')}"}
+
+        decodes.clear()
+        statements.clear()
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            assert client.get("/me", headers=headers).status_code == 200
+        elapsed = time.perf_counter() - t0
+        check(len(decodes) == 1, f"{args.requests} GET /me: {len(decodes)} jwt.decode call(s)")
+        check(len(statements) == 1, f"{args.requests} GET /me: {len(statements)} SQL statement(s)")
+        print(f"    {elapsed / args.requests * 1000:.2f} ms per request")
+
+        client.patch("/me", headers=headers, json={"first_name": "Bea"})
+        check(client.get("/me", headers=headers).json()["first_name"] == "Bea", "PATCH /me is visible on the next GET /me")
+
+        bad = client.get("/me", headers={"Authorization": "Bearer not-a-token"})
+        check(bad.status_code == 401, "invalid tokens are still rejected")
+        expired = auth.create_access_token("cache@example.com", expires_delta=auth.timedelta(seconds=-1))
+        check(client.get("/me", headers={"Authorization": f"Bearer {expired}"}).status_code == 401,
+              "expired tokens are still rejected")
+
+        statements.clear()
+        auth.invalidate_user("cache@example.com")
+        client.get("/me", headers=headers)
+        check(len(statements) == 1, "invalidate_user forces a fresh user lookup")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Count waiver signing calls when listing entries against the fake storage server.
+
+Usage (from the backend directory):
+    python scripts/check_waiver_signing.py [--entries 500]
+
+Creates --entries entries that each reference a waiver object, then lists them
+in one page. The first listing must sign every waiver in a single bulk call,
+a second listing must be served from the signed-URL cache, and entries that
+still hold a legacy signed URL must come back with a fresh one.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import check, failures  # noqa: E402
+from fake_storage import FakeStorage  # noqa: E402
+
+
+def sign_calls(fake: FakeStorage) -> int:
+    return sum(1 for method, path in fake.requests if method == "POST" and "/object/sign/" in path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=500)
+    args = parser.parse_args()
+
+    fake = FakeStorage().start()
+    os.environ.update({
+        "SUPABASE_URL": fake.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+        "SUPABASE_BUCKET": "uploads",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/waiver_signing.db",
+    })
+
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from auth import create_access_token
+    from db import get_engine
+    from models import Entry as EntryModel
+    from sqlmodel import Session, update
+    from signed_urls import waiver_urls
+
+    headers = {"Authorization": f"Bearer {create_access_token('signing-check@example.com')}"}
+    with TestClient(app) as client:
+        legacy = f"{fake.url}/storage/v1/object/sign/uploads/waivers/legacy/old.pdf?token=expired"
+        fake.objects["uploads/waivers/legacy/old.pdf"] = b""
+        for i in range(args.entries):
+            fake.objects[f"uploads/waivers/signing-check/{i}.pdf"] = b""
+            r = client.post("/entries", headers=headers, json={
+                "customerPhone": "0917", "deliveryAddress": "Manila",
+                "waiverSigned": True, "waiverUrl": f"waivers/signing-check/{i}.pdf",
+            })
+            assert r.status_code == 200, r.text
+        # Rows written before waiver paths were stored hold the signed URL itself
+        with Session(get_engine()) as session:
+            session.exec(update(EntryModel).where(EntryModel.id == 1).values(waiverUrl=legacy))
+            session.commit()
+        waiver_urls.clear()
+
+        fake.reset_counts()
+        entries = client.get("/entries", headers=headers, params={"limit": args.entries}).json()
+        check(len(entries) == args.entries, f"listed {len(entries)} entries")
+        check(sign_calls(fake) == 1, f"first listing: {sign_calls(fake)} signing call(s)")
+        check(all("token=" in e["waiverUrl"] for e in entries), "every waiver has a signed URL")
+        check(any("waivers/legacy/old.pdf" in e["waiverUrl"] and "token=expired" not in e["waiverUrl"] for e in entries),
+              "legacy signed URL was re-signed")
+
+        fake.reset_counts()
+        client.get("/entries", headers=headers, params={"limit": args.entries})
+        check(sign_calls(fake) == 0, f"second listing: {sign_calls(fake)} signing call(s)")
+
+        # A deleted waiver object: storage returns signedURL null for it alone
+        gone = client.post("/entries", headers=headers, json={
+            "customerPhone": "0917", "deliveryAddress": "Manila", "waiverSigned": True, "waiverUrl": "waivers/gone.pdf",
+        })
+        check(gone.status_code == 200 and gone.json()["waiverUrl"] == "waivers/gone.pdf", "missing waiver keeps its path")
+        entries = client.get("/entries", headers=headers, params={"limit": args.entries}).json()
+        check(entries[0]["waiverUrl"] == "waivers/gone.pdf", "missing waiver listed with its stored path")
+        check(all("token=" in e["waiverUrl"] for e in entries[1:]), "the other waivers on the page are still signed")
+
+    fake.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
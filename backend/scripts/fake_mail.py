@@ -0,0 +1,100 @@
+"""Local stand-in for the Resend email API.
+
+Start it standalone with `python scripts/fake_mail.py --port 54322` and set
+RESEND_API_URL=http://127.0.0.1:54322/emails, or embed it with FakeMail().start().
+Accepted messages are kept in `messages`; `fail_next` and `delay` simulate an
+unreliable or slow provider.
+"""
+import argparse
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeMail:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.messages = []
+        self.attempts = 0
+        self.delay = 0.0
+        self._failures = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/emails"
+
+    def start(self) -> "FakeMail":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def fail_next(self, count: int, status: int = 503) -> None:
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.messages.clear()
+            self._failures.clear()
+            self.attempts = 0
+            self.delay = 0.0
+
+    def wait_for(self, count: int, timeout: float = 10) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if len(self.messages) >= count:
+                return True
+            time.sleep(0.02)
+        return False
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if fake.delay:
+                    time.sleep(fake.delay)
+                with fake._lock:
+                    fake.attempts += 1
+                    status = fake._failures.pop(0) if fake._failures else None
+                if status:
+                    return self._send(status, {"statusCode": status, "name": "fake_failure", "message": "Simulated failure"})
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    return self._send(401, {"statusCode": 401, "name": "missing_api_key", "message": "Missing API key"})
+                message = json.loads(body or b"{}")
+                message["id"] = secrets.token_hex(8)
+                with fake._lock:
+                    fake.messages.append(message)
+                return self._send(200, {"id": message["id"]})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=54322)
+    args = parser.parse_args()
+    fake = FakeMail(port=args.port)
+    print(f"Fake mail API listening on {fake.url}")
+    fake.server.serve_forever()
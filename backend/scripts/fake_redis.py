@@ -0,0 +1,68 @@
+"""In-process stand-in for a Redis client.
+
+Implements the part of redis-py's client that entry_cache.RedisBackend uses
+(get, mget, set with ex/nx, delete, scan_iter), with expiry, so the shared
+cache backend can be checked without a Redis server:
+
+    entry_cache.entry_cache = EntryCache(RedisBackend(FakeRedis()))
+
+Values come back as bytes, as from redis-py. `calls` counts commands; `down`
+makes every command raise ConnectionError, like an unreachable server.
+"""
+import fnmatch
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeRedis:
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _command(self) -> None:
+        if self.down:
+            raise ConnectionError("fake redis is down")
+        self.calls += 1
+
+    def _get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] is not None and item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return item[1]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._command()
+            return self._get(key)
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            self._command()
+            return [self._get(k) for k in keys]
+
+    def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            self._command()
+            if nx and self._get(key) is not None:
+                return None
+            if isinstance(value, str):
+                value = value.encode()
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            self._command()
+            return sum(self._data.pop(k, None) is not None for k in keys)
+
+    def scan_iter(self, match: str = "*"):
+        with self._lock:
+            self._command()
+            keys = [k for k in self._data if fnmatch.fnmatchcase(k, match)]
+        yield from keys
@@ -0,0 +1,181 @@
+"""In-memory stand-in for the subset of the Supabase Storage API the backend uses.
+
+Start it standalone with `python scripts/fake_storage.py --port 54321` and point
+SUPABASE_URL at http://127.0.0.1:54321, or embed it with FakeStorage().start().
+Every request is recorded in `requests` so callers can count round trips.
+"""
+import argparse
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+PREFIX = "/storage/v1"
+
+
+class FakeStorage:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, keep_bodies: bool = True):
+        # keep_bodies=False stores only object sizes, for large-upload benchmarks
+        self.keep_bodies = keep_bodies
+        self.buckets = {}
+        self.objects = {}
+        self.sizes = {}
+        self.upload_tokens = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeStorage":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.requests.clear()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            break
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                    return b"".join(chunks)
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _send(self, status: int, payload=None, raw: bytes = None, content_type: str = "application/json"):
+                body = raw if raw is not None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _route(self, method: str):
+                parsed = urlparse(self.path)
+                path = unquote(parsed.path)
+                query = parse_qs(parsed.query)
+                body = self._body()
+                with fake._lock:
+                    fake.requests.append((method, path))
+                if not path.startswith(PREFIX):
+                    return self._send(404, {"error": "not found"})
+                path = path[len(PREFIX):]
+                try:
+                    return fake.dispatch(self, method, path, query, body)
+                except KeyError:
+                    return self._send(404, {"statusCode": "404", "error": "not_found", "message": "Object not found"})
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PUT(self):
+                self._route("PUT")
+
+            def do_DELETE(self):
+                self._route("DELETE")
+
+        return Handler
+
+    def dispatch(self, handler, method: str, path: str, query: dict, body: bytes):
+        parts = path.strip("/").split("/")
+        if parts[0] == "bucket":
+            if method == "GET" and len(parts) == 2:
+                bucket = self.buckets[parts[1]]
+                return handler._send(200, bucket)
+            if method == "POST":
+                data = json.loads(body or b"{}")
+                self.buckets[data["id"]] = {"id": data["id"], "name": data.get("name", data["id"]),
+                                            "public": data.get("public", False), "owner": "",
+                                            "created_at": "", "updated_at": ""}
+                return handler._send(200, {"name": data["id"]})
+        if parts[0] == "object":
+            rest = parts[1:]
+            if rest[:2] == ["upload", "sign"]:
+                key = "/".join(rest[2:])
+                if method == "POST":
+                    token = secrets.token_urlsafe(16)
+                    self.upload_tokens[token] = key
+                    return handler._send(200, {"url": f"/object/upload/sign/{key}?token={token}"})
+                if method == "PUT":
+                    if self.upload_tokens.get(query.get("token", [""])[0]) != key:
+                        return handler._send(400, {"statusCode": "400", "error": "invalid_token", "message": "Invalid token"})
+                    self.objects[key] = body if self.keep_bodies else b""
+                    self.sizes[key] = len(body)
+                    return handler._send(200, {"Key": key})
+            if rest[:1] == ["list"] and method == "POST":
+                data = json.loads(body or b"{}")
+                folder = data.get("prefix", "").strip("/")
+                base = f"{rest[1]}/{folder}/" if folder else f"{rest[1]}/"
+                names = sorted(k[len(base):] for k in self.objects if k.startswith(base) and "/" not in k[len(base):])
+                names = [n for n in names if data.get("search", "") in n][:data.get("limit", 100)]
+                return handler._send(200, [{"name": n, "id": n, "metadata": {"size": self.sizes.get(base + n)}} for n in names])
+            if rest[:1] == ["sign"]:
+                if method == "POST" and len(rest) == 2:
+                    data = json.loads(body or b"{}")
+                    # Like Supabase: a null signedURL and an error for paths with no object
+                    return handler._send(200, [
+                        {"path": p, "signedURL": f"/object/sign/{rest[1]}/{p}?token={secrets.token_urlsafe(8)}", "error": None}
+                        if f"{rest[1]}/{p}" in self.objects else
+                        {"path": p, "signedURL": None, "error": "Either the object does not exist or you do not have access to it"}
+                        for p in data.get("paths", [])
+                    ])
+                key = "/".join(rest[1:])
+                if method == "POST":
+                    if key not in self.objects:
+                        raise KeyError(key)
+                    return handler._send(200, {"signedURL": f"/object/sign/{key}?token={secrets.token_urlsafe(8)}"})
+                if method == "GET":
+                    return handler._send(200, raw=self.objects[key], content_type="application/octet-stream")
+            if method == "DELETE" and len(rest) == 1:
+                data = json.loads(body or b"{}")
+                removed = [p for p in data.get("prefixes", []) if self.objects.pop(f"{rest[0]}/{p}", None) is not None]
+                return handler._send(200, [{"name": p} for p in removed])
+            key = "/".join(rest)
+            if method in ("POST", "PUT"):
+                if rest[0] not in self.buckets:
+                    return handler._send(404, {"statusCode": "404", "error": "Bucket not found", "message": "Bucket not found"})
+                upsert = handler.headers.get("x-upsert") == "true"
+                if method == "POST" and key in self.objects and not upsert:
+                    return handler._send(400, {"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+                self.objects[key] = body if self.keep_bodies else b""
+                self.sizes[key] = len(body)
+                return handler._send(200, {"Key": key})
+            if method == "GET":
+                return handler._send(200, raw=self.objects[key], content_type="application/octet-stream")
+        return handler._send(404, {"error": "not found"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--discard-bodies", action="store_true", help="keep only object sizes")
+    args = parser.parse_args()
+    fake = FakeStorage(port=args.port, keep_bodies=not args.discard_bodies)
+    print(f"Fake storage listening on {fake.url}")
+    fake.server.serve_forever()
@@ -0,0 +1,117 @@
+"""Compare the sync and async entry handlers under increasing concurrency.
+
+Usage (from the backend directory):
+    python scripts/load_test.py                               # temporary SQLite file
+    python scripts/load_test.py --database-url postgresql+psycopg2://...
+    python scripts/load_test.py --concurrency 1 16 64 --duration 5
+
+For each mode a uvicorn server is started with DB_ASYNC=false/true and driven
+with a dashboard-like mix (80% GET /entries, 20% PATCH status). Reports
+requests/sec, p50 and p99 latency per concurrency level. The database is
+seeded with --rows fake entries, so never point it at production.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from _harness import start_server  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args()
+
+
+def seed(rows: int) -> list:
+    from sqlmodel import Session
+    import db
+    from models import Entry as EntryModel, User as UserModel
+
+    db.init_db()
+    ids = []
+    with Session(db.get_engine()) as session:
+        session.add(UserModel(email="loadtest@example.com", password_hash="x", verified=True))
+        for i in range(rows):
+            row = EntryModel(public_id=f"load{i:028x}", customerPhone=f"0917{i:07d}", deliveryAddress="Manila",
+                             beforePhotos=[f"before/{i}.jpg"], serviceDetails={"qcPassed": i % 2 == 0})
+            session.add(row)
+            ids.append(row.public_id)
+        session.commit()
+    return ids
+
+
+async def drive(base: str, token: str, ids: list, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=60) as client:
+        stop = time.perf_counter() + duration
+
+        async def worker(seed_: int) -> None:
+            nonlocal errors
+            rnd = random.Random(seed_)
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                if rnd.random() < 0.8:
+                    r = await client.get("/entries", params={"limit": 50})
+                else:
+                    r = await client.patch(f"/entries/{rnd.choice(ids)}", json={"status": rnd.choice(["pending", "done"])})
+                latencies.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    errors += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "rps": n / duration,
+        "p50_ms": latencies[n // 2] * 1000 if n else 0.0,
+        "p99_ms": latencies[min(n - 1, int(n * 0.99))] * 1000 if n else 0.0,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/load_test.db"
+    os.environ["DATABASE_URL"] = url
+    ids = seed(args.rows)
+
+    from auth import create_access_token
+    token = create_access_token("loadtest@example.com")
+
+    print(f"{'mode':>6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in args.modes:
+        proc = start_server(args.port, {**os.environ, "DB_ASYNC": "true" if mode == "async" else "false"})
+        try:
+            for concurrency in args.concurrency:
+                result = asyncio.run(drive(f"http://127.0.0.1:{args.port}", token, ids, concurrency, args.duration))
+                print(f"{mode:>6} {concurrency:>5} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} "
+                      f"{result['p99_ms']:>9.1f} {result['errors']:>7}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import base64
+import json
+import os
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlmodel import Session
+
+from auth import get_current_user_email
+from db import SEARCH_DOCUMENT, get_engine, get_session, sqlite_search_available
+from models import Entry as EntryModel
+from queries import select_live
+from schemas import Entry
+from serializers import serialize_entries
+from signed_urls import resolve_waiver_urls
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Terms shorter than this cannot use a trigram index; they match word prefixes
+TRIGRAM_MIN = 3
+# Postgres ranks only the newest matches, so a broad term ("ju", "nike") does
+# not compute a rank for a large part of the table; older matches are not paged to
+SEARCH_RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", "1000"))
+
+router = APIRouter()
+
+SEARCH_FIELDS = (EntryModel.customerName, EntryModel.customerPhone, EntryModel.customerEmail,
+                 EntryModel.itemDescription, EntryModel.deliveryAddress)
+_backend: Optional[str] = None
+
+
+def search_backend() -> str:
+    # "pg_trgm" (trigram + tsvector indexes), "postgresql" (tsvector only, if
+    # the pg_trgm extension could not be created), "fts5" (SQLite) or "like"
+    global _backend
+    if _backend is None:
+        dialect = get_engine().dialect.name
+        if dialect == "postgresql":
+            with get_engine().connect() as conn:
+                trigram = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+            _backend = "pg_trgm" if trigram else "postgresql"
+        elif dialect == "sqlite" and sqlite_search_available():
+            _backend = "fts5"
+        else:
+            _backend = "like"
+    return _backend
+
+
+def search_terms(q: str) -> List[str]:
+    return [t for t in q.lower().split() if t][:8]
+
+
+def _like(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _prefix_query(terms: List[str]) -> str:
+    words = [re.sub(r"\W", "", t) for t in terms]
+    return " & ".join(f"{w}:*" for w in words if w)
+
+
+def _postgres_search(stmt, q: str, terms: List[str], trigram: bool = True):
+    # Every term must match: a substring of the document (trigram index) or,
+    # for short terms, the start of a word (tsvector index). Without pg_trgm
+    # words match by prefix and only terms with digits or symbols (phones,
+    # emails) are matched as substrings, with a table scan.
+    document = literal_column(f"({SEARCH_DOCUMENT})")
+    vector = func.to_tsvector(literal_column("'simple'"), document)
+    for term in terms:
+        prefix = _prefix_query([term])
+        substring = len(term) >= TRIGRAM_MIN if trigram else not term.isalpha()
+        if substring or not prefix:
+            stmt = stmt.where(document.ilike(_like(term), escape="\\"))
+        else:
+            stmt = stmt.where(vector.op("@@")(func.to_tsquery(literal_column("'simple'"), prefix)))
+    # Materialized first: with ORDER BY ... LIMIT over the whole query the
+    # planner may walk the createdAt index and test every row for a rare term
+    matches = stmt.cte("matches").prefix_with("MATERIALIZED")
+    candidates = (select(matches).order_by(matches.c.createdAt.desc(), matches.c.id.desc())
+                  .limit(SEARCH_RANK_WINDOW).subquery("candidates"))
+    # The rank expressions name the columns unqualified, so they apply to the subquery
+    prefix = _prefix_query(terms)
+    ranks = [func.word_similarity(q, document)] if trigram else []
+    if prefix:
+        ranks.append(func.ts_rank(vector, func.to_tsquery(literal_column("'simple'"), prefix)))
+    order = [(ranks[0] + ranks[1] if len(ranks) == 2 else ranks[0]).desc()] if ranks else []
+    return select(candidates), order + [candidates.c.createdAt.desc(), candidates.c.id.desc()]
+
+
+def _fts5_search(stmt, q: str, terms: List[str]):
+    fts = table("entry_search", column("rowid"), column("doc"))
+    stmt = stmt.join(fts, fts.c.rowid == EntryModel.id)
+    phrases = " ".join('"' + t.replace('"', '""') + '"' for t in terms if len(t) >= TRIGRAM_MIN)
+    if phrases:
+        stmt = stmt.where(fts.c.doc.op("MATCH")(phrases))
+    for term in terms:
+        if len(term) < TRIGRAM_MIN:
+            # Start of a word, as the tsvector prefix match on Postgres
+            escaped = _like(term)[1:]
+            stmt = stmt.where(or_(fts.c.doc.like(escaped, escape="\\"), fts.c.doc.like("% " + escaped, escape="\\")))
+    # bm25() is lower for better matches
+    return stmt, [func.bm25(literal_column("entry_search")).asc(), EntryModel.createdAt.desc(), EntryModel.id.desc()]
+
+
+def _like_search(stmt, q: str, terms: List[str]):
+    for term in terms:
+        stmt = stmt.where(or_(*(field.ilike(_like(term), escape="\\") for field in SEARCH_FIELDS)))
+    return stmt, [EntryModel.createdAt.desc(), EntryModel.id.desc()]
+
+
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        (offset,) = json.loads(base64.urlsafe_b64decode(padded))
+        return max(0, int(offset))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def rank_window() -> Optional[int]:
+    # How many matches can be paged through, or None if all of them can
+    return SEARCH_RANK_WINDOW if search_backend() in ("pg_trgm", "postgresql") else None
+
+
+def search_entries(session: Session, q: str, limit: int, offset: int) -> Tuple[List, bool]:
+    terms = search_terms(q)
+    window = rank_window()
+    if not terms or (window is not None and offset >= window):
+        return [], False
+    builders = {
+        "pg_trgm": _postgres_search,
+        "postgresql": lambda *args: _postgres_search(*args, trigram=False),
+        "fts5": _fts5_search,
+        "like": _like_search,
+    }
+    stmt, order = builders[search_backend()](select_live(), q.lower(), terms)
+    rows = session.exec(stmt.order_by(*order).offset(offset).limit(limit + 1)).all()
+    has_more = len(rows) > limit and (window is None or offset + limit < window)
+    return rows[:limit], has_more
+
+
+@router.get("/entries/search", response_model=List[Entry])
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: str = Depends(get_current_user_email),
+    session: Session = Depends(get_session),
+) -> List[Entry]:
+    # Live entries matching every term of `q` in the customer name, phone (with
+    # or without separators), email, item description or delivery address, best
+    # match first. Pages continue with the X-Next-Cursor header, as for /entries,
+    # up to X-Search-Rank-Window results where the backend caps the ranking.
+    offset = decode_offset(cursor) if cursor else 0
+    rows, has_more = search_entries(session, q, limit, offset)
+    response: Response = JSONResponse(serialize_entries(rows, resolve_waiver_urls(rows)))
+    response.headers["X-Page-Size"] = str(limit)
+    window = rank_window()
+    if window is not None:
+        response.headers["X-Search-Rank-Window"] = str(window)
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_offset(offset + limit)
+    return response
@@ -0,0 +1,159 @@
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from metrics import record_serialization
+from models import Entry as EntryModel
+from schemas import EntryCreate, EntryUpdate
+from signed_urls import normalize_waiver_value
+
+
+# Status that marks an entry as finished; see Entry.completedAt
+DONE_STATUS = "done"
+
+# Columns needed to build an API entry; `id` is only read for keyset cursors
+ENTRY_COLUMNS = (
+    EntryModel.id,
+    EntryModel.public_id,
+    EntryModel.customerName,
+    EntryModel.customerPhone,
+    EntryModel.customerEmail,
+    EntryModel.deliveryAddress,
+    EntryModel.itemDescription,
+    EntryModel.shoeCondition,
+    EntryModel.shoeService,
+    EntryModel.waiverSigned,
+    EntryModel.waiverUrl,
+    EntryModel.beforePhotos,
+    EntryModel.assignedTo,
+    EntryModel.needsReglue,
+    EntryModel.needsPaint,
+    EntryModel.status,
+    EntryModel.serviceDetails,
+    EntryModel.afterPhotos,
+    EntryModel.billing,
+    EntryModel.additionalBilling,
+    EntryModel.deliveryOption,
+    EntryModel.markedAs,
+    EntryModel.numberOfPairs,
+    EntryModel.createdAt,
+    EntryModel.updatedAt,
+)
+
+
+# Delta sync also reports soft-deleted entries and the change version
+SYNC_COLUMNS = ENTRY_COLUMNS + (EntryModel.deleted, EntryModel.deletedAt, EntryModel.version)
+
+
+def select_entry_columns():
+    return select(*ENTRY_COLUMNS)
+
+
+def serialize_entry(r, waiver_urls: Optional[Dict[str, str]] = None) -> dict:
+    # Accepts an EntryModel or a Row from select_entry_columns(). The output is
+    # JSON-ready and matches the `Entry` response schema, so handlers return it
+    # directly instead of building and re-validating pydantic models.
+    # waiver_urls maps stored waiver paths to signed URLs (resolve_waiver_urls).
+    start = time.perf_counter()
+    data = {
+        "id": r.public_id,
+        "customerName": r.customerName,
+        "customerPhone": r.customerPhone,
+        "customerEmail": r.customerEmail,
+        "deliveryAddress": r.deliveryAddress,
+        "itemDescription": r.itemDescription,
+        "shoeCondition": r.shoeCondition,
+        "shoeService": r.shoeService,
+        "waiverSigned": r.waiverSigned,
+        "waiverUrl": waiver_urls.get(r.waiverUrl, r.waiverUrl) if waiver_urls else r.waiverUrl,
+        "beforePhotos": r.beforePhotos or [],
+        "assignedTo": r.assignedTo,
+        "needsReglue": r.needsReglue,
+        "needsPaint": r.needsPaint,
+        "status": r.status,
+        "serviceDetails": r.serviceDetails,
+        "afterPhotos": r.afterPhotos or [],
+        "billing": r.billing,
+        "additionalBilling": r.additionalBilling,
+        "deliveryOption": r.deliveryOption,
+        "markedAs": r.markedAs,
+        "numberOfPairs": r.numberOfPairs or 1,
+        "createdAt": r.createdAt.isoformat(),
+        "updatedAt": r.updatedAt.isoformat(),
+    }
+    record_serialization(time.perf_counter() - start)
+    return data
+
+
+def serialize_entries(rows: Iterable, waiver_urls: Optional[Dict[str, str]] = None) -> List[dict]:
+    return [serialize_entry(r, waiver_urls) for r in rows]
+
+
+def serialize_change(r, waiver_urls: Optional[Dict[str, str]] = None) -> dict:
+    data = serialize_entry(r, waiver_urls)
+    data["deleted"] = bool(r.deleted)
+    data["deletedAt"] = r.deletedAt.isoformat() if r.deletedAt else None
+    data["version"] = r.version
+    return data
+
+
+def entry_from_payload(payload: EntryCreate) -> EntryModel:
+    now = datetime.utcnow()
+    return EntryModel(
+        public_id=uuid.uuid4().hex,
+        customerName=payload.customerName,
+        customerPhone=payload.customerPhone,
+        customerEmail=payload.customerEmail,
+        deliveryAddress=payload.deliveryAddress,
+        itemDescription=payload.itemDescription,
+        shoeCondition=payload.shoeCondition,
+        shoeService=payload.shoeService,
+        waiverSigned=payload.waiverSigned,
+        waiverUrl=normalize_waiver_value(payload.waiverUrl),
+        beforePhotos=payload.beforePhotos or [],
+        assignedTo=payload.assignedTo,
+        needsReglue=payload.needsReglue,
+        needsPaint=payload.needsPaint,
+        status=payload.status,
+        serviceDetails=payload.serviceDetails.dict() if payload.serviceDetails else None,
+        afterPhotos=payload.afterPhotos or [],
+        billing=payload.billing,
+        additionalBilling=payload.additionalBilling,
+        deliveryOption=payload.deliveryOption,
+        markedAs=payload.markedAs,
+        numberOfPairs=payload.numberOfPairs or 1,
+        createdAt=now,
+        updatedAt=now,
+        completedAt=now if payload.status == DONE_STATUS else None,
+    )
+
+
+def entry_update_values(updates: EntryUpdate) -> dict:
+    # Column values for a PATCH; shared by the per-row and set-based updates
+    data = updates.dict(exclude_unset=True)
+    if "beforePhotos" in data:
+        data["beforePhotos"] = data["beforePhotos"] or []
+    if "afterPhotos" in data:
+        data["afterPhotos"] = data["afterPhotos"] or []
+    if "waiverUrl" in data:
+        data["waiverUrl"] = normalize_waiver_value(data["waiverUrl"])
+    data["updatedAt"] = datetime.utcnow()
+    if "status" in data:
+        # Keeps the first completion time when an entry is marked done again
+        done = data["status"] == DONE_STATUS
+        data["completedAt"] = func.coalesce(EntryModel.completedAt, data["updatedAt"]) if done else None
+    return data
+
+
+def apply_entry_updates(row: EntryModel, updates: EntryUpdate) -> None:
+    values = entry_update_values(updates)
+    if values.get("completedAt") is not None:
+        # Plain value for the ORM, so the row stays loaded (async sessions
+        # cannot refresh an expired attribute lazily)
+        values["completedAt"] = row.completedAt or values["updatedAt"]
+    for k, v in values.items():
+        setattr(row, k, v)
@@ -0,0 +1,95 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from storage import UPLOAD_BUCKET, create_signed_urls, storage_configured
+
+
+WAIVER_URL_TTL = int(os.environ.get("WAIVER_URL_TTL", str(7 * 24 * 3600)))
+# Cached URLs are re-signed once they have less than this left, so a URL handed
+# to a client always stays valid for at least this long
+WAIVER_URL_REFRESH_MARGIN = int(os.environ.get("WAIVER_URL_REFRESH_MARGIN", str(24 * 3600)))
+WAIVER_URL_CACHE_SIZE = int(os.environ.get("WAIVER_URL_CACHE_SIZE", "5000"))
+
+logger = logging.getLogger(__name__)
+
+
+class SignedUrlCache:
+    def __init__(self, bucket: str, ttl: int, refresh_margin: int, max_size: int):
+        self.bucket = bucket
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl // 2)
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, str]:
+        now = time.time()
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            for path in dict.fromkeys(paths):
+                item = self._items.get(path)
+                if item and item[1] - now > self.refresh_margin:
+                    self._items.move_to_end(path)
+                    found[path] = item[0]
+                else:
+                    missing.append(path)
+        if missing:
+            signed = create_signed_urls(self.bucket, missing, self.ttl)
+            expires_at = now + self.ttl
+            with self._lock:
+                for path, url in signed.items():
+                    self._items[path] = (url, expires_at)
+                    self._items.move_to_end(path)
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+            found.update(signed)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+waiver_urls = SignedUrlCache(UPLOAD_BUCKET, WAIVER_URL_TTL, WAIVER_URL_REFRESH_MARGIN, WAIVER_URL_CACHE_SIZE)
+
+
+def waiver_object_path(value: Optional[str]) -> Optional[str]:
+    # Entries store the object path; older rows hold a full signed URL for it
+    if not value:
+        return None
+    if not value.startswith(("http://", "https://")):
+        return value
+    marker = f"/object/sign/{UPLOAD_BUCKET}/"
+    url_path = urlparse(value).path
+    if marker not in url_path:
+        return None
+    return unquote(url_path.split(marker, 1)[1])
+
+
+def normalize_waiver_value(value: Optional[str]) -> Optional[str]:
+    path = waiver_object_path(value)
+    return path if path else value
+
+
+def resolve_waiver_urls(rows) -> Dict[str, str]:
+    # Maps each stored waiverUrl value to a fresh signed URL, signing all
+    # cache misses for the page in a single storage call
+    paths = {}
+    for r in rows:
+        path = waiver_object_path(r.waiverUrl)
+        if path:
+            paths[r.waiverUrl] = path
+    if not paths or not storage_configured():
+        return {}
+    try:
+        signed = waiver_urls.get_many(paths.values())
+    except Exception as e:
+        logger.warning("Signing waiver URLs failed: %s", e)
+        return {}
+    return {value: signed[path] for value, path in paths.items() if path in signed}
@@ -0,0 +1,261 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import case, false, func
+from sqlmodel import Session, select
+
+from auth import get_current_user_email
+from changes import current_version
+from db import get_session
+from etags import etag_matches, make_etag, not_modified, set_etag
+from models import Entry as EntryModel
+from serializers import DONE_STATUS
+
+
+STATS_CACHE_SIZE = int(os.environ.get("STATS_CACHE_SIZE", "64"))
+# Day and week buckets start at local midnight (Monday for weeks); 480 for Manila
+STATS_UTC_OFFSET_MINUTES = int(os.environ.get("STATS_UTC_OFFSET_MINUTES", "0"))
+# Everything else counts as work in progress for a technician
+NOT_IN_PROGRESS = ("pending", DONE_STATUS)
+
+router = APIRouter()
+
+# Entries without numberOfPairs (older rows) count as one pair
+PAIRS = func.coalesce(EntryModel.numberOfPairs, 1)
+BILLING = func.coalesce(EntryModel.billing, 0) * PAIRS
+ADDITIONAL_BILLING = func.coalesce(EntryModel.additionalBilling, 0) * PAIRS
+
+
+def _bucket(column, bucket: str, dialect: str):
+    if dialect == "postgresql":
+        shifted = column + timedelta(minutes=STATS_UTC_OFFSET_MINUTES)
+        return func.date(func.date_trunc(bucket, shifted))
+    modifiers = [f"{STATS_UTC_OFFSET_MINUTES:+d} minutes"]
+    if bucket == "week":
+        # Next Sunday (or the same day), then back to its Monday
+        modifiers += ["weekday 0", "-6 days"]
+    return func.date(column, *modifiers)
+
+
+def _hours(start, end, dialect: str):
+    if dialect == "postgresql":
+        return func.extract("epoch", end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+
+def _money(value) -> float:
+    return round(float(value or 0), 2)
+
+
+def _hours_value(value) -> Optional[float]:
+    return round(float(value), 2) if value is not None else None
+
+
+def _sort_key(value) -> Tuple[bool, str]:
+    return value is None, value or ""
+
+
+def _window(column, created_from: Optional[datetime], created_to: Optional[datetime]) -> list:
+    conditions = [EntryModel.deleted == false()]
+    if created_from is not None:
+        conditions.append(column >= created_from)
+    if created_to is not None:
+        conditions.append(column < created_to)
+    return conditions
+
+
+def compute_stats(session: Session, created_from: Optional[datetime], created_to: Optional[datetime], bucket: str) -> dict:
+    # Live entries created in [created_from, created_to); completions per bucket
+    # use the same window on completedAt. One GROUP BY query per breakdown.
+    dialect = session.get_bind().dialect.name
+    window = _window(EntryModel.createdAt, created_from, created_to)
+    in_progress = EntryModel.status.notin_(NOT_IN_PROGRESS)
+
+    by_status = session.exec(
+        select(EntryModel.status, func.count(), func.sum(PAIRS), func.sum(BILLING), func.sum(ADDITIONAL_BILLING))
+        .where(*window).group_by(EntryModel.status)
+    ).all()
+    by_assignee = session.exec(
+        select(EntryModel.assignedTo, func.count(), func.sum(PAIRS), func.sum(case((in_progress, PAIRS), else_=0)),
+               func.sum(BILLING + ADDITIONAL_BILLING))
+        .where(*window).group_by(EntryModel.assignedTo)
+    ).all()
+    created_bucket = _bucket(EntryModel.createdAt, bucket, dialect).label("start")
+    created = session.exec(
+        select(created_bucket, func.count(), func.sum(PAIRS), func.sum(BILLING + ADDITIONAL_BILLING))
+        .where(*window).group_by(created_bucket)
+    ).all()
+    completed_bucket = _bucket(EntryModel.completedAt, bucket, dialect).label("start")
+    completed = session.exec(
+        select(completed_bucket, func.count(), func.sum(PAIRS))
+        .where(*_window(EntryModel.completedAt, created_from, created_to), EntryModel.completedAt.is_not(None))
+        .group_by(completed_bucket)
+    ).all()
+    hours = _hours(EntryModel.createdAt, EntryModel.completedAt, dialect)
+    turnaround = session.exec(
+        select(func.count(), func.avg(hours), func.min(hours), func.max(hours))
+        .where(*window, EntryModel.completedAt.is_not(None))
+    ).one()
+
+    # Dates come back as date objects on Postgres and strings on SQLite
+    buckets = {}
+    for start, count, pairs, revenue in created:
+        buckets[str(start)[:10]] = {"created": count, "pairs": int(pairs or 0), "revenue": _money(revenue),
+                                    "completed": 0, "completedPairs": 0}
+    for start, count, pairs in completed:
+        item = buckets.setdefault(str(start)[:10], {"created": 0, "pairs": 0, "revenue": 0.0,
+                                                    "completed": 0, "completedPairs": 0})
+        item["completed"], item["completedPairs"] = count, int(pairs or 0)
+
+    billing = sum(float(r[3] or 0) for r in by_status)
+    additional = sum(float(r[4] or 0) for r in by_status)
+    return {
+        "total": {
+            "entries": sum(r[1] for r in by_status),
+            "pairs": sum(int(r[2] or 0) for r in by_status),
+            "revenue": {"billing": _money(billing), "additionalBilling": _money(additional),
+                        "total": _money(billing + additional)},
+        },
+        "byStatus": [
+            {"status": s, "entries": n, "pairs": int(p or 0), "revenue": _money(float(b or 0) + float(a or 0))}
+            for s, n, p, b, a in sorted(by_status, key=lambda r: _sort_key(r[0]))
+        ],
+        "byAssignee": [
+            {"assignedTo": who, "entries": n, "pairs": int(p or 0), "pairsInProgress": int(w or 0), "revenue": _money(r)}
+            for who, n, p, w, r in sorted(by_assignee, key=lambda r: _sort_key(r[0]))
+        ],
+        "buckets": [{"start": start, **buckets[start]} for start in sorted(buckets)],
+        "turnaround": {"completed": turnaround[0], "avgHours": _hours_value(turnaround[1]),
+                       "minHours": _hours_value(turnaround[2]), "maxHours": _hours_value(turnaround[3])},
+    }
+
+
+def _bucket_start(value: datetime, bucket: str) -> str:
+    day = (value + timedelta(minutes=STATS_UTC_OFFSET_MINUTES)).date()
+    if bucket == "week":
+        day -= timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+def stats_reference(rows: Iterable, created_from: Optional[datetime], created_to: Optional[datetime], bucket: str) -> dict:
+    # Plain-Python version of compute_stats over entry objects, kept to check
+    # the SQL (scripts/check_stats.py); not used by the API
+    def in_window(value: Optional[datetime]) -> bool:
+        return value is not None and (created_from is None or value >= created_from) and (created_to is None or value < created_to)
+
+    total = {"entries": 0, "pairs": 0, "billing": 0.0, "additionalBilling": 0.0}
+    by_status, by_assignee, buckets = {}, {}, {}
+    durations = []
+    for r in rows:
+        if r.deleted:
+            continue
+        pairs = r.numberOfPairs if r.numberOfPairs is not None else 1
+        if in_window(r.completedAt):
+            item = buckets.setdefault(_bucket_start(r.completedAt, bucket), {"created": 0, "pairs": 0, "revenue": 0.0,
+                                                                            "completed": 0, "completedPairs": 0})
+            item["completed"] += 1
+            item["completedPairs"] += pairs
+        if not in_window(r.createdAt):
+            continue
+        billing = (r.billing or 0) * pairs
+        additional = (r.additionalBilling or 0) * pairs
+        total["entries"] += 1
+        total["pairs"] += pairs
+        total["billing"] += billing
+        total["additionalBilling"] += additional
+        s = by_status.setdefault(r.status, {"entries": 0, "pairs": 0, "revenue": 0.0})
+        s["entries"] += 1
+        s["pairs"] += pairs
+        s["revenue"] += billing + additional
+        a = by_assignee.setdefault(r.assignedTo, {"entries": 0, "pairs": 0, "pairsInProgress": 0, "revenue": 0.0})
+        a["entries"] += 1
+        a["pairs"] += pairs
+        a["pairsInProgress"] += pairs if r.status not in NOT_IN_PROGRESS else 0
+        a["revenue"] += billing + additional
+        item = buckets.setdefault(_bucket_start(r.createdAt, bucket), {"created": 0, "pairs": 0, "revenue": 0.0,
+                                                                      "completed": 0, "completedPairs": 0})
+        item["created"] += 1
+        item["pairs"] += pairs
+        item["revenue"] += billing + additional
+        if r.completedAt is not None:
+            durations.append((r.completedAt - r.createdAt).total_seconds() / 3600)
+
+    return {
+        "total": {
+            "entries": total["entries"],
+            "pairs": total["pairs"],
+            "revenue": {"billing": _money(total["billing"]), "additionalBilling": _money(total["additionalBilling"]),
+                        "total": _money(total["billing"] + total["additionalBilling"])},
+        },
+        "byStatus": [{"status": k, **v, "revenue": _money(v["revenue"])}
+                     for k, v in sorted(by_status.items(), key=lambda kv: _sort_key(kv[0]))],
+        "byAssignee": [{"assignedTo": k, **v, "revenue": _money(v["revenue"])}
+                       for k, v in sorted(by_assignee.items(), key=lambda kv: _sort_key(kv[0]))],
+        "buckets": [{"start": k, **v, "revenue": _money(v["revenue"])} for k, v in sorted(buckets.items())],
+        "turnaround": {
+            "completed": len(durations),
+            "avgHours": _hours_value(sum(durations) / len(durations)) if durations else None,
+            "minHours": _hours_value(min(durations)) if durations else None,
+            "maxHours": _hours_value(max(durations)) if durations else None,
+        },
+    }
+
+
+class StatsCache:
+    # Results keyed by query, valid while the entry change counter is unchanged:
+    # any entry write, from any process, invalidates them
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[tuple, Tuple[int, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> Optional[dict]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != version:
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: tuple, version: int, result: dict) -> None:
+        with self._lock:
+            self._items[key] = (version, result)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+stats_cache = StatsCache(STATS_CACHE_SIZE)
+
+
+@router.get("/stats", response_model=dict)
+def get_stats(
+    request: Request,
+    createdFrom: Optional[datetime] = None,
+    createdTo: Optional[datetime] = None,
+    bucket: str = Query("day", pattern="^(day|week)$"),
+    current_user: str = Depends(get_current_user_email),
+    session: Session = Depends(get_session),
+) -> dict:
+    # Dashboard aggregates: totals and revenue (billing weighted by pairs), per
+    # status, per assignee (with pairs in progress), created/completed per day
+    # or week, and created-to-done turnaround
+    version = current_version(session.connection())
+    etag = make_etag(request.url.path, sorted(request.query_params.multi_items()), version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    key = (createdFrom, createdTo, bucket)
+    result = stats_cache.get(key, version)
+    if result is None:
+        result = {**compute_stats(session, createdFrom, createdTo, bucket), "version": version}
+        stats_cache.put(key, version, result)
+    return set_etag(JSONResponse(result), etag)
@@ -1,13 +1,115 @@
+import logging
 import os
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Optional, Union
 
+from metrics import outbound
 
-def get_supabase() -> Client:
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")  # Use service role key
-    if not url or not key:
-        raise RuntimeError("Supabase credentials not configured")
-    print(f"Initializing Supabase client with URL: {url}")
-    return create_client(url, key)
+if TYPE_CHECKING:
+    from supabase import Client
 
 
+UPLOAD_BUCKET = "uploads"
+# Object key prefixes for files uploaded directly to storage against an entry
+ENTRY_UPLOAD_PREFIXES = {
+    "before": "photos/before",
+    "after": "photos/after",
+    "waiver": "waivers",
+}
+
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+_ready_buckets = set()
+
+logger = logging.getLogger(__name__)
+
+
+def storage_configured() -> bool:
+    return bool(os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_SERVICE_ROLE_KEY"))
+
+
+def get_supabase() -> "Client":
+    # One client per process so its HTTP connections are reused across requests.
+    # supabase (and httpx under it) is imported here, not at startup: it is the
+    # slowest import of the app and most requests never touch storage.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url = os.environ.get("SUPABASE_URL")
+                key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")  # Use service role key
+                if not url or not key:
+                    raise RuntimeError("Supabase credentials not configured")
+                logger.info("Initializing Supabase client", extra={"url": url})
+                from supabase import create_client
+
+                _client = create_client(url, key)
+    return _client
+
+
+def ensure_bucket(bucket: str) -> None:
+    # Checked once per process; uploads then go straight to the object API
+    if bucket in _ready_buckets:
+        return
+    storage = get_supabase().storage
+    try:
+        with outbound("supabase", "get_bucket"):
+            storage.get_bucket(bucket)
+    except Exception:
+        with outbound("supabase", "create_bucket"):
+            storage.create_bucket(bucket, {"public": True})
+    _ready_buckets.add(bucket)
+
+
+def init_storage() -> None:
+    # Called on startup; if storage is unreachable the first upload retries
+    if not storage_configured():
+        return
+    try:
+        ensure_bucket(UPLOAD_BUCKET)
+    except Exception as e:
+        logger.warning("Storage bootstrap failed: %s", e)
+
+
+def upload_object(bucket: str, path: str, content: Union[bytes, BinaryIO], content_type: str) -> None:
+    # `content` may be an open binary file, which is streamed rather than read into memory
+    ensure_bucket(bucket)
+    # Upsert replaces an existing object in the same request
+    with outbound("supabase", "upload"):
+        get_supabase().storage.from_(bucket).upload(
+            path=path,
+            file=content,
+            file_options={"content-type": content_type, "upsert": "true"},
+        )
+
+
+def create_upload_url(bucket: str, path: str) -> dict:
+    # Signed URL the client PUTs the file to, bypassing our API process
+    ensure_bucket(bucket)
+    with outbound("supabase", "create_signed_upload_url"):
+        return get_supabase().storage.from_(bucket).create_signed_upload_url(path)
+
+
+def object_exists(bucket: str, path: str) -> bool:
+    folder, _, name = path.rpartition("/")
+    with outbound("supabase", "list"):
+        items = get_supabase().storage.from_(bucket).list(folder, {"search": name, "limit": 1})
+    return any(item.get("name") == name for item in items)
+
+
+def public_url(bucket: str, path: str) -> str:
+    # Built locally; no storage round trip
+    return get_supabase().storage.from_(bucket).get_public_url(path)
+
+
+def create_signed_urls(bucket: str, paths: List[str], expires_in: int) -> Dict[str, str]:
+    # One storage call for any number of paths; missing objects are left out.
+    # Posted here rather than through storage3's create_signed_urls, which
+    # raises for the whole batch when one item comes back with signedURL null.
+    files = get_supabase().storage.from_(bucket)
+    with outbound("supabase", "create_signed_urls"):
+        items = files._request("POST", f"/object/sign/{bucket}",
+                               json={"paths": paths, "expiresIn": str(expires_in)}).json()
+    base = str(files._client.base_url)
+    return {item["path"]: f"{base}{item['signedURL'].lstrip('/')}"
+            for item in items if item.get("signedURL") and not item.get("error")}
@@ -0,0 +1,142 @@
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+
+WAIVER_MAX_BYTES = int(os.environ.get("WAIVER_MAX_BYTES", str(25 * 1024 * 1024)))
+PDF_MAGIC = b"%PDF-"
+# Multipart framing and form fields on top of the file itself
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class ReceivedFile:
+    def __init__(self, filename: str, path: str, size: int):
+        self.filename = filename
+        self.path = path
+        self.size = size
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class _PdfPartReceiver:
+    # Writes the `field` part of a multipart body to a temp file as it arrives,
+    # rejecting it as soon as the magic bytes or the size limit rule it out.
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._target = False
+        self._head = b""
+        self._out = None
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self.headers = {}
+        self._target = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self.headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode() != self.field or self.path is not None:
+            return
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        if not filename or not filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        self._out = os.fdopen(fd, "wb")
+        self.filename = filename
+        self._target = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._target:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds {self.max_bytes} bytes")
+        if len(self._head) < len(PDF_MAGIC):
+            self._head += chunk[:len(PDF_MAGIC) - len(self._head)]
+            if len(self._head) == len(PDF_MAGIC) and self._head != PDF_MAGIC:
+                raise HTTPException(status_code=400, detail="File is not a PDF")
+        self._out.write(chunk)
+
+    def on_part_end(self) -> None:
+        if self._target:
+            self._out.close()
+            self._target = False
+
+    def close(self) -> None:
+        if self._out is not None and not self._out.closed:
+            self._out.close()
+
+
+async def receive_pdf(request: Request, field: str = "file", max_bytes: int = WAIVER_MAX_BYTES) -> ReceivedFile:
+    # Stream a multipart PDF upload to a temp file with bounded memory
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + _FORM_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes} bytes")
+
+    receiver = _PdfPartReceiver(field, max_bytes)
+    parser = multipart.MultipartParser(params[b"boundary"], receiver.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except Exception as e:
+        receiver.close()
+        if receiver.path:
+            os.unlink(receiver.path)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=400, detail="Malformed upload") from e
+    receiver.close()
+    if receiver.path is None:
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    if receiver.size < len(PDF_MAGIC) or receiver._head != PDF_MAGIC:
+        os.unlink(receiver.path)
+        raise HTTPException(status_code=400, detail="File is not a PDF")
+    return ReceivedFile(receiver.filename, receiver.path, receiver.size)